@@ -0,0 +1,171 @@
+"""Synthetic, dependency-free stand-in envs for benchmarking, implementing
+the interface XCSF expects of an env: obs_space, action_space, reset(),
+step() and is_terminal().
+
+Both are n-dim "corridor" tasks: the agent starts at a random point and
+each action nudges one dim up or down, with the episode ending (reward 0)
+once dim 0 reaches its upper bound, or after max_episode_len steps (reward
+-1 per step). They are cheap to step, so benchmarks measure XCSF rather
+than the env, and their size (num dims, num actions) can be set freely."""
+import abc
+from collections import namedtuple
+
+import numpy as np
+from rlenvs.obs_space import IntegerObsSpace, RealObsSpace
+
+_GOAL_REWARD = 0.0
+_STEP_REWARD = -1.0
+_DEFAULT_MAX_EPISODE_LEN = 50
+
+_Dim = namedtuple("_Dim", ["lower", "upper", "span"])
+
+
+class _SyntheticIntegerObsSpace(IntegerObsSpace):
+    """Integer obs space of num_dims dims [0, upper] built directly, so
+    benchmarks don't depend on how rlenvs builds its spaces. Provides all
+    that xcsfrl uses: len(), iteration and indexing over dims with lower,
+    upper and span attrs."""
+    def __init__(self, num_dims, upper):
+        # span of integer dims counts both bounds, as for IntegerInterval
+        self._dims = tuple(
+            _Dim(lower=0, upper=upper, span=(upper + 1))
+            for _ in range(num_dims))
+
+    def __len__(self):
+        return len(self._dims)
+
+    def __iter__(self):
+        return iter(self._dims)
+
+    def __getitem__(self, idx):
+        return self._dims[idx]
+
+
+class _SyntheticRealObsSpace(RealObsSpace):
+    """Real obs space of num_dims dims [0.0, 1.0], see
+    _SyntheticIntegerObsSpace."""
+    def __init__(self, num_dims):
+        self._dims = tuple(
+            _Dim(lower=0.0, upper=1.0, span=1.0) for _ in range(num_dims))
+
+    def __len__(self):
+        return len(self._dims)
+
+    def __iter__(self):
+        return iter(self._dims)
+
+    def __getitem__(self, idx):
+        return self._dims[idx]
+
+
+class _SyntheticCorridorEnvABC(metaclass=abc.ABCMeta):
+    def __init__(self, num_dims, num_actions, upper, step_size,
+                 max_episode_len, seed):
+        assert num_dims >= 1
+        assert num_actions >= 2
+        self._num_dims = num_dims
+        self._action_space = tuple(range(num_actions))
+        self._upper = upper
+        self._step_size = step_size
+        self._max_episode_len = max_episode_len
+        self._rng = np.random.default_rng(seed)
+        # action a moves dim (a % n) up if (a // n) is even, else down
+        self._action_dims = [a % num_dims for a in self._action_space]
+        self._action_signs = [(1 if (a // num_dims) % 2 == 0 else -1)
+                              for a in self._action_space]
+        self._state = None
+        self._num_steps = 0
+        self._is_terminal = True
+
+    @property
+    def obs_space(self):
+        return self._obs_space
+
+    @property
+    def action_space(self):
+        return self._action_space
+
+    def reset(self):
+        self._state = self._gen_start_state()
+        self._num_steps = 0
+        self._is_terminal = False
+        return self._state.copy()
+
+    def step(self, action):
+        assert not self._is_terminal
+        dim = self._action_dims[action]
+        self._state[dim] = np.clip(
+            self._state[dim] + self._action_signs[action] * self._step_size,
+            0, self._upper)
+        self._num_steps += 1
+        at_goal = (self._state[0] == self._upper)
+        self._is_terminal = (at_goal
+                             or self._num_steps >= self._max_episode_len)
+        reward = (_GOAL_REWARD if at_goal else _STEP_REWARD)
+        return (self._state.copy(), reward, self._is_terminal, {})
+
+    def is_terminal(self):
+        return self._is_terminal
+
+    @abc.abstractmethod
+    def sample_obs(self, num_obs, rng):
+        """(num_obs x n) obs drawn uniformly from obs space using rng, for
+        inference benchmarks."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _gen_start_state(self):
+        raise NotImplementedError
+
+
+class SyntheticIntegerEnv(_SyntheticCorridorEnvABC):
+    """Corridor over integer grid {0, ..., size - 1}^n."""
+    def __init__(self,
+                 num_dims,
+                 num_actions,
+                 size=8,
+                 max_episode_len=_DEFAULT_MAX_EPISODE_LEN,
+                 seed=0):
+        super().__init__(num_dims,
+                         num_actions,
+                         upper=(size - 1),
+                         step_size=1,
+                         max_episode_len=max_episode_len,
+                         seed=seed)
+        self._obs_space = _SyntheticIntegerObsSpace(num_dims, self._upper)
+
+    def sample_obs(self, num_obs, rng):
+        return rng.integers(0, (self._upper + 1),
+                            size=(num_obs, self._num_dims))
+
+    def _gen_start_state(self):
+        # start anywhere but at the goal
+        state = self._rng.integers(0, (self._upper + 1), size=self._num_dims)
+        state[0] = self._rng.integers(0, self._upper)
+        return state
+
+
+class SyntheticRealEnv(_SyntheticCorridorEnvABC):
+    """Corridor over unit hypercube [0, 1]^n."""
+    def __init__(self,
+                 num_dims,
+                 num_actions,
+                 step_size=0.125,
+                 max_episode_len=_DEFAULT_MAX_EPISODE_LEN,
+                 seed=0):
+        super().__init__(num_dims,
+                         num_actions,
+                         upper=1.0,
+                         step_size=step_size,
+                         max_episode_len=max_episode_len,
+                         seed=seed)
+        self._obs_space = _SyntheticRealObsSpace(num_dims)
+
+    def sample_obs(self, num_obs, rng):
+        return rng.random(size=(num_obs, self._num_dims))
+
+    def _gen_start_state(self):
+        # start anywhere but at the goal
+        state = self._rng.random(size=self._num_dims)
+        state[0] = self._rng.uniform(0.0, (self._upper - self._step_size))
+        return state
@@ -0,0 +1,600 @@
+"""Reference-equivalence harness: checks the optimised learning routines
+against the baseline ones they replaced (xcsfrl.reference), and measures
+the speedup.
+
+The optimised routines make different RNG draws than the baseline ones (see
+xcsfrl.reference.SEMANTIC_CHANGES), so a ReferenceXCSF and an XCSF can't be
+compared step for step. Instead, on a benchmark config (see run_benchmarks):
+    - Checked run: an XCSF is trained for --num-steps steps with each of its
+      deterministic routines shadowed by the reference one on the same
+      input: match sets, prediction arrays, action set param and prediction
+      updates (on copies of [A]'s clfrs), and which clfrs action set
+      subsumption subsumes. Updated clfrs are compared with
+      ClassifierBase.full_eq(), or with --tolerances, float params each to
+      their own (rtol, atol) (see FLOAT_TOLERANCES, overridden with --tol,
+      or --exact for exact comparison); phenotypes and integer params must
+      be equal either way. Deletion is checked statistically: every
+      --deletion-check-every deletions, --num-deletion-samples selections
+      by the optimised sampler (with a separate RNG, not applied) are chi-
+      square tested against the reference deletion votes, failing if the
+      test's z score exceeds --max-z. The first failure is reported with
+      context (step, kind, the differing clfrs' params).
+    - Timed runs: a ReferenceXCSF and an XCSF are each trained for
+      --num-steps steps on --num-seeds seeds, giving the speedup. Summary
+      stats of each run's pop (size, ops history, fitness sum, mean error
+      and experience) are compared across seeds with Welch's t-test, a
+      stat failing if |t| exceeds --max-t.
+The script exits with status 1 on any failure. --match-index and
+--match-set-cache-size enable those on the optimised XCSF. Run from the
+repo root, e.g.:
+    python -m benchmarks.equivalence --num-steps 5000 --out equiv.json"""
+import argparse
+import copy
+import json
+import math
+import sys
+import time
+
+import numpy as np
+
+from xcsfrl import reference
+from xcsfrl.deletion import deletion, select_row_to_delete
+from xcsfrl.hyperparams import Hyperparams
+from xcsfrl.match_index import IntegerBitsetMatchIndex, RealGridMatchIndex
+from xcsfrl.param_update import update_action_set
+from xcsfrl.reference import ReferenceXCSF
+from xcsfrl.stats import NULL_STATS
+from xcsfrl.subsumption import action_set_subsumption
+from xcsfrl.xcsf import XCSF
+
+from .run_benchmarks import DEFAULT_SWEEP, make_components
+
+_ENGINE_NAMES = ("reference", "optimised")
+_MATCH_INDEX_CLS = {
+    "integer": IntegerBitsetMatchIndex,
+    "real": RealGridMatchIndex
+}
+_FAILURE_EXIT_STATUS = 1
+# (rtol, atol) of float clfr params, used in place of full_eq() with
+# --tolerances; all else is compared exactly. Relative, since params such as
+# GA offspring fitnesses can be tiny, with atols only to absorb rounding of
+# entries near 0
+FLOAT_TOLERANCES = {
+    # float32, so a batched and a per clfr update can differ by an ulp
+    "weight_vec": (1e-6, 1e-12),
+    "cov_mat": (1e-7, 1e-12),
+    "niche_min_error": (1e-9, 1e-15),
+    "error": (1e-9, 1e-15),
+    "fitness": (1e-9, 1e-15),
+    "action_set_size": (1e-12, 0.0)
+}
+_EXACT_CLFR_PARAMS = ("experience", "time_stamp", "numerosity")
+_PREDICTION_RTOL = 1e-10
+# chi-square bins with fewer expected selections than this are pooled
+_MIN_EXPECTED_COUNT = 5
+_SUMMARY_OPS = ("covering", "absorption", "insertion", "deletion",
+                "ga_subsumption", "as_subsumption")
+
+
+class _CheckFailure(Exception):
+    def __init__(self, failure):
+        super().__init__(failure["kind"])
+        self.failure = failure
+
+
+class _CheckedXCSF(XCSF):
+    """XCSF whose deterministic routines are shadowed by the reference ones
+    and whose deletion sampling is periodically tested, raising
+    _CheckFailure on the first mismatch."""
+    def __init__(self,
+                 *args,
+                 tolerances,
+                 deletion_check_every,
+                 num_deletion_samples,
+                 max_z,
+                 check_seed,
+                 **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tolerances = tolerances
+        self._deletion_check_every = deletion_check_every
+        self._num_deletion_samples = num_deletion_samples
+        self._max_z = max_z
+        self._check_rng = np.random.default_rng(check_seed)
+        self._num_deletions = 0
+        self.deletion_z_scores = []
+        # optimised update is run without subsumption, which is then run
+        # (and checked) separately
+        self._no_as_subsumption_hyperparams = Hyperparams({
+            **self._hyperparams.as_dict(), "do_as_subsumption":
+            False
+        })
+        # instance attrs, so are called as bound methods by training
+        self._update_action_set_func = self._checked_update_action_set
+        self._deletion_func = self._checked_deletion
+
+    def _gen_match_set(self, obs):
+        match_set = super()._gen_match_set(obs)
+        reference_match_set = reference.gen_match_set(self._pop, obs)
+        if set(map(id, match_set)) != set(map(id, reference_match_set)):
+            raise _CheckFailure({
+                "kind": "match_set",
+                "obs": np.asarray(obs).tolist(),
+                "size": len(match_set),
+                "reference_size": len(reference_match_set)
+            })
+        return match_set
+
+    def _gen_prediction_arr(self, match_set, aug_obs):
+        prediction_arr = super()._gen_prediction_arr(match_set, aug_obs)
+        reference_prediction_arr = reference.gen_prediction_arr(
+            match_set, aug_obs, self._pop.action_space)
+        for (action, reference_prediction) in \
+                reference_prediction_arr.items():
+            prediction = prediction_arr[action]
+            if (prediction is None) != (reference_prediction is None) or (
+                    prediction is not None and not math.isclose(
+                        prediction,
+                        reference_prediction,
+                        rel_tol=_PREDICTION_RTOL)):
+                raise _CheckFailure({
+                    "kind": "prediction_arr",
+                    "action": action,
+                    "prediction": prediction,
+                    "reference_prediction": reference_prediction
+                })
+        return prediction_arr
+
+    def _checked_update_action_set(self,
+                                   action_set,
+                                   payoff,
+                                   obs,
+                                   pop,
+                                   pred_strat,
+                                   hyperparams,
+                                   stats=NULL_STATS,
+                                   aug_obs_cache=None):
+        clfrs = list(action_set)
+        clfr_copies = [_copy_clfr(clfr) for clfr in clfrs]
+        update_action_set(action_set,
+                          payoff,
+                          obs,
+                          pop,
+                          pred_strat,
+                          self._no_as_subsumption_hyperparams,
+                          stats,
+                          aug_obs_cache=aug_obs_cache)
+        aug_obs = pred_strat.aug_obs(obs, hyperparams.x_nought)
+        proc_obs = pred_strat.process_aug_obs(aug_obs)
+        reference.update_action_set_params(clfr_copies, payoff, aug_obs,
+                                           proc_obs, pred_strat, hyperparams)
+        for (idx, (clfr, clfr_copy)) in enumerate(zip(clfrs, clfr_copies)):
+            param_diff = _find_param_diff(clfr_copy, clfr, self._tolerances)
+            if param_diff is not None:
+                raise _CheckFailure({
+                    "kind": "update",
+                    "idx_in_action_set": idx,
+                    "clfr": _describe_clfr(clfr),
+                    "reference_clfr": _describe_clfr(clfr_copy),
+                    **param_diff
+                })
+
+        if hyperparams.do_as_subsumption:
+            self._checked_action_set_subsumption(action_set, pop,
+                                                 hyperparams)
+
+    def _checked_action_set_subsumption(self, action_set, pop, hyperparams):
+        (most_general_clfr, subsumees) = reference.find_as_subsumees(
+            action_set, pop, hyperparams)
+        if most_general_clfr is not None:
+            expected_numerosity = (most_general_clfr.numerosity +
+                                   sum([clfr.numerosity
+                                        for clfr in subsumees]))
+        members = [clfr for clfr in action_set if clfr.owner is pop]
+        action_set_subsumption(action_set, pop, hyperparams)
+        removed = [clfr for clfr in members if clfr.owner is not pop]
+        if set(map(id, removed)) != set(map(id, subsumees)) or (
+                most_general_clfr is not None
+                and most_general_clfr.numerosity != expected_numerosity):
+            raise _CheckFailure({
+                "kind": "as_subsumption",
+                "num_subsumed": len(removed),
+                "reference_num_subsumed": len(subsumees)
+            })
+
+    def _checked_deletion(self, pop, hyperparams, rng, stats=NULL_STATS):
+        if pop.num_micros > hyperparams.N:
+            if self._num_deletions % self._deletion_check_every == 0:
+                self._check_deletion_sampling(pop, hyperparams)
+            self._num_deletions += 1
+        deletion(pop, hyperparams, rng, stats)
+
+    def _check_deletion_sampling(self, pop, hyperparams):
+        votes = np.asarray(reference.calc_deletion_votes(pop, hyperparams))
+        rows = [
+            select_row_to_delete(pop, hyperparams, self._check_rng)
+            for _ in range(self._num_deletion_samples)
+        ]
+        counts = np.bincount(rows, minlength=len(votes))
+        z = _calc_chi_square_z(counts, (votes / np.sum(votes)))
+        self.deletion_z_scores.append(z)
+        if z > self._max_z:
+            raise _CheckFailure({
+                "kind": "deletion_sampling",
+                "z": z,
+                "num_samples": self._num_deletion_samples,
+                "num_macros": pop.num_macros
+            })
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    config = {name: getattr(args, name) for name in DEFAULT_SWEEP}
+    if args.exact:
+        tolerances = {name: (0.0, 0.0) for name in FLOAT_TOLERANCES}
+    elif args.tolerances or len(args.tol) > 0:
+        tolerances = dict(FLOAT_TOLERANCES)
+        for (name, rtol, atol) in args.tol:
+            assert name in tolerances
+            tolerances[name] = (float(rtol), float(atol))
+    else:
+        # compare with full_eq()
+        tolerances = None
+
+    checked_run = run_checked(config,
+                              args.seed,
+                              args.num_steps,
+                              tolerances,
+                              deletion_check_every=args.deletion_check_every,
+                              num_deletion_samples=args.num_deletion_samples,
+                              max_z=args.max_z,
+                              match_index=args.match_index,
+                              match_set_cache_size=args.match_set_cache_size)
+    seeds = list(range(args.seed, args.seed + args.num_seeds))
+    timed_runs = run_timed(config,
+                           seeds,
+                           args.num_steps,
+                           max_t=args.max_t,
+                           match_index=args.match_index,
+                           match_set_cache_size=args.match_set_cache_size)
+    result = {
+        "config": config,
+        "num_steps": args.num_steps,
+        "seeds": seeds,
+        "tolerances": tolerances,
+        "semantic_changes": reference.SEMANTIC_CHANGES,
+        "checked_run": checked_run,
+        **timed_runs
+    }
+    _print_result(result)
+    if args.out is not None:
+        with open(args.out, "w") as fp:
+            json.dump(result, fp, indent=2)
+    if checked_run["failure"] is not None or \
+            len(result["stat_failures"]) > 0:
+        sys.exit(_FAILURE_EXIT_STATUS)
+
+
+def run_checked(config,
+                seed,
+                num_steps,
+                tolerances=None,
+                deletion_check_every=100,
+                num_deletion_samples=10000,
+                max_z=5.0,
+                match_index=False,
+                match_set_cache_size=None):
+    """Trains an XCSF on config for num_steps steps with its routines checked
+    against the reference ones, stopping at the first failure. Updated clfrs
+    are compared with full_eq() if tolerances is None, else float params to
+    within tolerances (as FLOAT_TOLERANCES)."""
+    xcsf = _make_xcsf(_CheckedXCSF,
+                      config,
+                      seed,
+                      match_index,
+                      match_set_cache_size,
+                      tolerances=tolerances,
+                      deletion_check_every=deletion_check_every,
+                      num_deletion_samples=num_deletion_samples,
+                      max_z=max_z,
+                      check_seed=seed)
+    failure = None
+    num_steps_done = 0
+    while num_steps_done < num_steps:
+        try:
+            xcsf.train_for_time_steps(1)
+        except _CheckFailure as e:
+            failure = {"step": num_steps_done, **e.failure}
+            break
+        num_steps_done += 1
+    z_scores = xcsf.deletion_z_scores
+    return {
+        "num_steps": num_steps_done,
+        "failure": failure,
+        "num_deletion_checks": len(z_scores),
+        "max_deletion_z": (max(z_scores) if len(z_scores) > 0 else None)
+    }
+
+
+def run_timed(config,
+              seeds,
+              num_steps,
+              max_t=5.0,
+              match_index=False,
+              match_set_cache_size=None):
+    """Trains a ReferenceXCSF and an XCSF on config for num_steps steps on
+    each seed, timing them and comparing their summary stats across seeds
+    (if more than one)."""
+    times = {name: 0.0 for name in _ENGINE_NAMES}
+    summaries = {name: [] for name in _ENGINE_NAMES}
+    phases = {}
+    for seed in seeds:
+        xcsfs = (_make_xcsf(ReferenceXCSF, config, seed),
+                 _make_xcsf(XCSF, config, seed, match_index,
+                            match_set_cache_size))
+        for (name, xcsf) in zip(_ENGINE_NAMES, xcsfs):
+            start_time = time.perf_counter()
+            xcsf.train_for_time_steps(num_steps)
+            times[name] += (time.perf_counter() - start_time)
+            summaries[name].append(_summarise(xcsf))
+            if seed == seeds[0]:
+                phases[name] = xcsf.stats.snapshot()["phases"]
+
+    stat_comparison = {}
+    stat_failures = []
+    if len(seeds) > 1:
+        for stat in summaries["reference"][0]:
+            vals = {
+                name: [summary[stat] for summary in summaries[name]]
+                for name in _ENGINE_NAMES
+            }
+            t = _calc_welch_t(vals["optimised"], vals["reference"])
+            stat_comparison[stat] = {**vals, "t": t}
+            if abs(t) > max_t:
+                stat_failures.append(stat)
+    total_num_steps = (num_steps * len(seeds))
+    return {
+        "steps_per_sec":
+        {name: (total_num_steps / times[name])
+         for name in _ENGINE_NAMES},
+        "speedup": (times["reference"] / times["optimised"]),
+        "phases": phases,
+        "stat_comparison": stat_comparison,
+        "stat_failures": stat_failures
+    }
+
+
+def _make_xcsf(xcsf_cls,
+               config,
+               seed,
+               match_index=False,
+               match_set_cache_size=None,
+               **kwargs):
+    (env, encoding, action_selection_strat, pred_strat, hyperparams_dict) = \
+        make_components(config, seed)
+    if match_index:
+        kwargs["match_index"] = _MATCH_INDEX_CLS[config["obs"]](
+            env.obs_space)
+    return xcsf_cls(env,
+                    encoding,
+                    action_selection_strat,
+                    pred_strat,
+                    hyperparams_dict,
+                    match_set_cache_size=match_set_cache_size,
+                    collect_stats=True,
+                    **kwargs)
+
+
+def _copy_clfr(clfr):
+    # detached copy with its own params and arrays, sharing condition
+    return copy.deepcopy(clfr, memo={id(clfr.condition): clfr.condition})
+
+
+def _find_param_diff(clfr_a, clfr_b, tolerances):
+    if clfr_a != clfr_b:
+        return {"param": "phenotype"}
+    if tolerances is None:
+        if clfr_a.full_eq(clfr_b):
+            return None
+        # full_eq() doesn't say which param differs
+        return {
+            "param": "full_eq",
+            "max_abs_diffs": {
+                name: _calc_max_abs_diff(clfr_a, clfr_b, name)
+                for name in FLOAT_TOLERANCES if hasattr(clfr_a, name)
+            }
+        }
+    for name in _EXACT_CLFR_PARAMS:
+        if getattr(clfr_a, name) != getattr(clfr_b, name):
+            return {"param": name}
+    for (name, (rtol, atol)) in tolerances.items():
+        if not hasattr(clfr_a, name):
+            # e.g. cov mat of non-RLS clfrs
+            continue
+        val_a = np.asarray(getattr(clfr_a, name), dtype=np.float64)
+        val_b = np.asarray(getattr(clfr_b, name), dtype=np.float64)
+        if not np.allclose(val_a, val_b, rtol=rtol, atol=atol):
+            return {
+                "param": name,
+                "max_abs_diff": _calc_max_abs_diff(clfr_a, clfr_b, name)
+            }
+    return None
+
+
+def _calc_max_abs_diff(clfr_a, clfr_b, name):
+    val_a = np.asarray(getattr(clfr_a, name), dtype=np.float64)
+    val_b = np.asarray(getattr(clfr_b, name), dtype=np.float64)
+    return float(np.max(np.abs(val_a - val_b)))
+
+
+def _calc_chi_square_z(counts, probs):
+    """z score of chi-square goodness of fit test of counts to probs, via the
+    Wilson-Hilferty normal approximation. Infinite if anything of prob. 0 was
+    counted."""
+    if np.any(counts[probs == 0] > 0):
+        return math.inf
+    expected = (probs * np.sum(counts))
+    is_pooled = (expected < _MIN_EXPECTED_COUNT)
+    observed = np.append(counts[~is_pooled], np.sum(counts[is_pooled]))
+    expected = np.append(expected[~is_pooled], np.sum(expected[is_pooled]))
+    (observed, expected) = (observed[expected > 0], expected[expected > 0])
+    dof = (len(expected) - 1)
+    if dof == 0:
+        return 0.0
+    chi_square = np.sum((observed - expected)**2 / expected)
+    var = 2 / (9 * dof)
+    return float(((chi_square / dof)**(1 / 3) - (1 - var)) / math.sqrt(var))
+
+
+def _calc_welch_t(vals_a, vals_b):
+    (vals_a, vals_b) = (np.asarray(vals_a, dtype=np.float64),
+                        np.asarray(vals_b, dtype=np.float64))
+    mean_diff = (np.mean(vals_a) - np.mean(vals_b))
+    std_err = math.sqrt(
+        np.var(vals_a, ddof=1) / len(vals_a) +
+        np.var(vals_b, ddof=1) / len(vals_b))
+    if std_err == 0:
+        return (0.0 if mean_diff == 0 else math.copysign(math.inf, mean_diff))
+    return float(mean_diff / std_err)
+
+
+def _summarise(xcsf):
+    pop = xcsf.pop
+    numerosities = np.array([clfr.numerosity for clfr in pop])
+    summary = {
+        "num_macros": pop.num_macros,
+        "mean_error":
+        float(np.average([clfr.error for clfr in pop],
+                         weights=numerosities)),
+        "mean_experience":
+        float(np.average([clfr.experience for clfr in pop],
+                         weights=numerosities)),
+        "fitness_sum": float(sum([clfr.fitness for clfr in pop]))
+    }
+    for op in _SUMMARY_OPS:
+        summary[f"{op}_ops"] = pop.ops_history[op]
+    return summary
+
+
+def _describe_clfr(clfr):
+    desc = {
+        "condition": str(clfr.condition),
+        "action": clfr.action,
+        "numerosity": clfr.numerosity,
+        "experience": clfr.experience,
+        "time_stamp": clfr.time_stamp,
+        "fitness": float(clfr.fitness),
+        "error": float(clfr.error),
+        "niche_min_error": float(clfr.niche_min_error),
+        "action_set_size": float(clfr.action_set_size),
+        "weight_vec": clfr.weight_vec.tolist()
+    }
+    if hasattr(clfr, "cov_mat"):
+        desc["cov_mat"] = clfr.cov_mat.tolist()
+    return desc
+
+
+def _print_result(result):
+    steps_per_sec = result["steps_per_sec"]
+    print(
+        f"{result['num_steps']} steps x {len(result['seeds'])} seeds: "
+        f"reference {steps_per_sec['reference']:.0f} steps/s, optimised "
+        f"{steps_per_sec['optimised']:.0f} steps/s "
+        f"(x{result['speedup']:.2f})",
+        file=sys.stderr)
+    print("Deliberate semantic changes (see xcsfrl.reference):",
+          file=sys.stderr)
+    for (routine, change) in result["semantic_changes"].items():
+        print(f"  {routine}: {change}", file=sys.stderr)
+
+    tolerances = result["tolerances"]
+    print(
+        "Clfrs compared with "
+        f"{'full_eq()' if tolerances is None else json.dumps(tolerances)}",
+        file=sys.stderr)
+    checked_run = result["checked_run"]
+    failure = checked_run["failure"]
+    if failure is None:
+        max_z = checked_run["max_deletion_z"]
+        max_z_str = (f"{max_z:.2f}" if max_z is not None else "n/a")
+        print(
+            f"Checked run: all routines agree over "
+            f"{checked_run['num_steps']} steps "
+            f"({checked_run['num_deletion_checks']} deletion sampling checks,"
+            f" max z {max_z_str})",
+            file=sys.stderr)
+    else:
+        print(f"Checked run: failed at step {failure['step']}:",
+              file=sys.stderr)
+        print(json.dumps(failure, indent=2), file=sys.stderr)
+
+    for (stat, comparison) in result["stat_comparison"].items():
+        print(
+            f"  {stat}: reference {np.mean(comparison['reference']):.4g}, "
+            f"optimised {np.mean(comparison['optimised']):.4g} "
+            f"(t {comparison['t']:.2f})",
+            file=sys.stderr)
+    if len(result["stat_failures"]) > 0:
+        print(f"Stats differing across seeds: {result['stat_failures']}",
+              file=sys.stderr)
+    elif len(result["stat_comparison"]) > 0:
+        print("Stats agree across seeds", file=sys.stderr)
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Check optimised XCSF against reference implementation.")
+    parser.add_argument("--num-steps", type=int, default=5000)
+    parser.add_argument("--num-seeds",
+                        type=int,
+                        default=5,
+                        help="Seeds of timed runs, from --seed.")
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--match-index", action="store_true")
+    parser.add_argument("--match-set-cache-size", type=int, default=None)
+    parser.add_argument("--tol",
+                        nargs=3,
+                        action="append",
+                        default=[],
+                        metavar=("PARAM", "RTOL", "ATOL"),
+                        help="Tolerances of a float clfr param, e.g. --tol "
+                        "weight_vec 1e-5 1e-12 (may be repeated, implies "
+                        "--tolerances).")
+    parser.add_argument("--tolerances",
+                        action="store_true",
+                        help="Compare float clfr params with "
+                        "FLOAT_TOLERANCES rather than full_eq().")
+    parser.add_argument("--exact",
+                        action="store_true",
+                        help="Compare float clfr params exactly.")
+    parser.add_argument("--deletion-check-every", type=int, default=100)
+    parser.add_argument("--num-deletion-samples", type=int, default=10000)
+    parser.add_argument("--max-z",
+                        type=float,
+                        default=5.0,
+                        help="Max z score of deletion sampling checks.")
+    parser.add_argument("--max-t",
+                        type=float,
+                        default=5.0,
+                        help="Max |t| of summary stat comparisons.")
+    parser.add_argument("--N", type=int, default=DEFAULT_SWEEP["N"][0])
+    parser.add_argument("--num-dims",
+                        type=int,
+                        default=DEFAULT_SWEEP["num_dims"][0])
+    parser.add_argument("--num-actions",
+                        type=int,
+                        default=DEFAULT_SWEEP["num_actions"][0])
+    parser.add_argument("--poly-order",
+                        type=int,
+                        default=DEFAULT_SWEEP["poly_order"][0])
+    parser.add_argument("--pred",
+                        choices=tuple(DEFAULT_SWEEP["pred"]),
+                        default=DEFAULT_SWEEP["pred"][0])
+    parser.add_argument("--obs",
+                        choices=tuple(DEFAULT_SWEEP["obs"]),
+                        default=DEFAULT_SWEEP["obs"][0])
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main()
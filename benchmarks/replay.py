@@ -0,0 +1,159 @@
+"""Trace-driven replay benchmark: times (and optionally profiles) the
+learner alone, with no env cost.
+
+An XCSF on a benchmark config (see run_benchmarks) is trained for
+--warmup-steps steps, then for --num-steps more while recording a trace of
+env transitions, starting from a checkpoint (see XCSF.record_trace()). The
+trace is then replayed --repeats times: each replay loads the checkpoint
+with a TraceReplayEnv as env and trains for the trace's num steps, so it
+does exactly the learning work of the recorded steps. Trace and checkpoint
+are kept in --trace-dir and reused if already there, so learner
+implementations can be compared on identical traces.
+
+Output (JSON, to --out) has per replay timings, per-phase stats, num
+action mismatches vs the recording (0 unless the learner has diverged from
+the one that recorded the trace) and a digest of the final pop that is
+independent of clfr order in pop; --final-checkpoint also saves the
+replayed learner's final state for closer diffing. --profile writes
+cProfile stats of one replay. Run from the repo root, e.g.:
+    python -m benchmarks.replay --trace-dir /tmp/trace --out replay.json"""
+import argparse
+import cProfile
+import hashlib
+import json
+import os
+import sys
+import time
+
+from xcsfrl.trace import TraceReplayEnv, load_trace, save_trace
+from xcsfrl.xcsf import XCSF
+
+from .run_benchmarks import DEFAULT_SWEEP, make_components
+
+_TRACE_FILE_NAME = "trace.npz"
+_CHECKPOINT_FILE_NAME = "start_checkpoint.npz"
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    config = {name: getattr(args, name) for name in DEFAULT_SWEEP}
+    trace_path = os.path.join(args.trace_dir, _TRACE_FILE_NAME)
+    checkpoint_path = os.path.join(args.trace_dir, _CHECKPOINT_FILE_NAME)
+    if not (os.path.exists(trace_path) and os.path.exists(checkpoint_path)):
+        os.makedirs(args.trace_dir, exist_ok=True)
+        record(config, args.seed, args.warmup_steps, args.num_steps,
+               trace_path, checkpoint_path)
+    trace = load_trace(trace_path)
+
+    replays = []
+    for idx in range(args.repeats):
+        profile_path = (args.profile if idx == 0 else None)
+        (xcsf, replay_env, replay_time) = replay(config, args.seed, trace,
+                                                 checkpoint_path,
+                                                 profile_path)
+        result = {
+            "time": replay_time,
+            "steps_per_sec": (replay_env.num_steps / replay_time),
+            "num_action_mismatches": replay_env.num_action_mismatches,
+            "first_action_mismatch_step_idx":
+            replay_env.first_action_mismatch_step_idx,
+            "pop_digest": calc_pop_digest(xcsf.pop),
+            "phases": xcsf.stats.snapshot()["phases"]
+        }
+        replays.append(result)
+        print(
+            f"[{idx + 1}/{args.repeats}] {result['steps_per_sec']:.0f} "
+            f"steps/s, {result['num_action_mismatches']} action mismatches, "
+            f"pop digest {result['pop_digest']}",
+            file=sys.stderr)
+    if args.final_checkpoint is not None:
+        xcsf.save_checkpoint(args.final_checkpoint)
+
+    output = {
+        "config": config,
+        "num_steps": len(trace.action_idxs),
+        "replays": replays
+    }
+    with open(args.out, "w") as fp:
+        json.dump(output, fp, indent=2)
+
+
+def record(config, seed, warmup_steps, num_steps, trace_path,
+           checkpoint_path):
+    xcsf = XCSF(*make_components(config, seed))
+    xcsf.train_for_time_steps(warmup_steps)
+    trace = xcsf.record_trace(num_steps, checkpoint_path)
+    save_trace(trace_path, trace)
+
+
+def replay(config, seed, trace, checkpoint_path, profile_path=None):
+    (env, encoding, action_selection_strat, pred_strat, _) = \
+        make_components(config, seed)
+    replay_env = TraceReplayEnv(trace, env.obs_space)
+    xcsf = XCSF.load_checkpoint(checkpoint_path,
+                                replay_env,
+                                encoding,
+                                action_selection_strat,
+                                pred_strat,
+                                collect_stats=True)
+    profile = (cProfile.Profile() if profile_path is not None else None)
+    if profile is not None:
+        profile.enable()
+    start_time = time.perf_counter()
+    xcsf.train_for_time_steps(replay_env.num_steps)
+    replay_time = time.perf_counter() - start_time
+    if profile is not None:
+        profile.disable()
+        profile.dump_stats(profile_path)
+    assert replay_env.num_steps_remaining == 0
+    return (xcsf, replay_env, replay_time)
+
+
+def calc_pop_digest(pop):
+    """Hash of all clfrs' state, sorted so it doesn't depend on their order
+    in pop (which e.g. differs between removal strategies)."""
+    rows = sorted(
+        repr((clfr.action, clfr.condition.lower_bounds.tolist(),
+              clfr.condition.upper_bounds.tolist(), clfr.numerosity,
+              clfr.experience, clfr.time_stamp, float(clfr.fitness),
+              float(clfr.error), float(clfr.action_set_size),
+              clfr.weight_vec.tolist())) for clfr in pop)
+    return hashlib.sha1("\n".join(rows).encode("utf-8")).hexdigest()
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Replay a recorded trace to benchmark the learner.")
+    parser.add_argument("--trace-dir", required=True)
+    parser.add_argument("--out", default="replay_results.json")
+    parser.add_argument("--warmup-steps", type=int, default=2000)
+    parser.add_argument("--num-steps", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile",
+                        default=None,
+                        help="Path to write cProfile stats of first replay.")
+    parser.add_argument("--final-checkpoint", default=None)
+    # config of XCSF to record with, as in run_benchmarks (base vals by
+    # default)
+    parser.add_argument("--N", type=int, default=DEFAULT_SWEEP["N"][0])
+    parser.add_argument("--num-dims",
+                        type=int,
+                        default=DEFAULT_SWEEP["num_dims"][0])
+    parser.add_argument("--num-actions",
+                        type=int,
+                        default=DEFAULT_SWEEP["num_actions"][0])
+    parser.add_argument("--poly-order",
+                        type=int,
+                        default=DEFAULT_SWEEP["poly_order"][0])
+    parser.add_argument("--pred",
+                        choices=tuple(DEFAULT_SWEEP["pred"]),
+                        default=DEFAULT_SWEEP["pred"][0])
+    parser.add_argument("--obs",
+                        choices=tuple(DEFAULT_SWEEP["obs"]),
+                        default=DEFAULT_SWEEP["obs"][0])
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main()
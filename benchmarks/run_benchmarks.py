@@ -0,0 +1,306 @@
+"""Benchmark suite for XCSF on the synthetic envs in benchmarks.envs.
+
+For each config (N, num obs dims, num actions, poly order, RLS/NLMS
+prediction, integer/real obs), an XCSF is trained for --warmup-steps steps
+(filling its pop, under tracemalloc to get peak memory) then for
+--num-steps timed steps, after which inference is timed on
+--num-inference-obs random obs. Measured per config:
+    - steps_per_sec, ga_calls_per_sec: training throughput.
+    - batch_inference_obs_per_sec: XCSF.select_actions() over all obs.
+    - single_inference_obs_per_sec: XCSF.select_action() one obs at a time.
+    - peak_mem_bytes: peak traced (Python + numpy) memory over warmup.
+    - phases: per-phase training stats of the timed steps (see
+      xcsfrl.stats).
+By default each swept param is varied one at a time around a base config
+(first value of each list); --full-grid sweeps the cartesian product
+instead.
+
+Results are written as JSON to --out, along with run metadata, so runs can
+be compared (--baseline prints speedups relative to a previous results
+file). Run from the repo root, e.g.:
+    python -m benchmarks.run_benchmarks --out results.json"""
+import argparse
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+from xcsfrl.action_selection import FixedEpsilonGreedy
+from xcsfrl.encoding import (IntegerUnorderedBoundEncoding,
+                             RealUnorderedBoundEncoding)
+from xcsfrl.prediction import (NormalisedLeastMeanSquaresPrediction,
+                               RecursiveLeastSquaresPrediction)
+from xcsfrl.xcsf import XCSF
+
+from .envs import SyntheticIntegerEnv, SyntheticRealEnv
+
+# swept params and their default vals, first val of each being the base
+# config
+DEFAULT_SWEEP = {
+    "N": [500, 2000],
+    "num_dims": [2, 8],
+    "num_actions": [4, 8],
+    "poly_order": [1, 2],
+    "pred": ["rls", "nlms"],
+    "obs": ["integer", "real"]
+}
+_PRED_STRAT_CLS = {
+    "rls": RecursiveLeastSquaresPrediction,
+    "nlms": NormalisedLeastMeanSquaresPrediction
+}
+_BASE_HYPERPARAMS = {
+    "beta": 0.1,
+    "alpha": 0.1,
+    "epsilon_nought": 0.01,
+    "nu": 5,
+    "gamma": 0.9,
+    "theta_ga": 50,
+    "tau": 0.5,
+    "chi": 0.8,
+    "upsilon": 0.5,
+    "mu": 0.05,
+    "theta_del": 50,
+    "delta": 0.1,
+    "theta_sub": 50,
+    "mu_I": 0.0,
+    "epsilon_I": 0.0,
+    "fitness_I": 0.01,
+    "weight_I_min": 0.0,
+    "weight_I_max": 0.0,
+    "x_nought": 10,
+    "beta_epsilon": 0,
+    "do_ga_subsumption": True,
+    "do_as_subsumption": True,
+    "p_explr": 0.5,
+    "delta_rls": 1000,
+    "lambda_rls": 1.0,
+    "tau_rls": 0,
+    "eta": 0.1
+}
+# covering/mutation ranges are in obs units for integer obs, fractions of
+# dim span for real obs
+_OBS_HYPERPARAMS = {
+    "integer": {
+        "r_nought": 2,
+        "m_nought": 1
+    },
+    "real": {
+        "r_nought": 0.25,
+        "m_nought": 0.1
+    }
+}
+_NUM_SINGLE_INFERENCE_OBS_MAX = 1000
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    sweep = {name: getattr(args, name) for name in DEFAULT_SWEEP}
+    configs = (_gen_grid_configs(sweep)
+               if args.full_grid else _gen_one_at_a_time_configs(sweep))
+    results = []
+    for (idx, config) in enumerate(configs):
+        result = run_benchmark(config,
+                               warmup_steps=args.warmup_steps,
+                               num_steps=args.num_steps,
+                               num_inference_obs=args.num_inference_obs,
+                               seed=args.seed)
+        results.append(result)
+        print(f"[{idx + 1}/{len(configs)}] {_format_result(result)}",
+              file=sys.stderr)
+    output = {"meta": _gen_meta(args), "results": results}
+    with open(args.out, "w") as fp:
+        json.dump(output, fp, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline, "r") as fp:
+            baseline = json.load(fp)
+        _print_comparison(baseline["results"], results)
+
+
+def run_benchmark(config, warmup_steps, num_steps, num_inference_obs, seed):
+    xcsf = _make_xcsf(config, seed)
+
+    tracemalloc.start()
+    try:
+        xcsf.train_for_time_steps(warmup_steps)
+        (_, peak_mem_bytes) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    xcsf.stats.reset()
+    num_ga_calls_before = xcsf._num_ga_calls
+    start_time = time.perf_counter()
+    xcsf.train_for_time_steps(num_steps)
+    train_time = time.perf_counter() - start_time
+    num_ga_calls = xcsf._num_ga_calls - num_ga_calls_before
+    phases = xcsf.stats.snapshot()["phases"]
+
+    obs_arr = xcsf._env.sample_obs(num_inference_obs,
+                                   np.random.default_rng(seed))
+    start_time = time.perf_counter()
+    xcsf.select_actions(obs_arr)
+    batch_inference_time = time.perf_counter() - start_time
+    single_obs_arr = obs_arr[:_NUM_SINGLE_INFERENCE_OBS_MAX]
+    start_time = time.perf_counter()
+    for obs in single_obs_arr:
+        xcsf.select_action(obs)
+    single_inference_time = time.perf_counter() - start_time
+
+    return {
+        "config": dict(config),
+        "num_macros": xcsf.pop.num_macros,
+        "num_micros": xcsf.pop.num_micros,
+        "steps_per_sec": (num_steps / train_time),
+        "ga_calls_per_sec": (num_ga_calls / train_time),
+        "batch_inference_obs_per_sec":
+        (len(obs_arr) / batch_inference_time),
+        "single_inference_obs_per_sec":
+        (len(single_obs_arr) / single_inference_time),
+        "peak_mem_bytes": peak_mem_bytes,
+        "phases": phases
+    }
+
+
+def make_components(config, seed):
+    """Env, encoding, action selection strat, prediction strat and
+    hyperparams dict for XCSF on given benchmark config."""
+    if config["obs"] == "integer":
+        env = SyntheticIntegerEnv(config["num_dims"],
+                                  config["num_actions"],
+                                  seed=seed)
+        encoding = IntegerUnorderedBoundEncoding(env.obs_space)
+    else:
+        assert config["obs"] == "real"
+        env = SyntheticRealEnv(config["num_dims"],
+                               config["num_actions"],
+                               seed=seed)
+        encoding = RealUnorderedBoundEncoding(env.obs_space)
+    pred_strat = _PRED_STRAT_CLS[config["pred"]](config["poly_order"])
+    hyperparams_dict = {
+        **_BASE_HYPERPARAMS,
+        **_OBS_HYPERPARAMS[config["obs"]], "N": config["N"],
+        "seed": seed
+    }
+    return (env, encoding, FixedEpsilonGreedy(env.action_space), pred_strat,
+            hyperparams_dict)
+
+
+def _make_xcsf(config, seed):
+    return XCSF(*make_components(config, seed), collect_stats=True)
+
+
+def _gen_one_at_a_time_configs(sweep):
+    base_config = {name: vals[0] for (name, vals) in sweep.items()}
+    configs = [base_config]
+    for (name, vals) in sweep.items():
+        for val in vals[1:]:
+            configs.append({**base_config, name: val})
+    return configs
+
+
+def _gen_grid_configs(sweep):
+    names = list(sweep)
+    return [
+        dict(zip(names, vals))
+        for vals in itertools.product(*(sweep[name] for name in names))
+    ]
+
+
+def _gen_meta(args):
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _get_git_commit(),
+        "python_version": platform.python_version(),
+        "numpy_version": np.__version__,
+        "platform": platform.platform(),
+        "args": vars(args)
+    }
+
+
+def _get_git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"],
+                              capture_output=True,
+                              text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format_result(result):
+    config_str = " ".join(f"{name}={val}"
+                          for (name, val) in result["config"].items())
+    return (f"{config_str}: {result['steps_per_sec']:.0f} steps/s, "
+            f"{result['ga_calls_per_sec']:.0f} GA calls/s, "
+            f"{result['batch_inference_obs_per_sec']:.0f} batch obs/s, "
+            f"{result['single_inference_obs_per_sec']:.0f} single obs/s, "
+            f"{result['peak_mem_bytes'] / 2**20:.1f} MiB peak")
+
+
+def _print_comparison(baseline_results, results):
+    """Prints ratio of each throughput metric to that of baseline for
+    configs present in both."""
+    metrics = ("steps_per_sec", "ga_calls_per_sec",
+               "batch_inference_obs_per_sec", "single_inference_obs_per_sec")
+    baseline_by_config = {
+        json.dumps(result["config"], sort_keys=True): result
+        for result in baseline_results
+    }
+    for result in results:
+        baseline = baseline_by_config.get(
+            json.dumps(result["config"], sort_keys=True))
+        if baseline is None:
+            continue
+        config_str = " ".join(f"{name}={val}"
+                              for (name, val) in result["config"].items())
+        ratios_str = ", ".join(
+            f"{metric} x{result[metric] / baseline[metric]:.2f}"
+            for metric in metrics)
+        print(f"{config_str}: {ratios_str}")
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Benchmark XCSF on synthetic envs.")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline",
+                        default=None,
+                        help="Previous results file to compare against.")
+    parser.add_argument("--warmup-steps", type=int, default=2000)
+    parser.add_argument("--num-steps", type=int, default=2000)
+    parser.add_argument("--num-inference-obs", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--full-grid", action="store_true")
+    parser.add_argument("--N",
+                        nargs="+",
+                        type=int,
+                        default=DEFAULT_SWEEP["N"])
+    parser.add_argument("--num-dims",
+                        nargs="+",
+                        type=int,
+                        default=DEFAULT_SWEEP["num_dims"])
+    parser.add_argument("--num-actions",
+                        nargs="+",
+                        type=int,
+                        default=DEFAULT_SWEEP["num_actions"])
+    parser.add_argument("--poly-order",
+                        nargs="+",
+                        type=int,
+                        default=DEFAULT_SWEEP["poly_order"])
+    parser.add_argument("--pred",
+                        nargs="+",
+                        choices=tuple(_PRED_STRAT_CLS),
+                        default=DEFAULT_SWEEP["pred"])
+    parser.add_argument("--obs",
+                        nargs="+",
+                        choices=tuple(_OBS_HYPERPARAMS),
+                        default=DEFAULT_SWEEP["obs"])
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main()
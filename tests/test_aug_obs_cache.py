@@ -0,0 +1,50 @@
+import numpy as np
+
+from xcsfrl.aug_obs_cache import AugObsCache
+from xcsfrl.prediction import NormalisedLeastMeanSquaresPrediction
+
+_X_NOUGHT = 10
+
+
+def _make_cache(max_size):
+    pred_strat = NormalisedLeastMeanSquaresPrediction(poly_order=1)
+    return (AugObsCache(pred_strat, _X_NOUGHT, max_size), pred_strat)
+
+
+def test_get_many_does_not_evict_hit_rows_of_same_call():
+    (cache, pred_strat) = _make_cache(max_size=3)
+    (a, b, c, d) = [np.array([float(i), -float(i)]) for i in range(4)]
+    for obs in (a, b, c):
+        cache.get(obs)
+    # a hits on row 0, which is next to be evicted, so d's miss must not
+    # overwrite it
+    aug_obs_arr = cache.get_many([a, d])
+    assert np.array_equal(aug_obs_arr[0], pred_strat.aug_obs(a, _X_NOUGHT))
+    assert np.array_equal(aug_obs_arr[1], pred_strat.aug_obs(d, _X_NOUGHT))
+    assert cache.num_hits == 1
+    assert cache.num_misses == 4
+
+
+def test_get_many_fills_misses_around_multiple_hit_rows():
+    (cache, pred_strat) = _make_cache(max_size=4)
+    obs_list = [np.array([float(i)]) for i in range(6)]
+    for obs in obs_list[:4]:
+        cache.get(obs)
+    batch = [obs_list[1], obs_list[4], obs_list[0], obs_list[5]]
+    aug_obs_arr = cache.get_many(batch)
+    for (obs, aug_obs) in zip(batch, aug_obs_arr):
+        assert np.array_equal(aug_obs, pred_strat.aug_obs(obs, _X_NOUGHT))
+
+
+def test_get_is_keyed_on_obs_contents():
+    (cache, pred_strat) = _make_cache(max_size=2)
+    obs = np.array([1.0, 2.0])
+    cache.get(obs)
+    # env modifying its obs array in place must not get stale aug obs
+    obs[:] = [3.0, 4.0]
+    (aug_obs, _) = cache.get(obs)
+    assert np.array_equal(aug_obs, pred_strat.aug_obs(obs, _X_NOUGHT))
+    assert cache.num_misses == 2
+    # equal contents in a different array hit
+    cache.get(np.array([1.0, 2.0]))
+    assert cache.num_hits == 1
@@ -0,0 +1,181 @@
+import copy
+
+import numpy as np
+import pytest
+
+pytest.importorskip("rlenvs")
+
+from benchmarks.run_benchmarks import make_components  # noqa: E402
+from xcsfrl.xcsf import XCSF  # noqa: E402
+
+_NUM_GA_CALLS_BEFORE_SAVE = 60
+_NUM_GA_CALLS_AFTER_SAVE = 60
+
+
+def _make_config(obs, pred="rls", N=200):
+    return {
+        "N": N,
+        "num_dims": 2,
+        "num_actions": 4,
+        "poly_order": 1,
+        "pred": pred,
+        "obs": obs
+    }
+
+
+def _clfr_state(clfr):
+    return (clfr.action, str(clfr.condition), clfr.numerosity,
+            clfr.experience, clfr.time_stamp, clfr.fitness, clfr.error,
+            clfr.niche_min_error, clfr.action_set_size,
+            tuple(np.asarray(clfr.weight_vec).tolist()))
+
+
+def _xcsf_state(xcsf):
+    return ([_clfr_state(clfr) for clfr in xcsf.pop], xcsf.pop.num_micros,
+            dict(xcsf.pop.ops_history), xcsf._time_step,
+            xcsf._episodes_trained, xcsf._num_ga_calls)
+
+
+@pytest.mark.parametrize("obs", ["integer", "real"])
+@pytest.mark.parametrize("num_envs", [1, 4])
+def test_resume_after_lockstep_training_matches_uninterrupted(
+        tmp_path, obs, num_envs):
+    config = _make_config(obs)
+    (env, encoding, action_selection_strat, pred_strat,
+     hyperparams_dict) = make_components(config, seed=0)
+    lockstep_envs = [
+        make_components(config, seed)[0] for seed in range(1, num_envs + 1)
+    ]
+    xcsf = XCSF(env, encoding, action_selection_strat, pred_strat,
+                hyperparams_dict)
+    xcsf.train_lockstep_for_ga_calls(lockstep_envs,
+                                     _NUM_GA_CALLS_BEFORE_SAVE)
+    path = tmp_path / "checkpoint.npz"
+    xcsf.save_checkpoint(path)
+    (env_copy, lockstep_envs_copy) = copy.deepcopy((env, lockstep_envs))
+
+    xcsf.train_lockstep_for_ga_calls(lockstep_envs, _NUM_GA_CALLS_AFTER_SAVE)
+    resumed = XCSF.load_checkpoint(path,
+                                   env_copy,
+                                   encoding,
+                                   action_selection_strat,
+                                   pred_strat,
+                                   lockstep_envs=lockstep_envs_copy)
+    resumed.train_lockstep_for_ga_calls(lockstep_envs_copy,
+                                        _NUM_GA_CALLS_AFTER_SAVE)
+    assert _xcsf_state(resumed) == _xcsf_state(xcsf)
+
+
+def _env_states(xcsf):
+    return [xcsf._env_state] + list(xcsf._lockstep_env_states or [])
+
+
+def _make_orphans(xcsf):
+    """Removes a member of the first pending [A] from pop and puts it in the
+    [A]s of all other env states too, so it is an orphan shared between
+    them, as when several envs act in the same niche. Returns it."""
+    env_states = [
+        state for state in _env_states(xcsf)
+        if state.prev_action_set is not None
+    ]
+    assert len(env_states) >= 2
+    orphan = next(clfr for clfr in env_states[0].prev_action_set
+                  if clfr.owner is xcsf.pop)
+    xcsf.pop.remove(orphan, op="deletion")
+    for state in env_states[1:]:
+        if not any(clfr is orphan for clfr in state.prev_action_set):
+            state.prev_action_set.append(orphan)
+    return orphan
+
+
+def _obs_state(obs):
+    return (tuple(np.asarray(obs).tolist()) if obs is not None else None)
+
+
+def _env_state_state(env_state, pop):
+    if env_state.prev_action_set is not None:
+        members = set(id(clfr) for clfr in pop)
+        prev_action_set = [(_clfr_state(clfr), id(clfr) in members,
+                            tuple(np.asarray(clfr.cov_mat).ravel().tolist()))
+                           for clfr in env_state.prev_action_set]
+    else:
+        prev_action_set = None
+    return (_obs_state(env_state.curr_obs), _obs_state(env_state.prev_obs),
+            prev_action_set, env_state.prev_reward,
+            env_state.action_selection_mode)
+
+
+@pytest.mark.parametrize("obs", ["integer", "real"])
+def test_round_trip_keeps_lockstep_env_states_and_orphans(tmp_path, obs):
+    config = _make_config(obs)
+    (env, encoding, action_selection_strat, pred_strat,
+     hyperparams_dict) = make_components(config, seed=0)
+    lockstep_envs = [make_components(config, seed)[0] for seed in (1, 2, 3)]
+    xcsf = XCSF(env, encoding, action_selection_strat, pred_strat,
+                hyperparams_dict)
+    # single env training leaves main env state pending alongside the
+    # lock-step ones
+    xcsf.train_for_ga_calls(_NUM_GA_CALLS_BEFORE_SAVE)
+    xcsf.train_lockstep_for_ga_calls(lockstep_envs,
+                                     _NUM_GA_CALLS_BEFORE_SAVE)
+    orphan = _make_orphans(xcsf)
+    path = tmp_path / "checkpoint.npz"
+    xcsf.save_checkpoint(path)
+    (env_copy, lockstep_envs_copy) = copy.deepcopy((env, lockstep_envs))
+
+    resumed = XCSF.load_checkpoint(path,
+                                   env_copy,
+                                   encoding,
+                                   action_selection_strat,
+                                   pred_strat,
+                                   lockstep_envs=lockstep_envs_copy)
+    assert _xcsf_state(resumed) == _xcsf_state(xcsf)
+    assert ([_env_state_state(state, resumed.pop)
+             for state in _env_states(resumed)] == [
+                 _env_state_state(state, xcsf.pop)
+                 for state in _env_states(xcsf)
+             ])
+    # members of pending [A]s are the restored pop's clfrs, and each orphan
+    # is restored once, outside pop, and shared between [A]s
+    resumed_members = set(id(clfr) for clfr in resumed.pop)
+    restored_orphans = {}
+    for (state, resumed_state) in zip(_env_states(xcsf),
+                                      _env_states(resumed)):
+        if state.prev_action_set is None:
+            continue
+        for (clfr, resumed_clfr) in zip(state.prev_action_set,
+                                        resumed_state.prev_action_set):
+            if clfr.owner is xcsf.pop:
+                assert id(resumed_clfr) in resumed_members
+                assert resumed_clfr.owner is resumed.pop
+            else:
+                assert resumed_clfr.owner is None
+                assert restored_orphans.setdefault(
+                    id(clfr), resumed_clfr) is resumed_clfr
+    assert id(orphan) in restored_orphans
+    assert (len(set(map(id, restored_orphans.values()))) == len(
+        restored_orphans))
+
+    # pending [A]s with orphans are updated the same after resuming
+    xcsf.train_lockstep_for_ga_calls(lockstep_envs, _NUM_GA_CALLS_AFTER_SAVE)
+    resumed.train_lockstep_for_ga_calls(lockstep_envs_copy,
+                                        _NUM_GA_CALLS_AFTER_SAVE)
+    assert _xcsf_state(resumed) == _xcsf_state(xcsf)
+
+
+def test_load_without_lockstep_envs_drops_lockstep_env_states(tmp_path):
+    config = _make_config("integer")
+    (env, encoding, action_selection_strat, pred_strat,
+     hyperparams_dict) = make_components(config, seed=0)
+    lockstep_envs = [make_components(config, seed)[0] for seed in (1, 2)]
+    xcsf = XCSF(env, encoding, action_selection_strat, pred_strat,
+                hyperparams_dict)
+    xcsf.train_lockstep_for_ga_calls(lockstep_envs,
+                                     _NUM_GA_CALLS_BEFORE_SAVE)
+    path = tmp_path / "checkpoint.npz"
+    xcsf.save_checkpoint(path)
+
+    resumed = XCSF.load_checkpoint(path, copy.deepcopy(env), encoding,
+                                   action_selection_strat, pred_strat)
+    assert resumed._lockstep_env_states is None
+    assert _xcsf_state(resumed) == _xcsf_state(xcsf)
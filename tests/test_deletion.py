@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("rlenvs")
+
+from benchmarks.run_benchmarks import make_components  # noqa: E402
+from xcsfrl.deletion import select_row_to_delete  # noqa: E402
+from xcsfrl.hyperparams import Hyperparams  # noqa: E402
+from xcsfrl.xcsf import XCSF  # noqa: E402
+
+_NUM_GA_CALLS = 30
+_NUM_SPINS = 200
+
+
+def _make_trained_xcsf():
+    config = {
+        "N": 100,
+        "num_dims": 2,
+        "num_actions": 4,
+        "poly_order": 1,
+        "pred": "rls",
+        "obs": "real"
+    }
+    xcsf = XCSF(*make_components(config, seed=0))
+    xcsf.train_for_ga_calls(_NUM_GA_CALLS)
+    return xcsf
+
+
+def _make_experienced(xcsf):
+    for clfr in xcsf.pop:
+        clfr.experience = xcsf.hyperparams.theta_del + 1
+
+
+@pytest.mark.parametrize("delta", [0.1, 1.5])
+def test_zero_fitness_clfr_gets_no_vote_increase(delta):
+    xcsf = _make_trained_xcsf()
+    _make_experienced(xcsf)
+    pop = xcsf.pop
+    zero_clfr = pop[0]
+    zero_clfr.fitness = 0.0
+    hyperparams = Hyperparams({**xcsf.hyperparams.as_dict(), "delta": delta})
+    increased_vote_sum = sum(
+        clfr.deletion_vote / clfr.numerosity_scaled_fitness for clfr in pop
+        if clfr is not zero_clfr)
+    assert pop.increased_vote_sum == pytest.approx(increased_vote_sum)
+
+    rng = np.random.default_rng(0)
+    for _ in range(_NUM_SPINS):
+        row = select_row_to_delete(pop, hyperparams, rng)
+        assert 0 <= row < pop.num_macros
+
+
+def test_all_zero_fitnesses_give_base_votes_only():
+    xcsf = _make_trained_xcsf()
+    _make_experienced(xcsf)
+    pop = xcsf.pop
+    pop.write_params(np.arange(pop.num_macros),
+                     fitness=np.zeros(pop.num_macros))
+    for clfr in pop:
+        clfr.fitness = 0.0
+    assert pop.increased_vote_sum == 0.0
+
+    rng = np.random.default_rng(0)
+    for _ in range(_NUM_SPINS):
+        row = select_row_to_delete(pop, xcsf.hyperparams, rng)
+        assert 0 <= row < pop.num_macros
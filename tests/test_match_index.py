@@ -0,0 +1,101 @@
+import itertools
+
+import numpy as np
+import pytest
+
+pytest.importorskip("rlenvs")
+
+from benchmarks.envs import SyntheticIntegerEnv, SyntheticRealEnv  # noqa: E402
+from xcsfrl.condition import Condition  # noqa: E402
+from xcsfrl.encoding import (IntegerUnorderedBoundEncoding,  # noqa: E402
+                             RealUnorderedBoundEncoding)
+from xcsfrl.match_index import (IntegerBitsetMatchIndex,  # noqa: E402
+                                RealGridMatchIndex)
+
+_NUM_DIMS = 3
+_INTEGER_SIZE = 6
+# more than one word's worth of slots, so slot capacity has to grow
+_NUM_SLOTS = 150
+_NUM_REAL_QUERIES = 500
+
+
+def _gen_condition(encoding, rng):
+    alleles = []
+    for dim in encoding.obs_space:
+        if isinstance(dim.lower, int):
+            alleles.extend(
+                rng.integers(dim.lower, (dim.upper + 1), size=2).tolist())
+        else:
+            alleles.extend(rng.uniform(dim.lower, dim.upper, size=2).tolist())
+    return Condition(alleles, encoding)
+
+
+def _brute_force_match(conditions, obs):
+    return sorted(slot for (slot, condition) in conditions.items()
+                  if np.all(condition.lower_bounds <= obs)
+                  and np.all(condition.upper_bounds >= obs))
+
+
+def _populate(index, encoding, rng):
+    """Adds conditions to all slots, then removes some and replaces the
+    conditions of others, as Population does. Returns {slot: condition} of
+    what should be in index."""
+    conditions = {}
+    for slot in range(_NUM_SLOTS):
+        conditions[slot] = _gen_condition(encoding, rng)
+        index.add(slot, conditions[slot])
+    for slot in rng.choice(_NUM_SLOTS, size=(_NUM_SLOTS // 3),
+                           replace=False).tolist():
+        index.remove(slot)
+        if rng.random() < 0.5:
+            del conditions[slot]
+        else:
+            conditions[slot] = _gen_condition(encoding, rng)
+            index.add(slot, conditions[slot])
+    return conditions
+
+
+def test_integer_bitset_index_matches_brute_force():
+    rng = np.random.default_rng(0)
+    obs_space = SyntheticIntegerEnv(_NUM_DIMS, num_actions=2,
+                                    size=_INTEGER_SIZE).obs_space
+    encoding = IntegerUnorderedBoundEncoding(obs_space)
+    index = IntegerBitsetMatchIndex(obs_space)
+    assert index.is_exact
+    conditions = _populate(index, encoding, rng)
+
+    # every obs in the space
+    for obs in itertools.product(range(_INTEGER_SIZE), repeat=_NUM_DIMS):
+        obs = np.array(obs)
+        assert (index.query(obs).tolist() == _brute_force_match(
+            conditions, obs))
+
+
+def test_integer_bitset_index_is_empty_outside_obs_space():
+    rng = np.random.default_rng(1)
+    obs_space = SyntheticIntegerEnv(_NUM_DIMS, num_actions=2,
+                                    size=_INTEGER_SIZE).obs_space
+    encoding = IntegerUnorderedBoundEncoding(obs_space)
+    index = IntegerBitsetMatchIndex(obs_space)
+    _populate(index, encoding, rng)
+    for obs in ([-1, 0, 0], [0, _INTEGER_SIZE, 0]):
+        assert len(index.query(np.array(obs))) == 0
+
+
+def test_real_grid_index_candidates_contain_brute_force_matches():
+    rng = np.random.default_rng(2)
+    obs_space = SyntheticRealEnv(_NUM_DIMS, num_actions=2).obs_space
+    encoding = RealUnorderedBoundEncoding(obs_space)
+    index = RealGridMatchIndex(obs_space, num_bins_per_dim=4)
+    assert not index.is_exact
+    conditions = _populate(index, encoding, rng)
+
+    # include obs on the bounds of the obs space
+    obs_arr = np.concatenate((rng.uniform(0.0, 1.0, size=(_NUM_REAL_QUERIES,
+                                                          _NUM_DIMS)),
+                              np.zeros((1, _NUM_DIMS)),
+                              np.ones((1, _NUM_DIMS))))
+    for obs in obs_arr:
+        candidates = set(index.query(obs).tolist())
+        assert candidates <= set(conditions)
+        assert set(_brute_force_match(conditions, obs)) <= candidates
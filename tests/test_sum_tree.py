@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from xcsfrl.sum_tree import SumTree
+
+_NUM_LEAVES = 37
+_NUM_FINDS = 500
+
+
+def _brute_force_find(leaf_vals, cum_val):
+    # first non-zero leaf whose cumsum exceeds cum_val
+    cum_vals = np.cumsum(leaf_vals)
+    for (idx, (leaf_val, cum)) in enumerate(zip(leaf_vals, cum_vals)):
+        if leaf_val > 0 and cum_val < cum:
+            return idx
+    return None
+
+
+def _gen_leaf_vals(rng, num_leaves):
+    # include zero leaves, since find() must skip them
+    leaf_vals = rng.uniform(0, 1, size=num_leaves)
+    leaf_vals[rng.random(num_leaves) < 0.3] = 0.0
+    return leaf_vals
+
+
+def _assert_matches_brute_force(tree, leaf_vals, rng):
+    assert tree.total == pytest.approx(np.sum(leaf_vals))
+    for (idx, leaf_val) in enumerate(leaf_vals):
+        assert tree[idx] == leaf_val
+    cum_vals = np.cumsum(leaf_vals)
+    # cum vals away from leaf boundaries, so rounding in node sums can't
+    # move them into a neighbouring leaf
+    for cum_val in rng.uniform(0, tree.total, size=_NUM_FINDS):
+        dists = np.abs(cum_vals - cum_val)
+        if np.min(dists) > 1e-9:
+            assert tree.find(cum_val) == _brute_force_find(leaf_vals, cum_val)
+
+
+def test_update_matches_brute_force():
+    rng = np.random.default_rng(0)
+    tree = SumTree(_NUM_LEAVES)
+    leaf_vals = np.zeros(_NUM_LEAVES)
+    for (idx, val) in zip(rng.integers(0, _NUM_LEAVES, size=200),
+                          _gen_leaf_vals(rng, 200)):
+        tree.update(idx, val)
+        leaf_vals[idx] = val
+    _assert_matches_brute_force(tree, leaf_vals, rng)
+
+
+def test_update_many_matches_brute_force():
+    rng = np.random.default_rng(1)
+    tree = SumTree(_NUM_LEAVES)
+    leaf_vals = np.zeros(_NUM_LEAVES)
+    for _ in range(20):
+        idxs = rng.choice(_NUM_LEAVES, size=rng.integers(1, _NUM_LEAVES),
+                          replace=False)
+        vals = _gen_leaf_vals(rng, len(idxs))
+        tree.update_many(idxs, vals)
+        leaf_vals[idxs] = vals
+        _assert_matches_brute_force(tree, leaf_vals, rng)
+
+
+def test_rebuild_matches_brute_force():
+    rng = np.random.default_rng(2)
+    tree = SumTree(_NUM_LEAVES)
+    tree.update_many(np.arange(_NUM_LEAVES), np.ones(_NUM_LEAVES))
+    leaf_vals = _gen_leaf_vals(rng, _NUM_LEAVES - 5)
+    tree.rebuild(leaf_vals)
+    # leaves past those given are zeroed
+    _assert_matches_brute_force(tree, np.concatenate(
+        (leaf_vals, np.zeros(tree.capacity - len(leaf_vals)))), rng)
+
+
+def test_grow_keeps_leaves():
+    rng = np.random.default_rng(3)
+    tree = SumTree(_NUM_LEAVES)
+    leaf_vals = _gen_leaf_vals(rng, _NUM_LEAVES)
+    tree.update_many(np.arange(_NUM_LEAVES), leaf_vals)
+    old_capacity = tree.capacity
+    tree.grow(3 * _NUM_LEAVES)
+    assert tree.capacity >= 3 * _NUM_LEAVES
+    assert tree.capacity > old_capacity
+    leaf_vals = np.concatenate(
+        (leaf_vals, np.zeros(tree.capacity - _NUM_LEAVES)))
+    _assert_matches_brute_force(tree, leaf_vals, rng)
+
+    # new leaves are usable after growing
+    new_vals = _gen_leaf_vals(rng, 2 * _NUM_LEAVES)
+    new_idxs = np.arange(_NUM_LEAVES, 3 * _NUM_LEAVES)
+    tree.update_many(new_idxs, new_vals)
+    leaf_vals[new_idxs] = new_vals
+    _assert_matches_brute_force(tree, leaf_vals, rng)
+
+
+def test_capacity_is_pow2():
+    for capacity in (0, 1, 2, 3, 5, 64, 65):
+        tree = SumTree(capacity)
+        assert tree.capacity >= max(capacity, 1)
+        assert tree.capacity & (tree.capacity - 1) == 0
+
+
+def test_find_never_returns_zero_leaf():
+    tree = SumTree(8)
+    tree.update_many([2, 5], [1.0, 2.0])
+    # cum vals at and just past the total, as rounding can give, land on the
+    # last non-zero leaf rather than the zero leaves after it
+    assert tree.find(0.0) == 2
+    assert tree.find(1.0) == 5
+    assert tree.find(3.0) == 5
+    assert tree.find(3.0 + 1e-12) == 5
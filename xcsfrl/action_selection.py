@@ -2,17 +2,14 @@ import abc
 from collections import OrderedDict
 from enum import Enum
 
-from .hyperparams import get_hyperparam as get_hp
-from .rng import get_rng
-
 NULL_ACTION = -1
 
 ActionSelectionModes = Enum("ActionSelectionModes", ["explore", "exploit"])
 
 
-def choose_action_selection_mode():
+def choose_action_selection_mode(rng):
     # 50/50 chance of either explore/exploit on episode start
-    return get_rng().choice(list(iter(ActionSelectionModes)))
+    return rng.choice(list(iter(ActionSelectionModes)))
 
 
 def greedy_action_selection(prediction_arr):
@@ -26,10 +23,10 @@ def filter_null_prediction_arr_entries(prediction_arr):
          for (a, p) in prediction_arr.items() if p is not None})
 
 
-def _epsilon_greedy(epsilon, action_space, prediction_arr):
-    should_explore = get_rng().random() < epsilon
+def _epsilon_greedy(epsilon, action_space, prediction_arr, rng):
+    should_explore = rng.random() < epsilon
     if should_explore:
-        return get_rng().choice(action_space)
+        return rng.choice(action_space)
     else:
         return greedy_action_selection(prediction_arr)
 
@@ -39,14 +36,15 @@ class ActionSelectionStrategyABC(metaclass=abc.ABCMeta):
         self._action_space = action_space
 
     @abc.abstractmethod
-    def __call__(self, prediction_arr, num_ga_calls=None):
+    def __call__(self, prediction_arr, hyperparams, rng, num_ga_calls=None):
         raise NotImplementedError
 
 
 class FixedEpsilonGreedy(ActionSelectionStrategyABC):
-    def __call__(self, prediction_arr, num_ga_calls=None):
-        epsilon = get_hp("p_explr")
-        return _epsilon_greedy(epsilon, self._action_space, prediction_arr)
+    def __call__(self, prediction_arr, hyperparams, rng, num_ga_calls=None):
+        epsilon = hyperparams.p_explr
+        return _epsilon_greedy(epsilon, self._action_space, prediction_arr,
+                               rng)
 
 
 class LinearDecayEpsilonGreedy(ActionSelectionStrategyABC):
@@ -70,10 +68,10 @@ class LinearDecayEpsilonGreedy(ActionSelectionStrategyABC):
         assert m < 0
         return m
 
-    def __call__(self, prediction_arr, num_ga_calls):
+    def __call__(self, prediction_arr, hyperparams, rng, num_ga_calls):
         self._epsilon = self._decay_epsilon(num_ga_calls)
         return _epsilon_greedy(self._epsilon, self._action_space,
-                               prediction_arr)
+                               prediction_arr, rng)
 
     def _decay_epsilon(self, num_ga_calls):
         # y = mx + c
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class AugObsCache:
+    """Small FIFO cache of augmented obs (and their processed versions, see
+    PredictionStrategyABC.process_aug_obs()) used during training, so that
+    each obs is augmented once even though it is needed on two steps: for
+    the prediction array on the step it is acted on, and for the delayed
+    update of that step's [A] on the next.
+
+    Entries are keyed on the contents of obs: each cached obs is copied in,
+    and looked up by comparing contents, so an env that modifies its obs
+    array in place between steps (rather than returning a fresh one) gets a
+    miss, not the aug obs of what the array used to hold.
+
+    Obs and aug obs are written into rows of two buffers preallocated on
+    first use, which are reused in FIFO order; returned aug obs are views of
+    these rows, so are only valid until max_size more obs have been
+    cached."""
+    def __init__(self, pred_strat, x_nought, max_size):
+        max_size = int(max_size)
+        assert max_size >= 1
+        self._pred_strat = pred_strat
+        self._x_nought = x_nought
+        self._max_size = max_size
+        self._buf = None
+        self._obs_buf = None
+        self._num_filled = 0
+        self._proc_obs = [None] * max_size
+        self._next_row = 0
+        self._num_hits = 0
+        self._num_misses = 0
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @property
+    def num_hits(self):
+        return self._num_hits
+
+    @property
+    def num_misses(self):
+        return self._num_misses
+
+    def get(self, obs):
+        """Returns (aug_obs, proc_obs) for obs."""
+        row = self._get_row(obs)
+        return (self._buf[row], self._proc_obs[row])
+
+    def get_many(self, obs_arr):
+        """Returns (K x d) array of aug obs for each of K obs in obs_arr
+        (copied out of buffer, so not invalidated by later gets)."""
+        # rows of earlier obs (hits as well as misses) are pinned so that
+        # misses of later obs can't evict them before they are copied out,
+        # which needs a free row for every obs
+        assert len(obs_arr) <= self._max_size
+        rows = []
+        for obs in obs_arr:
+            rows.append(self._get_row(obs, pinned_rows=rows))
+        return self._buf[rows]
+
+    def _get_row(self, obs, pinned_rows=()):
+        # cache is small (two entries per env trained on), so comparing obs
+        # against all filled rows at once is cheaper than hashing them
+        if self._num_filled > 0:
+            is_equal = (self._obs_buf[:self._num_filled] == obs).all(axis=1)
+            rows = np.flatnonzero(is_equal)
+            if len(rows) > 0:
+                self._num_hits += 1
+                return rows[0]
+        self._num_misses += 1
+        if self._buf is None:
+            aug_len = self._pred_strat.calc_aug_len(len(obs))
+            self._buf = np.empty((self._max_size, aug_len))
+            self._obs_buf = np.empty((self._max_size, len(obs)))
+        row = self._next_row
+        # pinned rows are all filled, so are only skipped once cache is full,
+        # hence filled rows stay contiguous
+        while row in pinned_rows:
+            row = (row + 1) % self._max_size
+        self._next_row = (row + 1) % self._max_size
+        self._num_filled = min(self._num_filled + 1, self._max_size)
+        aug_obs = self._pred_strat.aug_obs(obs,
+                                           self._x_nought,
+                                           out=self._buf[row])
+        self._obs_buf[row] = obs
+        self._proc_obs[row] = self._pred_strat.process_aug_obs(aug_obs)
+        return row
+
+    def clear(self):
+        self._num_filled = 0
+        self._proc_obs = [None] * self._max_size
+        self._next_row = 0
@@ -9,24 +9,74 @@ def make_aug_strat(poly_order):
     elif poly_order == 2:
         return QuadraticAugmentation()
     else:
-        assert False
+        return PolynomialAugmentation(poly_order)
 
 
 class AugmentationStratABC(metaclass=abc.ABCMeta):
     @abc.abstractmethod
-    def __call__(self, obs, x_nought):
+    def calc_aug_len(self, num_features):
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def __call__(self, obs, x_nought, out=None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def aug_many(self, obs_arr, x_nought, out=None):
+        raise NotImplementedError
+
+
+class PolynomialAugmentation(AugmentationStratABC):
+    """Augments obs [o_1, ..., o_n] to [x_nought, o_1, o_1^2, ..., o_1^k, o_2,
+    ..., o_n^k] for poly order k, as float64. Powers of all dims are built up
+    together by repeated multiplication (so k array ops per obs, or per batch
+    of obs, rather than a Python loop over elems), written straight into the
+    output array, which can be a preallocated buffer given as out."""
+    def __init__(self, poly_order):
+        poly_order = int(poly_order)
+        assert poly_order >= 1
+        self._poly_order = poly_order
+
+    @property
+    def poly_order(self):
+        return self._poly_order
+
+    def calc_aug_len(self, num_features):
+        return (self._poly_order * num_features + 1)
+
+    def __call__(self, obs, x_nought, out=None):
+        obs = np.asarray(obs)
+        if out is None:
+            out = np.empty(self.calc_aug_len(len(obs)))
+        out[0] = x_nought
+        self._write_powers(obs, out)
+        return out
+
+    def aug_many(self, obs_arr, x_nought, out=None):
+        """Batch __call__() for each row of (M x n) obs_arr, giving an (M x
+        (kn + 1)) array."""
+        obs_arr = np.asarray(obs_arr)
+        (num_obs, num_features) = obs_arr.shape
+        if out is None:
+            out = np.empty((num_obs, self.calc_aug_len(num_features)))
+        out[:, 0] = x_nought
+        self._write_powers(obs_arr, out)
+        return out
+
+    def _write_powers(self, obs, out):
+        # obs^j for all dims goes in every kth elem of (last axis of) out,
+        # starting from elem j
+        k = self._poly_order
+        out[..., 1::k] = obs
+        for j in range(2, k + 1):
+            np.multiply(out[..., (j - 1)::k], obs, out=out[..., j::k])
+
 
-class LinearAugmentation(AugmentationStratABC):
-    def __call__(self, obs, x_nought):
-        return np.concatenate(([x_nought], obs))
+class LinearAugmentation(PolynomialAugmentation):
+    def __init__(self):
+        super().__init__(poly_order=1)
 
 
-class QuadraticAugmentation(AugmentationStratABC):
-    def __call__(self, obs, x_nought):
-        aug_obs = []
-        for elem in obs:
-            aug_obs.append(elem)
-            aug_obs.append(elem**2)
-        return np.concatenate(([x_nought], aug_obs))
+class QuadraticAugmentation(PolynomialAugmentation):
+    def __init__(self):
+        super().__init__(poly_order=2)
@@ -0,0 +1,260 @@
+import contextlib
+import gc
+import json
+from collections import namedtuple
+
+import numpy as np
+
+from .action_selection import ActionSelectionModes
+from .condition import Condition
+from .hyperparams import Hyperparams
+from .population import Population
+
+_FORMAT_VERSION = 1
+_META_NAME = "meta"
+# clfr attrs saved as columns for orphans (for members, all but time stamp
+# are already in Population's row arrays)
+_CLFR_ATTRS = ("niche_min_error", "error", "fitness", "experience",
+               "time_stamp", "action_set_size", "numerosity")
+_ENV_STATE_OBS_ATTRS = ("curr_obs", "prev_obs")
+# prev [A] members that are no longer in pop are encoded as -(idx + 1), idx
+# being their position in the orphans table
+_ORPHAN_CODE_OFFSET = 1
+
+Checkpoint = namedtuple("Checkpoint", [
+    "hyperparams", "pop", "rng_state", "counters", "env_state",
+    "lockstep_env_states"
+])
+
+
+def save_checkpoint(path,
+                    pop,
+                    hyperparams,
+                    rng_state,
+                    counters,
+                    env_state,
+                    lockstep_env_states=None):
+    """Saves full training state to path as a single uncompressed .npz, i.e.
+    one chunk per array plus a chunk of JSON metadata:
+        - pop members as columns: Population's row arrays (condition bounds,
+          weight vecs, cov mats, action idxs, slots, scalar params) plus
+          condition alleles and time stamps.
+        - pop bookkeeping: ops history, num micros, slot free list, etc.
+        - pending state of env_state and each of lockstep_env_states:
+          current obs, previous [A], reward and obs, action selection mode.
+          Members of previous [A]s are saved as pop rows, apart from any that
+          have since left pop, which are saved in a separate table of
+          "orphans".
+        - counters (dict of ints), RNGStreams state and hyperparams.
+    Envs themselves are not saved."""
+    arrs = {}
+    (pop_arrs, pop_meta) = pop.get_checkpoint_state()
+    members = list(pop)
+    for (name, arr) in pop_arrs.items():
+        arrs[f"pop/{name}"] = arr
+    arrs["pop/alleles"] = _stack_alleles(members)
+    arrs["pop/time_stamp"] = np.array(
+        [clfr.time_stamp for clfr in members], dtype=np.int64)
+
+    all_env_states = [env_state] + list(lockstep_env_states or [])
+    # prev [A] members no longer in pop, and map from their ids to their
+    # idxs in that list: [A]s of different envs can share orphans, so each
+    # is only saved once
+    orphans = []
+    orphan_idxs = {}
+    env_states_meta = []
+    for (idx, state) in enumerate(all_env_states):
+        for name in _ENV_STATE_OBS_ATTRS:
+            obs = getattr(state, name)
+            if obs is not None:
+                arrs[f"env_states/{idx}/{name}"] = np.asarray(obs)
+        if state.prev_action_set is not None:
+            arrs[f"env_states/{idx}/prev_action_set"] = _encode_action_set(
+                state.prev_action_set, pop, orphans, orphan_idxs)
+        mode = state.action_selection_mode
+        env_states_meta.append({
+            "has_prev_action_set": (state.prev_action_set is not None),
+            "prev_reward": state.prev_reward,
+            "action_selection_mode": (mode.name if mode is not None else None)
+        })
+    if len(orphans) > 0:
+        for (name, arr) in _orphans_to_cols(orphans, pop).items():
+            arrs[f"orphans/{name}"] = arr
+
+    rng_meta = {}
+    for (name, stream_state) in rng_state.items():
+        arrs[f"rng/{name}/buf"] = np.array(stream_state["buf"],
+                                           dtype=np.float64)
+        rng_meta[name] = stream_state["bit_generator"]
+
+    meta = {
+        "format_version": _FORMAT_VERSION,
+        "hyperparams": hyperparams.as_dict(),
+        "action_space": list(pop.action_space),
+        "pop": pop_meta,
+        "num_orphans": len(orphans),
+        "env_states": env_states_meta,
+        "has_lockstep_env_states": (lockstep_env_states is not None),
+        "rng_state": rng_meta,
+        "counters": counters
+    }
+    meta_bytes = json.dumps(meta, default=_to_json_scalar).encode("utf-8")
+    arrs[_META_NAME] = np.frombuffer(meta_bytes, dtype=np.uint8)
+    np.savez(path, **arrs)
+
+
+def load_checkpoint(path, action_space, encoding, pred_strat,
+                    match_index=None):
+    """Loads state saved by save_checkpoint(), given the action space,
+    encoding and prediction strat that were used to create it. Pop is
+    rebuilt in bulk (with match_index, if given) rather than clfr by clfr,
+    and env states are returned as dicts of _EnvState attrs (minus env)."""
+    with np.load(path) as npz:
+        arrs = {name: npz[name] for name in npz.files}
+    meta = json.loads(arrs.pop(_META_NAME).tobytes().decode("utf-8"))
+    assert meta["format_version"] == _FORMAT_VERSION
+    action_space = tuple(action_space)
+    assert list(action_space) == meta["action_space"]
+    hyperparams = Hyperparams(meta["hyperparams"])
+
+    pop_arrs = _get_prefixed(arrs, "pop/")
+    with _gc_paused():
+        members = _restore_clfrs(pop_arrs, action_space, encoding,
+                                 pred_strat, hyperparams)
+        for name in ("alleles", "time_stamp"):
+            del pop_arrs[name]
+        pop = Population.from_checkpoint_state(action_space,
+                                               hyperparams.theta_del,
+                                               members,
+                                               pop_arrs,
+                                               meta["pop"],
+                                               match_index=match_index)
+        if meta["num_orphans"] > 0:
+            orphans = _restore_clfrs(_get_prefixed(arrs, "orphans/"),
+                                     action_space, encoding, pred_strat,
+                                     hyperparams)
+        else:
+            orphans = []
+
+    env_states = []
+    for (idx, state_meta) in enumerate(meta["env_states"]):
+        state_arrs = _get_prefixed(arrs, f"env_states/{idx}/")
+        if state_meta["has_prev_action_set"]:
+            prev_action_set = _decode_action_set(
+                state_arrs["prev_action_set"], pop, orphans)
+        else:
+            prev_action_set = None
+        mode_name = state_meta["action_selection_mode"]
+        env_states.append({
+            "curr_obs": state_arrs.get("curr_obs"),
+            "prev_action_set": prev_action_set,
+            "prev_reward": state_meta["prev_reward"],
+            "prev_obs": state_arrs.get("prev_obs"),
+            "action_selection_mode":
+            (ActionSelectionModes[mode_name]
+             if mode_name is not None else None)
+        })
+
+    rng_state = {
+        name: {
+            "bit_generator": bit_generator_state,
+            "buf": arrs[f"rng/{name}/buf"].tolist()
+        }
+        for (name, bit_generator_state) in meta["rng_state"].items()
+    }
+    return Checkpoint(
+        hyperparams=hyperparams,
+        pop=pop,
+        rng_state=rng_state,
+        counters=meta["counters"],
+        env_state=env_states[0],
+        lockstep_env_states=(env_states[1:]
+                             if meta["has_lockstep_env_states"] else None))
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """Pauses cyclic GC while many objects are created at once (e.g. a pop's
+    worth of clfrs and conditions): none of them are garbage, but each
+    collection that their creation would trigger rescans all of them."""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _stack_alleles(clfrs):
+    if len(clfrs) == 0:
+        return np.empty((0, 0))
+    # int alleles (integer encoding) stack to an int array, so round trip
+    # exactly
+    return np.array([clfr.condition.alleles for clfr in clfrs])
+
+
+def _encode_action_set(action_set, pop, orphans, orphan_idxs):
+    codes = []
+    for clfr in action_set:
+        if clfr.owner is pop:
+            codes.append(clfr.row)
+        else:
+            if id(clfr) not in orphan_idxs:
+                orphan_idxs[id(clfr)] = len(orphans)
+                orphans.append(clfr)
+            codes.append(-(orphan_idxs[id(clfr)] + _ORPHAN_CODE_OFFSET))
+    return np.array(codes, dtype=np.int64)
+
+
+def _decode_action_set(codes, pop, orphans):
+    return [
+        pop[code] if code >= 0 else orphans[-code - _ORPHAN_CODE_OFFSET]
+        for code in codes.tolist()
+    ]
+
+
+def _orphans_to_cols(orphans, pop):
+    cols = {
+        "lower_bounds":
+        np.stack([clfr.condition.lower_bounds for clfr in orphans]),
+        "upper_bounds":
+        np.stack([clfr.condition.upper_bounds for clfr in orphans]),
+        "alleles":
+        _stack_alleles(orphans),
+        "action_idxs":
+        np.array([pop.action_space.index(clfr.action) for clfr in orphans],
+                 dtype=np.int64),
+        "weight_vecs":
+        np.stack([clfr.weight_vec for clfr in orphans])
+    }
+    if hasattr(orphans[0], "cov_mat"):
+        cols["cov_mats"] = np.stack([clfr.cov_mat for clfr in orphans])
+    for name in _CLFR_ATTRS:
+        cols[name] = np.array([getattr(clfr, name) for clfr in orphans])
+    return cols
+
+
+def _restore_clfrs(cols, action_space, encoding, pred_strat, hyperparams):
+    if len(cols["alleles"]) == 0:
+        return []
+    conditions = Condition.from_bounds_many(cols["alleles"],
+                                            cols["lower_bounds"],
+                                            cols["upper_bounds"], encoding)
+    actions = [action_space[idx] for idx in cols["action_idxs"].tolist()]
+    return pred_strat.restore_classifiers(conditions, actions, hyperparams,
+                                          cols)
+
+
+def _get_prefixed(arrs, prefix):
+    return {
+        name[len(prefix):]: arr
+        for (name, arr) in arrs.items() if name.startswith(prefix)
+    }
+
+
+def _to_json_scalar(obj):
+    # numpy scalars (e.g. rewards, hyperparams given as numpy vals)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Can't serialise {type(obj)} to JSON")
@@ -1,8 +1,5 @@
 import numpy as np
 
-from .hyperparams import get_hyperparam as get_hp
-from .rng import get_rng
-
 np.seterr(divide="raise", over="raise", invalid="raise")
 
 _EXPERIENCE_MIN = 0
@@ -13,17 +10,31 @@ _ATTR_EQ_REL_TOL = 1e-10
 
 
 class ClassifierBase:
-    def __init__(self, condition, action, time_step, poly_order):
+    # fixed attribute layout: no per-instance __dict__, since pops can hold
+    # many thousands of clfrs
+    __slots__ = ("_condition", "_action", "_num_features", "_poly_order",
+                 "_weight_vec", "_niche_min_error", "_error", "_fitness",
+                 "_experience", "_time_stamp", "_action_set_size",
+                 "_numerosity", "_deletion_vote",
+                 "_deletion_has_sufficient_exp",
+                 "_numerosity_scaled_fitness", "_hyperparams", "_owner",
+                 "_row", "_slot")
+
+    def __init__(self, condition, action, time_step, poly_order, hyperparams,
+                 rng):
         """Only used by covering."""
+        # hyperparams of the XCSF instance this clfr belongs to, shared
+        # (not copied) by all its clfrs
+        self._hyperparams = hyperparams
         self._condition = condition
         self._action = action
         self._num_features = len(condition)
         self._poly_order = poly_order
         self._weight_vec = self._init_weight_vec(self._num_features,
-                                                 self._poly_order)
-        self._niche_min_error = get_hp("mu_I")
-        self._error = get_hp("epsilon_I")
-        self._fitness = get_hp("fitness_I")
+                                                 self._poly_order, rng)
+        self._niche_min_error = hyperparams.mu_I
+        self._error = hyperparams.epsilon_I
+        self._fitness = hyperparams.fitness_I
         self._experience = 0
         self._time_stamp = time_step
         self._action_set_size = 1
@@ -38,13 +49,65 @@ class ClassifierBase:
             self._calc_numerosity_scaled_fitness(self._fitness,
                                                  self._numerosity)
 
+        # population this clfr is a member of (if any), its row in that
+        # population's array storage (which can move) and its slot (stable
+        # for as long as clfr is a member), so the population can be notified
+        # of changes that affect its arrays/indices
+        self._owner = None
+        self._row = None
+        self._slot = None
+
+    @property
+    def owner(self):
+        return self._owner
+
+    @property
+    def row(self):
+        return self._row
+
+    @property
+    def slot(self):
+        return self._slot
+
+    def attach(self, owner, row, slot):
+        """Called by owner population on insertion and whenever clfr's row in
+        the owner's array storage moves. Weight vec becomes a view onto the
+        owner's stacked weight matrix, so in-place updates to it are
+        automatically reflected there."""
+        self._owner = owner
+        self._row = row
+        self._slot = slot
+        self._weight_vec = owner.weight_vec_view(row)
+
+    @classmethod
+    def attach_many(cls, clfrs, owner, slots):
+        """Bulk attach() of clfrs to owner in rows 0, ..., len(clfrs) - 1
+        with given slots, for when a population is built in one go (e.g.
+        restored from a checkpoint)."""
+        for (row, (clfr, slot, weight_vec)) in enumerate(
+                zip(clfrs, slots, owner.weight_vec_views(len(clfrs)))):
+            clfr._owner = owner
+            clfr._row = row
+            clfr._slot = slot
+            clfr._weight_vec = weight_vec
+
+    def detach(self):
+        # take private copy of weight vec since owner will reuse its row
+        self._weight_vec = self._weight_vec.copy()
+        self._owner = None
+        self._row = None
+        self._slot = None
+
     @property
     def condition(self):
         return self._condition
 
     @condition.setter
     def condition(self, val):
+        old_val = self._condition
         self._condition = val
+        if self._owner is not None:
+            self._owner.on_condition_change(self, old_val)
 
     @property
     def action(self):
@@ -52,7 +115,10 @@ class ClassifierBase:
 
     @action.setter
     def action(self, val):
+        old_val = self._action
         self._action = val
+        if self._owner is not None:
+            self._owner.on_action_change(self, old_val)
 
     @property
     def weight_vec(self):
@@ -60,7 +126,11 @@ class ClassifierBase:
 
     @weight_vec.setter
     def weight_vec(self, val):
-        self._weight_vec = val
+        if self._owner is not None:
+            # weight vec is a view onto owner's weight matrix
+            self._weight_vec[:] = val
+        else:
+            self._weight_vec = val
 
     @property
     def niche_min_error(self):
@@ -69,6 +139,8 @@ class ClassifierBase:
     @niche_min_error.setter
     def niche_min_error(self, val):
         self._niche_min_error = val
+        if self._owner is not None:
+            self._owner.on_param_change(self, "niche_min_error", val)
 
     @property
     def error(self):
@@ -77,6 +149,8 @@ class ClassifierBase:
     @error.setter
     def error(self, val):
         self._error = val
+        if self._owner is not None:
+            self._owner.on_param_change(self, "error", val)
 
     @property
     def fitness(self):
@@ -88,6 +162,8 @@ class ClassifierBase:
         self._numerosity_scaled_fitness = \
             self._calc_numerosity_scaled_fitness(self._fitness,
                                                  self._numerosity)
+        if self._owner is not None:
+            self._owner.on_param_change(self, "fitness", val)
 
     @property
     def experience(self):
@@ -99,6 +175,8 @@ class ClassifierBase:
         self._experience = val
         self._deletion_has_sufficient_exp = \
             self._calc_deletion_has_sufficient_exp(self._experience)
+        if self._owner is not None:
+            self._owner.on_param_change(self, "experience", val)
 
     @property
     def time_stamp(self):
@@ -119,6 +197,8 @@ class ClassifierBase:
         self._action_set_size = val
         self._deletion_vote = self._calc_deletion_vote(self._action_set_size,
                                                        self._numerosity)
+        if self._owner is not None:
+            self._owner.on_param_change(self, "action_set_size", val)
 
     @property
     def numerosity(self):
@@ -133,6 +213,28 @@ class ClassifierBase:
         self._numerosity_scaled_fitness = \
             self._calc_numerosity_scaled_fitness(self._fitness,
                                                  self._numerosity)
+        if self._owner is not None:
+            self._owner.on_param_change(self, "numerosity", val)
+
+    def load_update_params(self, experience, niche_min_error, error,
+                           action_set_size, fitness):
+        """Sets params changed by action set updates all at once, *without*
+        notifying owner. Used after a vectorised update has already written
+        these params to the owner's arrays."""
+        assert experience >= _EXPERIENCE_MIN
+        assert action_set_size >= _ACTION_SET_SIZE_MIN
+        self._experience = experience
+        self._niche_min_error = niche_min_error
+        self._error = error
+        self._action_set_size = action_set_size
+        self._fitness = fitness
+        self._deletion_vote = self._calc_deletion_vote(self._action_set_size,
+                                                       self._numerosity)
+        self._deletion_has_sufficient_exp = \
+            self._calc_deletion_has_sufficient_exp(self._experience)
+        self._numerosity_scaled_fitness = \
+            self._calc_numerosity_scaled_fitness(self._fitness,
+                                                 self._numerosity)
 
     @property
     def deletion_vote(self):
@@ -146,25 +248,112 @@ class ClassifierBase:
     def numerosity_scaled_fitness(self):
         return self._numerosity_scaled_fitness
 
-    def _init_weight_vec(self, num_features, poly_order):
+    def _init_weight_vec(self, num_features, poly_order, rng):
         # weight vec is of len k*n+1, k = poly order, n = num features
-        low = get_hp("weight_I_min")
-        high = get_hp("weight_I_max")
+        low = self._hyperparams.weight_I_min
+        high = self._hyperparams.weight_I_max
         assert low <= high
-        return get_rng().uniform(low,
-                                 high,
-                                 size=(poly_order * num_features + 1)).astype(
-                                     np.float32)
+        return rng.uniform(low, high,
+                           size=(poly_order * num_features + 1)).astype(
+                               np.float32)
 
     def _calc_deletion_vote(self, action_set_size, numerosity):
         return action_set_size * numerosity
 
     def _calc_deletion_has_sufficient_exp(self, experience):
-        return experience > get_hp("theta_del")
+        return experience > self._hyperparams.theta_del
 
     def _calc_numerosity_scaled_fitness(self, fitness, numerosity):
         return fitness / numerosity
 
+    def clone_for_offspring(self):
+        """Cheap alternative to deepcopy for making GA offspring: copies only
+        what offspring inherit, sharing the (immutable) condition and
+        bypassing __init__ so no weight vec is randomly drawn. Offspring start
+        with numerosity 1, zero experience and are not members of any
+        population."""
+        child = self.__class__.__new__(self.__class__)
+        child._hyperparams = self._hyperparams
+        child._condition = self._condition
+        child._action = self._action
+        child._num_features = self._num_features
+        child._poly_order = self._poly_order
+        child._weight_vec = self._weight_vec.copy()
+        child._niche_min_error = self._niche_min_error
+        child._error = self._error
+        child._fitness = self._fitness
+        child._experience = 0
+        child._time_stamp = self._time_stamp
+        child._action_set_size = self._action_set_size
+        child._numerosity = 1
+
+        child._deletion_vote = child._calc_deletion_vote(
+            child._action_set_size, child._numerosity)
+        child._deletion_has_sufficient_exp = \
+            child._calc_deletion_has_sufficient_exp(child._experience)
+        child._numerosity_scaled_fitness = \
+            child._calc_numerosity_scaled_fitness(child._fitness,
+                                                  child._numerosity)
+
+        child._owner = None
+        child._row = None
+        child._slot = None
+        return child
+
+    @classmethod
+    def restore_many(cls, conditions, actions, poly_order, hyperparams,
+                     col_arrs):
+        """Bulk constructor for clfrs saved as columns, e.g. in a checkpoint:
+        clfr i gets conditions[i], actions[i] and row i of each of
+        col_arrs "weight_vecs", "time_stamp" and the scalar params mirrored by
+        Population. Like clone_for_offspring(), bypasses __init__ (so draws
+        nothing from any rng), and restored clfrs are not members of any
+        population."""
+        # derived params calced for all clfrs at once, same calcs as
+        # _calc_*() methods
+        deletion_votes = (col_arrs["action_set_size"] *
+                          col_arrs["numerosity"])
+        deletion_have_sufficient_exp = (col_arrs["experience"] >
+                                        hyperparams.theta_del)
+        numerosity_scaled_fitnesses = (col_arrs["fitness"] /
+                                       col_arrs["numerosity"])
+        cols = zip(conditions, actions, col_arrs["weight_vecs"],
+                   *(col_arrs[name].tolist()
+                     for name in ("niche_min_error", "error", "fitness",
+                                  "experience", "time_stamp",
+                                  "action_set_size", "numerosity")),
+                   deletion_votes.tolist(),
+                   deletion_have_sufficient_exp.tolist(),
+                   numerosity_scaled_fitnesses.tolist())
+        num_features = len(conditions[0]) if len(conditions) > 0 else None
+        clfrs = []
+        for (condition, action, weight_vec, niche_min_error, error, fitness,
+             experience, time_stamp, action_set_size, numerosity,
+             deletion_vote, deletion_has_sufficient_exp,
+             numerosity_scaled_fitness) in cols:
+            clfr = cls.__new__(cls)
+            clfr._hyperparams = hyperparams
+            clfr._condition = condition
+            clfr._action = action
+            clfr._num_features = num_features
+            clfr._poly_order = poly_order
+            clfr._weight_vec = weight_vec
+            clfr._niche_min_error = niche_min_error
+            clfr._error = error
+            clfr._fitness = fitness
+            clfr._experience = experience
+            clfr._time_stamp = time_stamp
+            clfr._action_set_size = action_set_size
+            clfr._numerosity = numerosity
+            clfr._deletion_vote = deletion_vote
+            clfr._deletion_has_sufficient_exp = deletion_has_sufficient_exp
+            clfr._numerosity_scaled_fitness = numerosity_scaled_fitness
+            clfr._owner = None
+            clfr._row = None
+            clfr._slot = None
+            clfrs.append(clfr)
+        return clfrs
+
     def does_match(self, obs):
         return self._condition.does_match(obs)
 
@@ -210,12 +399,33 @@ class ClassifierBase:
                        other._weight_vec,
                        rtol=_ATTR_EQ_REL_TOL))
 
+    def __getstate__(self):
+        # don't drag owning population along when copying/pickling a single
+        # clfr: copies start out detached, and a population that is itself
+        # being copied/unpickled re-attaches its members
+        state = {
+            name: getattr(self, name)
+            for name in _get_all_slots(self.__class__)
+        }
+        state["_owner"] = None
+        state["_row"] = None
+        state["_slot"] = None
+        return state
+
+    def __setstate__(self, state):
+        for (name, val) in state.items():
+            setattr(self, name, val)
+
 
 class RLSClassifier(ClassifierBase):
     """Classifier for Recursive Least Squares prediction. In addition to
     standard weight vec, also has cov mat."""
-    def __init__(self, condition, action, time_step, poly_order):
-        super().__init__(condition, action, time_step, poly_order)
+    __slots__ = ("_cov_mat", )
+
+    def __init__(self, condition, action, time_step, poly_order, hyperparams,
+                 rng):
+        super().__init__(condition, action, time_step, poly_order,
+                         hyperparams, rng)
         self._cov_mat = self._init_cov_mat(self._num_features,
                                            self._poly_order)
 
@@ -225,16 +435,54 @@ class RLSClassifier(ClassifierBase):
 
     @cov_mat.setter
     def cov_mat(self, val):
-        self._cov_mat = val
+        if self._owner is not None:
+            # cov mat is a view onto owner's stacked cov mats
+            self._cov_mat[:] = val
+        else:
+            self._cov_mat = val
+
+    def attach(self, owner, row, slot):
+        super().attach(owner, row, slot)
+        self._cov_mat = owner.cov_mat_view(row)
+
+    @classmethod
+    def attach_many(cls, clfrs, owner, slots):
+        super().attach_many(clfrs, owner, slots)
+        for (clfr, cov_mat) in zip(clfrs, owner.cov_mat_views(len(clfrs))):
+            clfr._cov_mat = cov_mat
+
+    def detach(self):
+        # take private copy of cov mat since owner will reuse its row
+        self._cov_mat = self._cov_mat.copy()
+        super().detach()
 
     def _init_cov_mat(self, num_features, poly_order):
         # cov mat is of shape (k*n+1)x(k*n+1), k = poly order, n = num features
         return np.identity(n=(poly_order * num_features + 1),
-                           dtype=np.float32) * get_hp("delta_rls")
+                           dtype=np.float32) * self._hyperparams.delta_rls
+
+    def clone_for_offspring(self):
+        # offspring don't inherit cov mat: build fresh one directly rather
+        # than copying parent's only to throw it away
+        child = super().clone_for_offspring()
+        child._cov_mat = child._init_cov_mat(child._num_features,
+                                             child._poly_order)
+        return child
+
+    @classmethod
+    def restore_many(cls, conditions, actions, poly_order, hyperparams,
+                     col_arrs):
+        """As for ClassifierBase, with cov mats given by row i of col_arrs
+        "cov_mats"."""
+        clfrs = super().restore_many(conditions, actions, poly_order,
+                                     hyperparams, col_arrs)
+        for (clfr, cov_mat) in zip(clfrs, col_arrs["cov_mats"]):
+            clfr._cov_mat = cov_mat
+        return clfrs
 
     def reset_cov_mat(self):
-        self._cov_mat = self._init_cov_mat(self._num_features,
-                                           self._poly_order)
+        self.cov_mat = self._init_cov_mat(self._num_features,
+                                          self._poly_order)
 
     def full_eq(self, other):
         return super().full_eq(other) and self._cov_mat_is_close(other)
@@ -245,4 +493,11 @@ class RLSClassifier(ClassifierBase):
 
 
 class NLMSClassifier(ClassifierBase):
-    pass
+    __slots__ = ()
+
+
+def _get_all_slots(cls):
+    return [
+        name for klass in cls.__mro__
+        for name in getattr(klass, "__slots__", ())
+    ]
@@ -1,8 +1,14 @@
+import numpy as np
+
 _SPAN_FRAC_MIN_INCL = 0
 _SPAN_FRAC_MAX_INCL = 1
 
 
 class Condition:
+    __slots__ = ("_alleles", "_encoding", "_phenotype", "_generality",
+                 "_matching_idx_order", "_lower_bounds", "_upper_bounds",
+                 "_hash")
+
     def __init__(self, alleles, encoding):
         self._alleles = list(alleles)
         self._encoding = encoding
@@ -22,18 +28,81 @@ class Condition:
         # especially if lowest span is quite small.
         # this will likely be more effective in saving time when the
         # dimensionality of the obs space is high
-        self._matching_idx_order = \
-            self._calc_matching_idx_order(self._phenotype,
-                                          obs_space=self._encoding.obs_space)
+        # population matching is vectorised over all conditions and doesn't
+        # use does_match(), so only calc the order (lazily) if it is needed
+        self._matching_idx_order = None
+
+        # bounds of phenotype as flat arrays, used by population to keep its
+        # (vectorised) struct-of-arrays view of all conditions
+        self._lower_bounds = np.array(
+            [interval.lower for interval in self._phenotype],
+            dtype=np.float64)
+        self._upper_bounds = np.array(
+            [interval.upper for interval in self._phenotype],
+            dtype=np.float64)
+        # hash consistent with phenotypic equality in __eq__, so conditions
+        # can be used in dict keys
+        self._hash = hash((tuple(self._lower_bounds.tolist()),
+                           tuple(self._upper_bounds.tolist())))
+
+    @classmethod
+    def from_bounds_many(cls, alleles_arr, lower_bounds, upper_bounds,
+                         encoding):
+        """Bulk constructor for conditions whose phenotype bounds are already
+        known, e.g. when loading a checkpoint: row i of (N x n)
+        lower_bounds/upper_bounds gives the bounds of the condition with
+        alleles given by row i of alleles_arr. Skips decoding, so the
+        phenotype (and generality) of each condition is only decoded from
+        its alleles if and when it is first needed."""
+        assert len(alleles_arr) == len(lower_bounds) == len(upper_bounds)
+        lower_bounds = np.asarray(lower_bounds, dtype=np.float64)
+        upper_bounds = np.asarray(upper_bounds, dtype=np.float64)
+        conditions = []
+        # alleles and bounds of each condition are row views of the given
+        # arrays (alleles are converted to a list on first access)
+        for (alleles, lower_bounds_row, upper_bounds_row,
+             lower_bounds_tup, upper_bounds_tup) in zip(
+                 alleles_arr, lower_bounds, upper_bounds,
+                 map(tuple, lower_bounds.tolist()),
+                 map(tuple, upper_bounds.tolist())):
+            condition = cls.__new__(cls)
+            condition._alleles = alleles
+            condition._encoding = encoding
+            condition._phenotype = None
+            condition._generality = None
+            condition._matching_idx_order = None
+            condition._lower_bounds = lower_bounds_row
+            condition._upper_bounds = upper_bounds_row
+            condition._hash = hash((lower_bounds_tup, upper_bounds_tup))
+            conditions.append(condition)
+        return conditions
+
+    def _get_phenotype(self):
+        if self._phenotype is None:
+            self._phenotype = self._encoding.decode(self.alleles)
+        return self._phenotype
 
     @property
     def alleles(self):
+        if not isinstance(self._alleles, list):
+            self._alleles = self._alleles.tolist()
         return self._alleles
 
     @property
     def generality(self):
+        if self._generality is None:
+            self._generality = self._encoding.calc_condition_generality(
+                self._get_phenotype())
         return self._generality
 
+    @property
+    def lower_bounds(self):
+        return self._lower_bounds
+
+    @property
+    def upper_bounds(self):
+        return self._upper_bounds
+
     def _calc_matching_idx_order(self, phenotype, obs_space):
         # first calc "span fracs" of all intervals in phenotype relative to
         # each dim span
@@ -53,8 +122,12 @@ class Condition:
         return matching_idx_order
 
     def does_match(self, obs):
+        phenotype = self._get_phenotype()
+        if self._matching_idx_order is None:
+            self._matching_idx_order = self._calc_matching_idx_order(
+                phenotype, obs_space=self._encoding.obs_space)
         for idx in self._matching_idx_order:
-            interval = self._phenotype[idx]
+            interval = phenotype[idx]
             obs_val = obs[idx]
             if not interval.contains_val(obs_val):
                 return False
@@ -62,8 +135,9 @@ class Condition:
 
     def does_subsume(self, other):
         """Does this condition subsume other condition?"""
-        for (my_interval, other_interval) in zip(self._phenotype,
-                                                 other._phenotype):
+        for (my_interval,
+             other_interval) in zip(self._get_phenotype(),
+                                    other._get_phenotype()):
             if not my_interval.does_subsume(other_interval):
                 return False
         return True
@@ -72,10 +146,14 @@ class Condition:
         # This was bugged and originally compared equality of alleles,
         # which is OK for 1 to 1 genotype to phenotype mappings but otherwise
         # not OK! Change it to instead compare phenotypic equality.
-        return self._phenotype == other._phenotype
+        return self._get_phenotype() == other._get_phenotype()
+
+    def __hash__(self):
+        return self._hash
 
     def __len__(self):
-        return len(self._phenotype)
+        return len(self._lower_bounds)
 
     def __str__(self):
-        return " && ".join([str(interval) for interval in self._phenotype])
+        return " && ".join(
+            [str(interval) for interval in self._get_phenotype()])
@@ -1,16 +1,14 @@
-from .rng import get_rng
-
-
 def calc_num_unique_actions(match_set):
     return len(set([clfr.action for clfr in match_set]))
 
 
 def gen_covering_classifier(obs, encoding, match_set, action_space, time_step,
-                            pred_strat):
-    condition = encoding.gen_covering_condition(obs)
+                            pred_strat, hyperparams, rng):
+    condition = encoding.gen_covering_condition(obs, hyperparams, rng)
     actions_to_cover = _find_actions_to_cover(match_set, action_space)
-    action = get_rng().choice(actions_to_cover)
-    return pred_strat.make_classifier(condition, action, time_step)
+    action = rng.choice(actions_to_cover)
+    return pred_strat.make_classifier(condition, action, time_step,
+                                      hyperparams, rng)
 
 
 def _find_actions_to_cover(match_set, action_space):
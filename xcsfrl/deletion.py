@@ -1,56 +1,106 @@
-from .hyperparams import get_hyperparam as get_hp
-from .rng import get_rng
+import numpy as np
+
+from .stats import NULL_STATS
+
+np.seterr(divide="raise", over="raise", invalid="raise")
 
 _MIN_NUM_MACROS = 1
 
 
-def deletion(pop):
-    max_pop_size = get_hp("N")
+def deletion(pop, hyperparams, rng, stats=NULL_STATS):
+    start_time = stats.start()
+    max_pop_size = hyperparams.N
     pop_size = pop.num_micros
     num_to_delete = max(0, (pop_size - max_pop_size))
     if num_to_delete > 0:
         for _ in range(num_to_delete):
-            _delete_single_microclfr(pop)
+            _delete_single_microclfr(pop, hyperparams, rng)
         assert pop.num_macros >= _MIN_NUM_MACROS
         assert pop.num_micros <= max_pop_size
+    stats.count("deleted_micros", num_to_delete)
+    stats.stop("deletion", start_time)
+
+
+def select_row_to_delete(pop, hyperparams, rng):
+    """Row of the macroclassifier to delete a micro of, selected in proportion
+    to deletion votes. Doesn't alter pop."""
+    avg_fitness_in_pop = pop.fitness_sum / pop.num_micros
+    vote_increase_threshold = (hyperparams.delta * avg_fitness_in_pop)
+    if hyperparams.delta <= 1:
+        return _select_row_to_delete(pop, avg_fitness_in_pop,
+                                     vote_increase_threshold, rng)
+    else:
+        return _select_row_to_delete_flat(pop, avg_fitness_in_pop,
+                                          vote_increase_threshold,
+                                          hyperparams.theta_del, rng)
+
+
+def _delete_single_microclfr(pop, hyperparams, rng):
+    clfr = pop[select_row_to_delete(pop, hyperparams, rng)]
+    if clfr.numerosity > 1:
+        pop.alter_numerosity(clfr, delta=-1, op="deletion")
+    elif clfr.numerosity == 1:
+        pop.remove(clfr, op="deletion")
+    else:
+        # not possible
+        assert False
+
+
+def _select_row_to_delete(pop, avg_fitness_in_pop, vote_increase_threshold,
+                          rng):
+    """Roulette wheel selection over deletion votes of all macroclassifiers.
+
+    Each clfr's vote is its base vote (clfr.deletion_vote) plus, if it is
+    experienced and its numerosity scaled fitness is non-zero but below the
+    threshold, an increase up to (avg fitness in pop / numerosity scaled
+    fitness) times its base vote. Base votes are kept in a sum tree by pop
+    so can be sampled from in O(log n). The increases can't be kept there
+    since which clfrs get them and how much changes with the avg fitness, so
+    they are sampled by rejection: pop also keeps a sum tree of the increased
+    votes per unit avg fitness of all experienced clfrs with non-zero
+    fitness, which scaled by the avg fitness bounds the increase of each.
+    The roulette wheel is the base votes followed by these bounds, and a spin
+    landing on a clfr's bound is accepted with probability increase / bound
+    (0 if it gets no increase), else respun. Rows are thus selected exactly
+    in proportion to their votes, in O(log n) per spin and without rescanning
+    the pop. Requires delta <= 1, so no increase is negative."""
+    base_vote_sum = pop.deletion_vote_sum
+    vote_increase_bound_sum = (avg_fitness_in_pop * pop.increased_vote_sum)
+    while True:
+        spin = rng.random() * (base_vote_sum + vote_increase_bound_sum)
+        if spin < base_vote_sum:
+            return pop.find_row_by_deletion_vote(spin)
+        row = pop.find_row_by_increased_vote(
+            (spin - base_vote_sum) / avg_fitness_in_pop)
+        scaled_fitness = pop[row].numerosity_scaled_fitness
+        # increase / bound = (avg fitness / scaled fitness - 1) / (avg fitness
+        # / scaled fitness)
+        if scaled_fitness < vote_increase_threshold and \
+                rng.random() < (1 - scaled_fitness / avg_fitness_in_pop):
+            return row
+
+
+def _select_row_to_delete_flat(pop, avg_fitness_in_pop,
+                               vote_increase_threshold, theta_del, rng):
+    """As for _select_row_to_delete(), but for delta > 1, in which case some
+    "increases" are actually decreases and can't be laid end to end with
+    base votes, so uses a flat roulette wheel over all votes, found with a
+    single vectorised pass over the pop."""
+    (experiences, fitnesses, numerosities, action_set_sizes) = \
+        pop.read_all_params(
+            ("experience", "fitness", "numerosity", "action_set_size"))
+    scaled_fitnesses = (fitnesses / numerosities)
+    increase_rows = np.flatnonzero(
+        (experiences > theta_del) & (scaled_fitnesses > 0)
+        & (scaled_fitnesses < vote_increase_threshold))
+    votes = (action_set_sizes * numerosities)
+    votes[increase_rows] *= (avg_fitness_in_pop /
+                             scaled_fitnesses[increase_rows])
+    cum_votes = np.cumsum(votes)
+    return _spin_cum_roulette_wheel(cum_votes, rng.random() * cum_votes[-1])
 
 
-def _delete_single_microclfr(pop):
-    avg_fitness_in_pop = sum([clfr.fitness for clfr in pop]) / pop.num_micros
-    vote_increase_threshold = (get_hp("delta") * avg_fitness_in_pop)
-    votes = [
-        _deletion_vote(clfr, avg_fitness_in_pop, vote_increase_threshold)
-        for clfr in pop
-    ]
-    max_vote = max(votes)
-
-    # roulette wheel selection via stochastic acceptance
-    clfr_to_remove = None
-    accepted = False
-    while not accepted:
-        idx = get_rng().randint(0, pop.num_macros)
-        (clfr, vote) = (pop[idx], votes[idx])  # since pop ordered this is ok
-        p_accept = (vote / max_vote)
-        if get_rng().random() < p_accept:
-            accepted = True
-            if clfr.numerosity > 1:
-                pop.alter_numerosity(clfr, delta=-1, op="deletion")
-            elif clfr.numerosity == 1:
-                clfr_to_remove = clfr
-            else:
-                # not possible
-                assert False
-
-    if clfr_to_remove is not None:
-        pop.remove(clfr_to_remove, op="deletion")
-
-
-def _deletion_vote(clfr, avg_fitness_in_pop, vote_increase_threshold):
-    vote = clfr.deletion_vote
-    has_sufficient_exp = clfr.deletion_has_sufficient_exp
-    scaled_fitness = clfr.numerosity_scaled_fitness
-    should_increase_vote = has_sufficient_exp and (scaled_fitness <
-                                                   vote_increase_threshold)
-    if should_increase_vote:
-        vote *= (avg_fitness_in_pop / scaled_fitness)
-    return vote
+def _spin_cum_roulette_wheel(cum_votes, spin):
+    idx = np.searchsorted(cum_votes, spin, side="right")
+    # guard against spin landing on/past end due to rounding
+    return min(idx, len(cum_votes) - 1)
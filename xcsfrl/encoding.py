@@ -3,9 +3,7 @@ import abc
 from rlenvs.obs_space import IntegerObsSpace, RealObsSpace
 
 from .condition import Condition
-from .hyperparams import get_hyperparam as get_hp
 from .interval import IntegerInterval, RealInterval
-from .rng import get_rng
 
 _GENERALITY_UB_INCL = 1.0
 
@@ -19,7 +17,7 @@ class EncodingABC(metaclass=abc.ABCMeta):
         return self._obs_space
 
     @abc.abstractmethod
-    def gen_covering_condition(self, obs):
+    def gen_covering_condition(self, obs, hyperparams, rng):
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -31,27 +29,28 @@ class EncodingABC(metaclass=abc.ABCMeta):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def mutate_condition_alleles(self, cond_alleles):
+    def mutate_condition_alleles(self, cond_alleles, hyperparams, rng):
         raise NotImplementedError
 
 
 class UnorderedBoundEncodingABC(EncodingABC, metaclass=abc.ABCMeta):
-    def gen_covering_condition(self, obs):
+    def gen_covering_condition(self, obs, hyperparams, rng):
         num_alleles = len(self._obs_space) * 2
         cond_alleles = []
         assert len(obs) == len(self._obs_space)
         for (obs_compt, dim) in zip(obs, self._obs_space):
-            (lower, upper) = self._gen_covering_alleles(obs_compt, dim)
+            (lower, upper) = self._gen_covering_alleles(
+                obs_compt, dim, hyperparams, rng)
             cover_alleles = [lower, upper]
             # to avoid bias, insert alleles into genotype in random order
-            get_rng().shuffle(cover_alleles)
+            rng.shuffle(cover_alleles)
             for allele in cover_alleles:
                 cond_alleles.append(allele)
         assert len(cond_alleles) == num_alleles
         return Condition(cond_alleles, self)
 
     @abc.abstractmethod
-    def _gen_covering_alleles(self, obs_compt, dim):
+    def _gen_covering_alleles(self, obs_compt, dim, hyperparams, rng):
         """Return (lower, upper) covering alleles, with lower <= upper."""
         raise NotImplementedError
 
@@ -71,16 +70,17 @@ class UnorderedBoundEncodingABC(EncodingABC, metaclass=abc.ABCMeta):
     def calc_condition_generality(self, cond_intervals):
         raise NotImplementedError
 
-    def mutate_condition_alleles(self, alleles):
+    def mutate_condition_alleles(self, alleles, hyperparams, rng):
         assert len(alleles) % 2 == 0
         allele_pairs = [(alleles[i], alleles[i + 1])
                         for i in range(0, len(alleles), 2)]
+        mu = hyperparams.mu
         mut_alleles = []
         for (allele_pair, dim) in zip(allele_pairs, self._obs_space):
             for allele in allele_pair:
-                if get_rng().random() < get_hp("mu"):
-                    noise = self._gen_mutation_noise(dim)
-                    sign = get_rng().choice([-1, 1])
+                if rng.random() < mu:
+                    noise = self._gen_mutation_noise(hyperparams, rng, dim)
+                    sign = rng.sign()
                     mut_allele = allele + (sign * noise)
                     mut_allele = max(mut_allele, dim.lower)
                     mut_allele = min(mut_allele, dim.upper)
@@ -91,7 +91,7 @@ class UnorderedBoundEncodingABC(EncodingABC, metaclass=abc.ABCMeta):
         return mut_alleles
 
     @abc.abstractmethod
-    def _gen_mutation_noise(self, dim=None):
+    def _gen_mutation_noise(self, hyperparams, rng, dim=None):
         raise NotImplementedError
 
 
@@ -103,11 +103,11 @@ class IntegerUnorderedBoundEncoding(UnorderedBoundEncodingABC):
         assert isinstance(obs_space, IntegerObsSpace)
         super().__init__(obs_space)
 
-    def _gen_covering_alleles(self, obs_compt, dim):
-        r_nought = get_hp("r_nought")
+    def _gen_covering_alleles(self, obs_compt, dim, hyperparams, rng):
+        r_nought = hyperparams.r_nought
         # rand integer ~ [0, r_nought]
-        lower = obs_compt - get_rng().randint(low=0, high=(r_nought + 1))
-        upper = obs_compt + get_rng().randint(low=0, high=(r_nought + 1))
+        lower = obs_compt - rng.integers(low=0, high=(r_nought + 1))
+        upper = obs_compt + rng.integers(low=0, high=(r_nought + 1))
         lower = max(lower, dim.lower)
         upper = min(upper, dim.upper)
         return (lower, upper)
@@ -122,9 +122,9 @@ class IntegerUnorderedBoundEncoding(UnorderedBoundEncodingABC):
         assert self._GENERALITY_LB_EXCL < generality <= _GENERALITY_UB_INCL
         return generality
 
-    def _gen_mutation_noise(self, dim=None):
+    def _gen_mutation_noise(self, hyperparams, rng, dim=None):
         # integer ~ [1, m_0]
-        return get_rng().randint(low=1, high=(get_hp("m_nought") + 1))
+        return rng.integers(low=1, high=(hyperparams.m_nought + 1))
 
 
 class RealUnorderedBoundEncoding(UnorderedBoundEncodingABC):
@@ -135,14 +135,14 @@ class RealUnorderedBoundEncoding(UnorderedBoundEncodingABC):
         assert isinstance(obs_space, RealObsSpace)
         super().__init__(obs_space)
 
-    def _gen_covering_alleles(self, obs_compt, dim):
+    def _gen_covering_alleles(self, obs_compt, dim, hyperparams, rng):
         # r_0 interpreted as fraction of dim span to draw uniform random noise
         # from
-        r_nought = get_hp("r_nought")
+        r_nought = hyperparams.r_nought
         assert 0.0 < r_nought <= 1.0
         cover_high = (r_nought * dim.span)
-        lower = obs_compt - get_rng().uniform(low=0, high=cover_high)
-        upper = obs_compt + get_rng().uniform(low=0, high=cover_high)
+        lower = obs_compt - rng.uniform(low=0, high=cover_high)
+        upper = obs_compt + rng.uniform(low=0, high=cover_high)
         lower = max(lower, dim.lower)
         upper = min(upper, dim.upper)
         return (lower, upper)
@@ -155,10 +155,10 @@ class RealUnorderedBoundEncoding(UnorderedBoundEncodingABC):
         assert self._GENERALITY_LB_INCL <= generality <= _GENERALITY_UB_INCL
         return generality
 
-    def _gen_mutation_noise(self, dim):
+    def _gen_mutation_noise(self, hyperparams, rng, dim):
         # m_0 interpreted as fraction of dim span to draw uniform random
         # noise from
-        m_nought = get_hp("m_nought")
+        m_nought = hyperparams.m_nought
         assert 0.0 < m_nought <= 1.0
         mut_high = (m_nought * dim.span)
-        return get_rng().uniform(low=0, high=mut_high)
+        return rng.uniform(low=0, high=mut_high)
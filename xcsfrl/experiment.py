@@ -0,0 +1,165 @@
+import contextlib
+import itertools
+import multiprocessing
+import os
+import pickle
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .xcsf import XCSF
+
+# env vars read by the various BLAS/OpenMP backends numpy may be linked
+# against, set to 1 in workers so that N worker procs use N cores in total
+_BLAS_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                         "MKL_NUM_THREADS", "BLIS_NUM_THREADS",
+                         "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+_BLAS_NUM_THREADS = 1
+_POP_FILENAME_FMT = "run_{run_id}_pop.pkl"
+
+RunSpec = namedtuple("RunSpec", ["run_id", "hyperparams_dict"])
+RunResult = namedtuple("RunResult", [
+    "run_id", "hyperparams_dict", "num_macros", "num_micros", "train_time",
+    "pop_path", "metrics"
+])
+
+
+def expand_hyperparams_grid(hyperparams_grid, seeds):
+    """Expands hyperparams_grid into one RunSpec per (grid point, seed)
+    combination. Values in hyperparams_grid that are lists or tuples are
+    swept over (cartesian product), all others are fixed. The seed
+    hyperparam of each run is taken from seeds."""
+    swept_names = [
+        name for (name, val) in hyperparams_grid.items()
+        if isinstance(val, (list, tuple))
+    ]
+    swept_vals = [hyperparams_grid[name] for name in swept_names]
+    run_specs = []
+    run_id = 0
+    for point in itertools.product(*swept_vals):
+        for seed in seeds:
+            hyperparams_dict = {
+                **hyperparams_grid,
+                **dict(zip(swept_names, point)), "seed": seed
+            }
+            run_specs.append(RunSpec(run_id, hyperparams_dict))
+            run_id += 1
+    return run_specs
+
+
+def run_experiments(env_factory,
+                    encoding_factory,
+                    action_selection_strat_factory,
+                    pred_strat_factory,
+                    run_specs,
+                    num_ga_calls,
+                    max_workers=None,
+                    save_dir=None,
+                    metrics_func=None):
+    """Trains one XCSF per RunSpec for num_ga_calls GA calls across a pool of
+    worker processes, yielding a RunResult for each run as soon as it
+    finishes (so in completion order, not run_id order).
+
+    Each run builds its own components in its worker:
+        env = env_factory()
+        encoding = encoding_factory(env.obs_space)
+        action_selection_strat = action_selection_strat_factory(
+            env.action_space)
+        pred_strat = pred_strat_factory()
+    Factories (and metrics_func, which maps a trained XCSF to a dict of
+    extra metrics) must therefore be picklable, i.e. module-level callables,
+    classes or functools.partials thereof.
+
+    At most max_workers (default: num cores) runs are in flight at once and
+    each worker is limited to a single BLAS thread so the pool doesn't
+    oversubscribe cores. If save_dir is given, final pop of each run is
+    pickled there."""
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    assert max_workers >= 1
+    if save_dir is not None:
+        os.makedirs(save_dir, exist_ok=True)
+
+    factories = (env_factory, encoding_factory,
+                 action_selection_strat_factory, pred_strat_factory)
+    run_specs = iter(run_specs)
+    # spawn rather than fork so workers import numpy fresh, after BLAS
+    # thread env vars have been set
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             mp_context=mp_context) as executor:
+        # only keep max_workers runs submitted at a time so a large sweep
+        # doesn't queue up all its pickled args at once
+        in_flight = set()
+        for run_spec in itertools.islice(run_specs, max_workers):
+            in_flight.add(
+                _submit_run(executor, run_spec, factories, num_ga_calls,
+                            save_dir, metrics_func))
+        while len(in_flight) > 0:
+            (done, in_flight) = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                for run_spec in itertools.islice(run_specs, 1):
+                    in_flight.add(
+                        _submit_run(executor, run_spec, factories,
+                                    num_ga_calls, save_dir, metrics_func))
+                yield future.result()
+
+
+def _submit_run(executor, run_spec, factories, num_ga_calls, save_dir,
+                metrics_func):
+    # executor spawns any worker it needs within submit(), so BLAS thread env
+    # vars only need to be set around it, and never stay set while caller
+    # holds control between yielded results
+    with _limit_blas_threads():
+        return executor.submit(_run_single, run_spec, factories,
+                               num_ga_calls, save_dir, metrics_func)
+
+
+def _run_single(run_spec, factories, num_ga_calls, save_dir, metrics_func):
+    (env_factory, encoding_factory, action_selection_strat_factory,
+     pred_strat_factory) = factories
+    env = env_factory()
+    encoding = encoding_factory(env.obs_space)
+    action_selection_strat = action_selection_strat_factory(env.action_space)
+    pred_strat = pred_strat_factory()
+    xcsf = XCSF(env, encoding, action_selection_strat, pred_strat,
+                run_spec.hyperparams_dict)
+
+    start_time = time.perf_counter()
+    xcsf.train_for_ga_calls(num_ga_calls)
+    train_time = time.perf_counter() - start_time
+
+    if save_dir is not None:
+        pop_filename = _POP_FILENAME_FMT.format(run_id=run_spec.run_id)
+        pop_path = os.path.join(save_dir, pop_filename)
+        with open(pop_path, "wb") as fp:
+            pickle.dump(xcsf.pop, fp)
+    else:
+        pop_path = None
+    metrics = (metrics_func(xcsf) if metrics_func is not None else {})
+
+    return RunResult(run_id=run_spec.run_id,
+                     hyperparams_dict=run_spec.hyperparams_dict,
+                     num_macros=xcsf.pop.num_macros,
+                     num_micros=xcsf.pop.num_micros,
+                     train_time=train_time,
+                     pop_path=pop_path,
+                     metrics=metrics)
+
+
+@contextlib.contextmanager
+def _limit_blas_threads():
+    """Sets BLAS thread env vars for the duration of the block (so they are
+    inherited by any worker procs spawned in it), then restores them. Keep
+    the block short: the vars are process wide."""
+    old_vals = {name: os.environ.get(name) for name in _BLAS_THREAD_ENV_VARS}
+    for name in _BLAS_THREAD_ENV_VARS:
+        os.environ[name] = str(_BLAS_NUM_THREADS)
+    try:
+        yield
+    finally:
+        for (name, old_val) in old_vals.items():
+            if old_val is None:
+                del os.environ[name]
+            else:
+                os.environ[name] = old_val
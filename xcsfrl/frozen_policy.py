@@ -0,0 +1,152 @@
+import zipfile
+
+import numpy as np
+
+from .augmentation import make_aug_strat
+from .inference import (DEFAULT_MAX_BLOCK_BYTES, calc_action_one_hots,
+                        calc_prediction_arrs, greedy_actions)
+
+_ARR_NAMES = ("lower_bounds", "upper_bounds", "weight_vecs", "fitnesses",
+              "action_idxs", "action_space", "x_nought", "poly_order")
+# size of fixed part of zip local file header, see zip spec
+_ZIP_LOCAL_HEADER_SIZE = 30
+_ZIP_LOCAL_HEADER_NAME_LEN_OFFSET = 26
+
+
+class FrozenPolicy:
+    """Compact, read-only greedy policy compiled from a trained population:
+    just the arrays needed for prediction (condition bounds, weight matrix,
+    fitnesses, dense action ids), x_nought and poly order, with fully
+    vectorised inference. Arrays may be memory-mapped (see load_policy()),
+    so many procs serving the same policy share one copy in memory."""
+    def __init__(self, lower_bounds, upper_bounds, weight_vecs, fitnesses,
+                 action_idxs, action_space, x_nought, poly_order):
+        assert len(lower_bounds) == len(upper_bounds) == len(weight_vecs) \
+            == len(fitnesses) == len(action_idxs)
+        self._lower_bounds = lower_bounds
+        self._upper_bounds = upper_bounds
+        self._weight_vecs = weight_vecs
+        self._fitnesses = fitnesses
+        self._action_idxs = action_idxs
+        self._action_space = np.asarray(action_space)
+        self._x_nought = float(x_nought)
+        self._poly_order = int(poly_order)
+        self._aug_strat = make_aug_strat(self._poly_order)
+        # small (N x |A|), so fine for each proc to have its own
+        self._action_one_hots = calc_action_one_hots(action_idxs,
+                                                     len(action_space))
+
+    @property
+    def num_clfrs(self):
+        return len(self._fitnesses)
+
+    @property
+    def action_space(self):
+        return tuple(self._action_space.tolist())
+
+    def select_action(self, obs):
+        return self.select_actions(np.asarray(obs)[np.newaxis])[0].item()
+
+    def select_actions(self,
+                       obs_arr,
+                       max_block_bytes=DEFAULT_MAX_BLOCK_BYTES):
+        """Greedy actions for each row of (M x n) obs_arr, NULL_ACTION for
+        obs no clfrs match."""
+        return greedy_actions(
+            self.gen_prediction_arrs(obs_arr, max_block_bytes),
+            self._action_space)
+
+    def gen_prediction_arrs(self,
+                            obs_arr,
+                            max_block_bytes=DEFAULT_MAX_BLOCK_BYTES):
+        """(M x |A|) Q-values for each row of (M x n) obs_arr, NaN for
+        actions not covered in an obs' match set."""
+        obs_arr = np.asarray(obs_arr, dtype=np.float64)
+        return calc_prediction_arrs(obs_arr,
+                                    self._aug_strat.aug_many(
+                                        obs_arr, self._x_nought),
+                                    self._lower_bounds,
+                                    self._upper_bounds,
+                                    self._weight_vecs.T,
+                                    self._fitnesses,
+                                    self._action_one_hots,
+                                    max_block_bytes=max_block_bytes)
+
+
+def freeze_policy(pop, x_nought, poly_order):
+    assert pop.num_macros > 0
+    (lower_bounds, upper_bounds, weight_vecs, fitnesses, action_idxs) = \
+        pop.read_all_row_arrs(("lower_bounds", "upper_bounds", "weight_vecs",
+                               "fitness", "action_idxs"))
+    return FrozenPolicy(lower_bounds=lower_bounds,
+                        upper_bounds=upper_bounds,
+                        weight_vecs=weight_vecs.astype(np.float64),
+                        fitnesses=fitnesses,
+                        action_idxs=action_idxs,
+                        action_space=pop.action_space,
+                        x_nought=x_nought,
+                        poly_order=poly_order)
+
+
+def save_policy(policy, path):
+    """Saves policy as an uncompressed .npz, so that its arrays can be
+    memory-mapped on loading."""
+    np.savez(path,
+             lower_bounds=policy._lower_bounds,
+             upper_bounds=policy._upper_bounds,
+             weight_vecs=policy._weight_vecs,
+             fitnesses=policy._fitnesses,
+             action_idxs=policy._action_idxs,
+             action_space=policy._action_space,
+             x_nought=np.array(policy._x_nought),
+             poly_order=np.array(policy._poly_order))
+
+
+def load_policy(path, mmap=True):
+    """Loads policy saved by save_policy(). If mmap, its arrays are read-only
+    memory maps onto the file rather than copies, so loading is near
+    instant and the OS page cache is shared between procs."""
+    if mmap:
+        arrs = _memmap_npz(path)
+    else:
+        with np.load(path) as npz:
+            arrs = {name: npz[name] for name in _ARR_NAMES}
+    return FrozenPolicy(**{name: arrs[name] for name in _ARR_NAMES})
+
+
+def _memmap_npz(path):
+    """np.load() ignores mmap_mode for .npz files, so memory-map each
+    (stored, i.e. uncompressed) .npy member directly at its offset in the
+    zip archive."""
+    arrs = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as fp:
+        for info in zf.infolist():
+            assert info.compress_type == zipfile.ZIP_STORED
+            # local header name/extra field lens can differ from those in
+            # the central directory, so read them from the local header
+            fp.seek(info.header_offset + _ZIP_LOCAL_HEADER_NAME_LEN_OFFSET)
+            name_len = int.from_bytes(fp.read(2), "little")
+            extra_len = int.from_bytes(fp.read(2), "little")
+            fp.seek(info.header_offset + _ZIP_LOCAL_HEADER_SIZE + name_len +
+                    extra_len)
+            version = np.lib.format.read_magic(fp)
+            if version == (1, 0):
+                (shape, fortran_order,
+                 dtype) = np.lib.format.read_array_header_1_0(fp)
+            else:
+                assert version == (2, 0)
+                (shape, fortran_order,
+                 dtype) = np.lib.format.read_array_header_2_0(fp)
+            name = info.filename[:-len(".npy")]
+            if len(shape) == 0:
+                # memmap can't do 0-d arrays, and scalars are tiny anyway
+                arrs[name] = np.frombuffer(fp.read(dtype.itemsize),
+                                           dtype=dtype)[0]
+            else:
+                arrs[name] = np.memmap(path,
+                                       dtype=dtype,
+                                       mode="r",
+                                       offset=fp.tell(),
+                                       shape=shape,
+                                       order=("F" if fortran_order else "C"))
+    return arrs
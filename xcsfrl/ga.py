@@ -1,11 +1,8 @@
-import copy
 import logging
 
-from .classifier import RLSClassifier
 from .condition import Condition
 from .deletion import deletion
-from .hyperparams import get_hyperparam as get_hp
-from .rng import get_rng
+from .stats import NULL_STATS
 from .subsumption import does_subsume
 
 _ERROR_CUTDOWN = 0.25
@@ -13,25 +10,27 @@ _NICHE_MIN_ERROR_CUTDOWN = _ERROR_CUTDOWN
 _FITNESS_CUTDOWN = 0.1
 
 
-def run_ga(action_set, pop, time_step, encoding, action_space):
+def run_ga(action_set,
+           pop,
+           time_step,
+           encoding,
+           action_space,
+           hyperparams,
+           rng_streams,
+           stats=NULL_STATS,
+           deletion_func=deletion):
+    rng = rng_streams.ga
     for clfr in action_set:
         clfr.time_stamp = time_step
 
-    parent_a = _tournament_selection(action_set)
-    parent_b = _tournament_selection(action_set)
-    child_a = copy.deepcopy(parent_a)
-    child_b = copy.deepcopy(parent_b)
-    child_a.numerosity = 1
-    child_b.numerosity = 1
-    child_a.experience = 0
-    child_b.experience = 0
-    for child in (child_a, child_b):
-        if isinstance(child, RLSClassifier):
-            child.reset_cov_mat()
+    parent_a = _tournament_selection(action_set, hyperparams, rng, stats)
+    parent_b = _tournament_selection(action_set, hyperparams, rng, stats)
+    child_a = parent_a.clone_for_offspring()
+    child_b = parent_b.clone_for_offspring()
 
-    do_crossover = get_rng().random() < get_hp("chi")
+    do_crossover = rng.random() < hyperparams.chi
     if do_crossover:
-        _uniform_crossover(child_a, child_b, encoding)
+        _uniform_crossover(child_a, child_b, encoding, hyperparams, rng)
 
         avg_parent_niche_min_error = (parent_a.niche_min_error +
                                       parent_b.niche_min_error) / 2
@@ -50,48 +49,65 @@ def run_ga(action_set, pop, time_step, encoding, action_space):
         child.niche_min_error *= _NICHE_MIN_ERROR_CUTDOWN
         child.error *= _ERROR_CUTDOWN
         child.fitness *= _FITNESS_CUTDOWN
-        _mutation(child, encoding, action_space)
-
-        if get_hp("do_ga_subsumption"):
-            if does_subsume(parent_a, child):
-                pop.alter_numerosity(parent_a, delta=1, op="ga_subsumption")
-            elif does_subsume(parent_b, child):
-                pop.alter_numerosity(parent_b, delta=1, op="ga_subsumption")
+        _mutation(child, encoding, action_space, hyperparams, rng)
+
+        # parents may have been removed from pop since [A] was formed (e.g.
+        # by deletion), in which case they can't subsume
+        if hyperparams.do_ga_subsumption:
+            start_time = stats.start()
+            if parent_a.owner is pop and does_subsume(parent_a, child,
+                                                      hyperparams):
+                subsumer = parent_a
+            elif parent_b.owner is pop and does_subsume(
+                    parent_b, child, hyperparams):
+                subsumer = parent_b
+            else:
+                subsumer = None
+            stats.stop("subsumption", start_time)
+            if subsumer is not None:
+                pop.alter_numerosity(subsumer, delta=1, op="ga_subsumption")
             else:
                 _insert_in_pop(pop, child)
         else:
             _insert_in_pop(pop, child)
-        deletion(pop)
+        deletion_func(pop, hyperparams, rng_streams.deletion, stats)
 
 
-def _tournament_selection(action_set):
+def _tournament_selection(action_set, hyperparams, rng, stats):
     """From Butz book 'Rule Based Evolutionary Online Learning Systems' SELECT
     OFFSPRING function in Appendix B."""
+    tau = hyperparams.tau
     best = None
+    num_rounds = 0
     while best is None:
+        num_rounds += 1
         max_fitness = 0
         for clfr in action_set:
             if clfr.numerosity_scaled_fitness > max_fitness:
                 for _ in range(clfr.numerosity):
-                    if get_rng().random() < get_hp("tau"):
+                    if rng.random() < tau:
                         best = clfr
                         max_fitness = clfr.numerosity_scaled_fitness
                         break
+    stats.count("tournament_rounds", num_rounds)
     return best
 
 
-def _uniform_crossover(child_a, child_b, encoding):
+def _uniform_crossover(child_a, child_b, encoding, hyperparams, rng):
     """Uniform crossover on condition allele seqs."""
-    a_cond_alleles = child_a.condition.alleles
-    b_cond_alleles = child_b.condition.alleles
+    # children share their conditions with their parents, so must swap
+    # alleles in copies of the allele seqs
+    a_cond_alleles = list(child_a.condition.alleles)
+    b_cond_alleles = list(child_b.condition.alleles)
     assert len(a_cond_alleles) == len(b_cond_alleles)
     n = len(a_cond_alleles)
 
     def _swap(seq_a, seq_b, idx):
         seq_a[idx], seq_b[idx] = seq_b[idx], seq_a[idx]
 
+    upsilon = hyperparams.upsilon
     for idx in range(0, n):
-        if get_rng().random() < get_hp("upsilon"):
+        if rng.random() < upsilon:
             _swap(a_cond_alleles, b_cond_alleles, idx)
 
     a_new_cond = Condition(a_cond_alleles, encoding)
@@ -100,33 +116,31 @@ def _uniform_crossover(child_a, child_b, encoding):
     child_b.condition = b_new_cond
 
 
-def _mutation(child, encoding, action_space):
-    _mutate_condition(child, encoding)
-    _mutate_action(child, action_space)
+def _mutation(child, encoding, action_space, hyperparams, rng):
+    _mutate_condition(child, encoding, hyperparams, rng)
+    _mutate_action(child, action_space, hyperparams, rng)
 
 
-def _mutate_condition(child, encoding):
+def _mutate_condition(child, encoding, hyperparams, rng):
     mut_cond_alleles = encoding.mutate_condition_alleles(
-        child.condition.alleles)
+        child.condition.alleles, hyperparams, rng)
     # make and set new Condition obj so phenotypes are properly pre-calced
     # and cached
     new_cond = Condition(mut_cond_alleles, encoding)
     child.condition = new_cond
 
 
-def _mutate_action(child, action_space):
-    should_mut_action = get_rng().random() < get_hp("mu")
+def _mutate_action(child, action_space, hyperparams, rng):
+    should_mut_action = rng.random() < hyperparams.mu
     if should_mut_action:
         other_actions = list(set(action_space) - {child.action})
-        mut_action = get_rng().choice(other_actions)
+        mut_action = rng.choice(other_actions)
         child.action = mut_action
 
 
 def _insert_in_pop(pop, child):
-    for clfr in pop:
-        # check action first to potentially short circuit more expensive
-        # condition check
-        if (clfr.action == child.action and clfr.condition == child.condition):
-            pop.alter_numerosity(clfr, delta=1, op="absorption")
-            return
-    pop.add_new(child, op="insertion")
+    duplicate = pop.find_duplicate(child)
+    if duplicate is not None:
+        pop.alter_numerosity(duplicate, delta=1, op="absorption")
+    else:
+        pop.add_new(child, op="insertion")
@@ -1,10 +1,55 @@
-_hyperparams_registry = {}
+_REQUIRED_NAMES = ("seed", "N", "beta", "alpha", "epsilon_nought", "nu",
+                   "gamma", "theta_ga", "tau", "chi", "upsilon", "mu",
+                   "theta_del", "delta", "theta_sub", "r_nought", "m_nought",
+                   "mu_I", "epsilon_I", "fitness_I", "weight_I_min",
+                   "weight_I_max", "x_nought", "beta_epsilon",
+                   "do_ga_subsumption", "do_as_subsumption")
+# others (p_explr, delta_rls, lambda_rls, tau_rls, eta) are only needed by
+# particular prediction/action selection strategies so aren't required
 
 
-def register_hyperparams(hyperparams_dict):
-    global _hyperparams_registry
-    _hyperparams_registry = {**_hyperparams_registry, **hyperparams_dict}
+class Hyperparams:
+    """Immutable, validated set of hyperparams owned by a single XCSF
+    instance and passed explicitly to the modules that need it. Access is via
+    attributes, e.g. hyperparams.beta."""
+    def __init__(self, hyperparams_dict):
+        missing_names = [
+            name for name in _REQUIRED_NAMES if name not in hyperparams_dict
+        ]
+        if len(missing_names) > 0:
+            raise ValueError(f"Missing hyperparams: {missing_names}")
+        for (name, val) in hyperparams_dict.items():
+            object.__setattr__(self, name, val)
+        self._validate()
 
+    def _validate(self):
+        if not self.N >= 1:
+            raise ValueError("N must be >= 1")
+        for name in ("beta", "tau", "chi", "upsilon", "mu"):
+            if not 0 <= getattr(self, name) <= 1:
+                raise ValueError(f"{name} must be in [0, 1]")
+        if not self.epsilon_nought > 0:
+            raise ValueError("epsilon_nought must be > 0")
+        if not self.weight_I_min <= self.weight_I_max:
+            raise ValueError("weight_I_min must be <= weight_I_max")
 
-def get_hyperparam(name):
-    return _hyperparams_registry[name]
+    def __setattr__(self, name, val):
+        raise AttributeError("Hyperparams are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Hyperparams are immutable")
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+    def __reduce__(self):
+        return (self.__class__, (self.as_dict(), ))
+
+    def __eq__(self, other):
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.as_dict()!r})"
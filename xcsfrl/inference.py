@@ -0,0 +1,78 @@
+import numpy as np
+
+from .action_selection import NULL_ACTION
+
+DEFAULT_MAX_BLOCK_BYTES = 64 * 2**20
+
+
+def calc_action_one_hots(action_idxs, num_actions):
+    action_one_hots = np.zeros((len(action_idxs), num_actions))
+    action_one_hots[np.arange(len(action_idxs)), action_idxs] = 1.0
+    return action_one_hots
+
+
+def calc_prediction_arrs(obs_arr,
+                         aug_obs_arr,
+                         lower_bounds,
+                         upper_bounds,
+                         weight_vecs_T,
+                         fitnesses,
+                         action_one_hots,
+                         max_block_bytes=DEFAULT_MAX_BLOCK_BYTES):
+    """Prediction arrays for each of M obs (rows of obs_arr, with aug obs in
+    rows of aug_obs_arr) given the arrays of N clfrs, as an (M x |A|) array,
+    columns in action space order and NaN where an action has no clfrs in
+    the obs' match set.
+
+    Done in blocks of obs: for each block, the (block x N) match mask comes
+    from one broadcast comparison against all condition bounds, predictions
+    of all clfrs for all obs in the block from one matrix product, and per
+    action fitness/prediction sums from products with the one-hot (N x |A|)
+    action matrix. Block size is chosen so the intermediate arrays alive at
+    any one time for a block stay within max_block_bytes."""
+    obs_arr = np.asarray(obs_arr, dtype=np.float64)
+    aug_obs_arr = np.asarray(aug_obs_arr, dtype=np.float64)
+    num_obs = len(obs_arr)
+    (num_clfrs, num_actions) = action_one_hots.shape
+    prediction_arrs = np.full((num_obs, num_actions), np.nan)
+    if num_clfrs == 0 or num_obs == 0:
+        return prediction_arrs
+
+    # per obs, either the two (N x n) bool comparisons plus their conjunction
+    # are alive, or the (N,) bool match mask plus three (N,) float64 arrays:
+    # predictions, weights and their product
+    num_dims = obs_arr.shape[1]
+    bytes_per_obs = num_clfrs * max(3 * num_dims, 1 + 3 * 8)
+    block_size = max(1, int(max_block_bytes // bytes_per_obs))
+    for start in range(0, num_obs, block_size):
+        end = min(start + block_size, num_obs)
+        obs_block = obs_arr[start:end, np.newaxis, :]
+        does_match = np.all((lower_bounds <= obs_block) &
+                            (upper_bounds >= obs_block),
+                            axis=2)
+        predictions = aug_obs_arr[start:end] @ weight_vecs_T
+        weights = does_match * fitnesses
+        prediction_sums = (weights * predictions) @ action_one_hots
+        fitness_sums = weights @ action_one_hots
+        counts = does_match @ action_one_hots
+        # same as single obs prediction arr: fitness weighted avg, or raw sum
+        # if all fitnesses are zero
+        safe_fitness_sums = np.where(fitness_sums != 0, fitness_sums, 1.0)
+        prediction_arrs[start:end] = np.where(
+            counts == 0, np.nan,
+            np.where(fitness_sums != 0, prediction_sums / safe_fitness_sums,
+                     prediction_sums))
+    return prediction_arrs
+
+
+def greedy_actions(prediction_arrs, action_space):
+    """Vectorised greedy_action_selection() over rows of (M x |A|)
+    prediction_arrs (NaN for uncovered actions), NULL_ACTION for rows with
+    no covered actions."""
+    is_covered = ~np.isnan(prediction_arrs)
+    has_match = np.any(is_covered, axis=1)
+    # first max in action space order, as in greedy_action_selection()
+    best_idxs = np.argmax(np.where(is_covered, prediction_arrs, -np.inf),
+                          axis=1)
+    actions = np.asarray(action_space)[best_idxs]
+    return np.where(has_match, actions, NULL_ACTION)
@@ -2,6 +2,8 @@ import abc
 
 
 class IntervalABC(metaclass=abc.ABCMeta):
+    __slots__ = ("_lower", "_upper", "_span")
+
     def __init__(self, lower, upper):
         assert lower <= upper
         self._lower = lower
@@ -39,10 +41,14 @@ class IntervalABC(metaclass=abc.ABCMeta):
 
 
 class IntegerInterval(IntervalABC):
+    __slots__ = ()
+
     def _calc_span(self, lower, upper):
         return upper - lower + 1
 
 
 class RealInterval(IntervalABC):
+    __slots__ = ()
+
     def _calc_span(self, lower, upper):
         return upper - lower
@@ -0,0 +1,168 @@
+import abc
+
+import numpy as np
+from rlenvs.obs_space import IntegerObsSpace, RealObsSpace
+
+_INIT_SLOT_CAPACITY = 64
+_SLOT_CAPACITY_GROWTH_FACTOR = 2
+_DEFAULT_NUM_BINS_PER_DIM = 16
+_WORD_SIZE = 64
+_WORD_DTYPE = np.dtype("<u8")  # explicit endianness so bits unpack in order
+
+
+class MatchIndexABC(metaclass=abc.ABCMeta):
+    """Optional index over the conditions of population members, used by
+    Population to generate match sets without scanning every member.
+
+    Members are keyed by their (stable) population slot, so the index is
+    untouched when rows move. Population calls add()/remove() as members
+    come and go or have their conditions replaced, and query() on matching.
+    query() returns candidate slots: a superset of the slots of members
+    whose conditions match obs, which is exact iff is_exact."""
+    def __init__(self, obs_space):
+        self._obs_space = obs_space
+
+    @property
+    @abc.abstractmethod
+    def is_exact(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def add(self, slot, condition):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def remove(self, slot):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def query(self, obs):
+        raise NotImplementedError
+
+
+class RealGridMatchIndex(MatchIndexABC):
+    """Uniform grid index for real obs spaces: each dim is split into
+    num_bins_per_dim equal width bins, and for each (dim, bin) a mask over
+    slots records which members' intervals overlap that bin. Candidates for
+    an obs are the AND of the masks of the bins it falls in, one per dim,
+    i.e. the members whose hyper-rectangles overlap the obs' grid cell. Since
+    conditions usually cover a small part of the obs space, few members need
+    an exact check."""
+    def __init__(self, obs_space, num_bins_per_dim=_DEFAULT_NUM_BINS_PER_DIM):
+        assert isinstance(obs_space, RealObsSpace)
+        super().__init__(obs_space)
+        self._num_bins_per_dim = int(num_bins_per_dim)
+        assert self._num_bins_per_dim >= 1
+        self._dim_lowers = np.array([dim.lower for dim in obs_space],
+                                    dtype=np.float64)
+        self._bin_widths = np.array(
+            [dim.span / self._num_bins_per_dim for dim in obs_space],
+            dtype=np.float64)
+        # masks[d, b, slot] <-> interval of member in slot overlaps bin b of
+        # dim d
+        self._masks = np.zeros(
+            (len(obs_space), self._num_bins_per_dim, _INIT_SLOT_CAPACITY),
+            dtype=bool)
+        self._dim_idxs = np.arange(len(obs_space))
+
+    @property
+    def is_exact(self):
+        return False
+
+    def _calc_bins(self, vals):
+        bins = np.floor((vals - self._dim_lowers) / self._bin_widths)
+        return np.clip(bins, 0, self._num_bins_per_dim - 1).astype(np.int64)
+
+    def add(self, slot, condition):
+        self._ensure_slot_capacity(slot)
+        lower_bins = self._calc_bins(condition.lower_bounds)
+        upper_bins = self._calc_bins(condition.upper_bounds)
+        for (dim_idx, (lower_bin,
+                       upper_bin)) in enumerate(zip(lower_bins.tolist(),
+                                                    upper_bins.tolist())):
+            self._masks[dim_idx, lower_bin:(upper_bin + 1), slot] = True
+
+    def remove(self, slot):
+        self._masks[:, :, slot] = False
+
+    def query(self, obs):
+        bins = self._calc_bins(np.asarray(obs, dtype=np.float64))
+        cell_masks = self._masks[self._dim_idxs, bins]
+        return np.flatnonzero(np.logical_and.reduce(cell_masks, axis=0))
+
+    def _ensure_slot_capacity(self, slot):
+        capacity = self._masks.shape[2]
+        if slot >= capacity:
+            new_capacity = capacity
+            while slot >= new_capacity:
+                new_capacity *= _SLOT_CAPACITY_GROWTH_FACTOR
+            new_masks = np.zeros(self._masks.shape[:2] + (new_capacity, ),
+                                 dtype=bool)
+            new_masks[:, :, :capacity] = self._masks
+            self._masks = new_masks
+
+
+class IntegerBitsetMatchIndex(MatchIndexABC):
+    """Exact index for integer obs spaces: for each dim and each value in
+    that dim, a packed bitset (uint64 words) over slots records which
+    members' intervals contain that value. The slots of members matching an
+    obs are then the bitwise AND of one bitset per dim, so matching costs n
+    word-array ANDs regardless of how many members there are or how many
+    dims they are checked in."""
+    def __init__(self, obs_space):
+        assert isinstance(obs_space, IntegerObsSpace)
+        super().__init__(obs_space)
+        self._dim_lowers = np.array([dim.lower for dim in obs_space],
+                                    dtype=np.int64)
+        self._dim_uppers = np.array([dim.upper for dim in obs_space],
+                                    dtype=np.int64)
+        max_num_vals = int(np.max(self._dim_uppers - self._dim_lowers)) + 1
+        # bits[d, v, w] holds slots [64w, 64(w+1)) for value (lower_d + v) of
+        # dim d
+        self._bits = np.zeros(
+            (len(obs_space), max_num_vals,
+             _INIT_SLOT_CAPACITY // _WORD_SIZE),
+            dtype=_WORD_DTYPE)
+        self._dim_idxs = np.arange(len(obs_space))
+
+    @property
+    def is_exact(self):
+        return True
+
+    def add(self, slot, condition):
+        self._ensure_slot_capacity(slot)
+        (word, bit) = self._calc_word_and_bit(slot)
+        lowers = condition.lower_bounds.astype(np.int64) - self._dim_lowers
+        uppers = condition.upper_bounds.astype(np.int64) - self._dim_lowers
+        for (dim_idx, (lower, upper)) in enumerate(
+                zip(lowers.tolist(), uppers.tolist())):
+            self._bits[dim_idx, lower:(upper + 1), word] |= bit
+
+    def remove(self, slot):
+        (word, bit) = self._calc_word_and_bit(slot)
+        self._bits[:, :, word] &= ~bit
+
+    def query(self, obs):
+        obs = np.asarray(obs).astype(np.int64)
+        if np.any(obs < self._dim_lowers) or np.any(obs > self._dim_uppers):
+            # conditions never extend outside obs space
+            return np.empty(0, dtype=np.int64)
+        words = self._bits[self._dim_idxs, obs - self._dim_lowers]
+        words = np.bitwise_and.reduce(words, axis=0)
+        return np.flatnonzero(
+            np.unpackbits(words.view(np.uint8), bitorder="little"))
+
+    def _calc_word_and_bit(self, slot):
+        return (slot // _WORD_SIZE,
+                _WORD_DTYPE.type(1) << _WORD_DTYPE.type(slot % _WORD_SIZE))
+
+    def _ensure_slot_capacity(self, slot):
+        num_words = self._bits.shape[2]
+        if slot >= (num_words * _WORD_SIZE):
+            new_num_words = num_words
+            while slot >= (new_num_words * _WORD_SIZE):
+                new_num_words *= _SLOT_CAPACITY_GROWTH_FACTOR
+            new_bits = np.zeros(self._bits.shape[:2] + (new_num_words, ),
+                                dtype=_WORD_DTYPE)
+            new_bits[:, :, :num_words] = self._bits
+            self._bits = new_bits
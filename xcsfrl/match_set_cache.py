@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+
+class MatchSetCache:
+    """Bounded LRU cache of match sets keyed on obs (as a tuple), for tasks
+    in which the same (discrete) obs are visited over and over.
+
+    Each entry is stamped with the population version it was generated at,
+    and only served while the population is still at that version, i.e. no
+    clfrs have been added/removed or had their conditions changed since, so
+    stale match sets are never returned."""
+    def __init__(self, max_size):
+        max_size = int(max_size)
+        assert max_size >= 1
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._num_hits = 0
+        self._num_misses = 0
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @property
+    def num_hits(self):
+        return self._num_hits
+
+    @property
+    def num_misses(self):
+        return self._num_misses
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, obs_key, pop_version):
+        """Returns (a copy of, since callers may extend it) the cached match
+        set for obs_key, or None if there isn't a current one."""
+        entry = self._entries.get(obs_key)
+        if entry is not None and entry[0] == pop_version:
+            self._entries.move_to_end(obs_key)
+            self._num_hits += 1
+            return list(entry[1])
+        else:
+            self._num_misses += 1
+            return None
+
+    def put(self, obs_key, pop_version, match_set):
+        self._entries[obs_key] = (pop_version, list(match_set))
+        self._entries.move_to_end(obs_key)
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
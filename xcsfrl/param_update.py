@@ -1,46 +1,143 @@
 import numpy as np
 
-from .hyperparams import get_hyperparam as get_hp
+from .stats import NULL_STATS
 from .subsumption import action_set_subsumption
 from .util import calc_num_micros
 
 np.seterr(divide="raise", over="raise", invalid="raise")
 
 _MAX_ACC = 1.0
+_UPDATE_PARAM_NAMES = ("experience", "niche_min_error", "error",
+                       "action_set_size", "fitness")
+
+
+def update_action_set(action_set,
+                      payoff,
+                      obs,
+                      pop,
+                      pred_strat,
+                      hyperparams,
+                      stats=NULL_STATS,
+                      aug_obs_cache=None):
+    if aug_obs_cache is not None:
+        (aug_obs, proc_obs) = aug_obs_cache.get(obs)
+    else:
+        aug_obs = pred_strat.aug_obs(obs, hyperparams.x_nought)
+        proc_obs = pred_strat.process_aug_obs(aug_obs)
+
+    # error updates need pre-update predictions, so prediction updates must
+    # come after them
+    rows = pop.find_rows(action_set)
+    if rows is not None:
+        _update_params_vectorised(action_set, rows, payoff, aug_obs, pop,
+                                  hyperparams)
+        pred_strat.update_predictions(pop, rows, payoff, aug_obs, proc_obs,
+                                      hyperparams)
+    else:
+        # some clfrs in [A] have been removed from pop since [A] was formed,
+        # so pop's arrays cannot be used for them
+        update_params_per_clfr(action_set, payoff, aug_obs, hyperparams)
+        for clfr in action_set:
+            pred_strat.update_prediction(clfr, payoff, aug_obs, proc_obs,
+                                         hyperparams)
+
+    if hyperparams.do_as_subsumption:
+        start_time = stats.start()
+        action_set_subsumption(action_set, pop, hyperparams)
+        stats.stop("subsumption", start_time)
+
+
+def _update_params_vectorised(action_set, rows, payoff, aug_obs, pop,
+                              hyperparams):
+    """Array-based equivalent of update_params_per_clfr(): reads params of
+    [A] as vectors from pop, applies the same Widrow-Hoff/MAM and fitness
+    updates with masks, then writes results back to pop and clfrs. Results
+    are equal to the per clfr ones up to float rounding: numpy's power and
+    the accuracy sum can differ from the scalar ones in the last bit, e.g.
+    ~1e-17 in fitness."""
+    (experiences, niche_min_errors, errors, action_set_sizes, fitnesses,
+     numerosities) = pop.read_params(rows, _UPDATE_PARAM_NAMES +
+                                     ("numerosity", ))
+    predictions = pop.calc_predictions(rows, aug_obs)
+    beta = hyperparams.beta
+    beta_epsilon = hyperparams.beta_epsilon
+    e_nought = hyperparams.epsilon_nought
+
+    use_niche_min_error = (beta_epsilon != 0)
+    if use_niche_min_error:
+        min_error_as = np.min(errors)
+    as_num_micros = np.sum(numerosities)
 
-
-def update_action_set(action_set, payoff, obs, pop, pred_strat, x_nought):
-    use_niche_min_error = (get_hp("beta_epsilon") != 0)
+    experiences += 1
+    payoff_diffs = np.abs(payoff - predictions)
+    if use_niche_min_error:
+        niche_min_errors += _calc_mam_deltas(
+            (min_error_as - niche_min_errors), experiences, beta_epsilon)
+        error_targets = np.where(
+            (payoff_diffs - niche_min_errors) >= 0,
+            (payoff_diffs - niche_min_errors - errors), (e_nought - errors))
+    else:
+        error_targets = (payoff_diffs - errors)
+    errors += _calc_mam_deltas(error_targets, experiences, beta)
+    action_set_sizes += _calc_mam_deltas((as_num_micros - action_set_sizes),
+                                         experiences, beta)
+
+    accs = np.full(len(rows), _MAX_ACC)
+    is_inaccurate = ~(errors < e_nought)
+    accs[is_inaccurate] = (hyperparams.alpha *
+                           (errors[is_inaccurate] / e_nought)**(
+                               -1 * hyperparams.nu))
+    # sequential sum in the same order as per clfr version, though accs
+    # themselves may already differ from it by rounding
+    acc_sum = np.cumsum(accs * numerosities)[-1]
+    relative_accs = (accs * numerosities / acc_sum)
+    fitnesses += (beta * (relative_accs - fitnesses))
+
+    pop.write_params(rows,
+                     experience=experiences,
+                     niche_min_error=niche_min_errors,
+                     error=errors,
+                     action_set_size=action_set_sizes,
+                     fitness=fitnesses)
+    for (clfr, *params) in zip(action_set, experiences.tolist(),
+                               niche_min_errors.tolist(), errors.tolist(),
+                               action_set_sizes.tolist(), fitnesses.tolist()):
+        clfr.load_update_params(*params)
+
+
+def _calc_mam_deltas(targets, experiences, beta):
+    """Vectorised moyenne adaptative modifiee (MAM) technique: 1/experience
+    learning rate while experience < 1/beta, then beta."""
+    return np.where(experiences < (1 / beta), (targets / experiences),
+                    (beta * targets))
+
+
+def update_params_per_clfr(action_set, payoff, aug_obs, hyperparams):
+    use_niche_min_error = (hyperparams.beta_epsilon != 0)
     if use_niche_min_error:
         min_error_as = min([clfr.error for clfr in action_set])
     else:
         min_error_as = None
 
     as_num_micros = calc_num_micros(action_set)
-    aug_obs = pred_strat.aug_obs(obs, x_nought)
-    proc_obs = pred_strat.process_aug_obs(aug_obs)
 
     for clfr in action_set:
         _update_experience(clfr)
         if use_niche_min_error:
-            _update_niche_min_error(clfr, min_error_as)
-            _update_error_with_mu(clfr, payoff, aug_obs)
+            _update_niche_min_error(clfr, min_error_as, hyperparams)
+            _update_error_with_mu(clfr, payoff, aug_obs, hyperparams)
         else:
-            _update_error(clfr, payoff, aug_obs)
-        pred_strat.update_prediction(clfr, payoff, aug_obs, proc_obs)
-        _update_action_set_size(clfr, as_num_micros)
-    _update_fitness(action_set)
-
-    if get_hp("do_as_subsumption"):
-        action_set_subsumption(action_set, pop)
+            _update_error(clfr, payoff, aug_obs, hyperparams)
+        _update_action_set_size(clfr, as_num_micros, hyperparams)
+    _update_fitness(action_set, hyperparams)
 
 
 def _update_experience(clfr):
     clfr.experience += 1
 
 
-def _update_niche_min_error(clfr, min_error_as):
-    beta_epsilon = get_hp("beta_epsilon")
+def _update_niche_min_error(clfr, min_error_as, hyperparams):
+    beta_epsilon = hyperparams.beta_epsilon
     min_error_diff = (min_error_as - clfr.niche_min_error)
     if clfr.experience < (1 / beta_epsilon):
         clfr.niche_min_error += (min_error_diff / clfr.experience)
@@ -48,15 +145,15 @@ def _update_niche_min_error(clfr, min_error_as):
         clfr.niche_min_error += (beta_epsilon * min_error_diff)
 
 
-def _update_error_with_mu(clfr, payoff, aug_obs):
-    beta = get_hp("beta")
+def _update_error_with_mu(clfr, payoff, aug_obs, hyperparams):
+    beta = hyperparams.beta
     payoff_diff = abs(payoff - clfr.prediction(aug_obs))
     # use scheme described in Lanzi '99 An Extension to XCS for Stochastic
     # Environments
     if (payoff_diff - clfr.niche_min_error) >= 0:
         error_target = (payoff_diff - clfr.niche_min_error - clfr.error)
     else:
-        error_target = (get_hp("epsilon_nought") - clfr.error)
+        error_target = (hyperparams.epsilon_nought - clfr.error)
 
     if clfr.experience < (1 / beta):
         clfr.error += (error_target / clfr.experience)
@@ -64,8 +161,8 @@ def _update_error_with_mu(clfr, payoff, aug_obs):
         clfr.error += (beta * error_target)
 
 
-def _update_error(clfr, payoff, aug_obs):
-    beta = get_hp("beta")
+def _update_error(clfr, payoff, aug_obs, hyperparams):
+    beta = hyperparams.beta
     payoff_diff = abs(payoff - clfr.prediction(aug_obs))
     error_target = (payoff_diff - clfr.error)
     if clfr.experience < (1 / beta):
@@ -74,8 +171,8 @@ def _update_error(clfr, payoff, aug_obs):
         clfr.error += (beta * error_target)
 
 
-def _update_action_set_size(clfr, as_num_micros):
-    beta = get_hp("beta")
+def _update_action_set_size(clfr, as_num_micros, hyperparams):
+    beta = hyperparams.beta
     as_size_diff = (as_num_micros - clfr.action_set_size)
     if clfr.experience < (1 / beta):
         clfr.action_set_size += (as_size_diff / clfr.experience)
@@ -83,19 +180,19 @@ def _update_action_set_size(clfr, as_num_micros):
         clfr.action_set_size += (beta * as_size_diff)
 
 
-def _update_fitness(action_set):
+def _update_fitness(action_set, hyperparams):
     acc_sum = 0
     acc_vec = []
-    e_nought = get_hp("epsilon_nought")
+    e_nought = hyperparams.epsilon_nought
     for clfr in action_set:
         if clfr.error < e_nought:
             acc = _MAX_ACC
         else:
-            acc = (get_hp("alpha") *
-                   (clfr.error / e_nought)**(-1 * get_hp("nu")))
+            acc = (hyperparams.alpha *
+                   (clfr.error / e_nought)**(-1 * hyperparams.nu))
         acc_vec.append(acc)
         acc_sum += (acc * clfr.numerosity)
 
     for (clfr, acc) in zip(action_set, acc_vec):
         relative_acc = (acc * clfr.numerosity / acc_sum)
-        clfr.fitness += (get_hp("beta") * (relative_acc - clfr.fitness))
+        clfr.fitness += (hyperparams.beta * (relative_acc - clfr.fitness))
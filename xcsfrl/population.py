@@ -1,8 +1,60 @@
+import numpy as np
+
+from .classifier import RLSClassifier
+from .inference import (DEFAULT_MAX_BLOCK_BYTES, calc_action_one_hots,
+                        calc_prediction_arrs)
+from .sum_tree import SumTree
+
+_INIT_CAPACITY = 64
+_CAPACITY_GROWTH_FACTOR = 2
+# params that increased deletion votes depend on
+_INCREASED_VOTE_PARAM_NAMES = ("experience", "fitness", "action_set_size",
+                               "numerosity")
+# scalar params of clfrs mirrored in row arrays, with their dtypes
+_PARAM_DTYPES = {
+    "niche_min_error": np.float64,
+    "error": np.float64,
+    "fitness": np.float64,
+    "experience": np.int64,
+    "action_set_size": np.float64,
+    "numerosity": np.int64
+}
+
+
 class Population:
     """Population is just a list of macroclassifiers with tracking of the number of
     microclassifiers, in order to avoid having to calculate this number on the
-    fly repeatedly and waste time."""
-    def __init__(self):
+    fly repeatedly and waste time.
+
+    Alongside the list, the parameters of macroclassifiers that are needed on
+    every step are kept in contiguous row arrays (row i <-> self._clfrs[i]):
+    condition lower/upper bounds, weight vecs, cov mats (RLS only), dense
+    action indices (position of action in action space) and the scalar params
+    in _PARAM_DTYPES. This lets matching, prediction and param updates be done
+    as a few array operations rather than Python loops over
+    macroclassifiers. Removal swaps the last row into the removed row, so the
+    list and row arrays stay compact in lock-step and removal is O(1).
+    Since rows can move, each member is also handed a slot: a stable id for
+    as long as it is a member (recycled via a free list once it is not),
+    with a slot -> row position map kept up to date.
+
+    A hash index from (action, condition) to macroclassifier is also kept,
+    giving constant time duplicate checks (GA absorption) and lookups of
+    members equal to a given clfr.
+
+    For deletion, sum trees over the fitnesses and (base) deletion votes of
+    all rows are also maintained, so that the population's fitness sum is
+    always on hand and rows can be sampled in proportion to their deletion
+    votes in O(log n), without rescanning the population. A third sum tree
+    holds, for rows with experience > theta_del, deletion vote / numerosity
+    scaled fitness (0 for other rows): the increased deletion vote each such
+    row would get per unit of avg fitness in the pop, see deletion module.
+
+    Optionally, a match index (see match_index module) over members'
+    conditions can be given, which is kept up to date with membership and
+    condition changes and used to only visit candidate members on
+    matching."""
+    def __init__(self, action_space, theta_del, match_index=None):
         self._clfrs = []
         self._num_micros = 0
         self._ops_history = {
@@ -13,6 +65,27 @@ class Population:
             "ga_subsumption": 0,
             "as_subsumption": 0
         }
+        self._action_space = tuple(action_space)
+        self._action_idx_map = {
+            action: idx
+            for (idx, action) in enumerate(self._action_space)
+        }
+        # row arrays allocated lazily on first insertion, since num dims of
+        # conditions/weight vecs is not known until then
+        self._arrs = None
+        self._fitness_tree = SumTree(_INIT_CAPACITY)
+        self._deletion_vote_tree = SumTree(_INIT_CAPACITY)
+        self._theta_del = theta_del
+        self._increased_vote_tree = SumTree(_INIT_CAPACITY)
+        # (action, condition) pair is unique for all macroclassifiers
+        self._phenotype_index = {}
+        self._slot_rows = None
+        self._free_slots = []
+        self._num_slots_issued = 0
+        self._match_index = match_index
+        # bumped whenever the set of members or their conditions change,
+        # i.e. whenever match sets may change
+        self._version = 0
 
     @property
     def num_macros(self):
@@ -26,13 +99,58 @@ class Population:
     def ops_history(self):
         return self._ops_history
 
+    @property
+    def action_space(self):
+        return self._action_space
+
+    @property
+    def fitness_sum(self):
+        return self._fitness_tree.total
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def deletion_vote_sum(self):
+        return self._deletion_vote_tree.total
+
+    def find_row_by_deletion_vote(self, cum_vote):
+        """Roulette wheel lookup over (base) deletion votes of all rows."""
+        return self._deletion_vote_tree.find(cum_vote)
+
+    @property
+    def increased_vote_sum(self):
+        """Sum of increased deletion votes per unit avg fitness of all
+        experienced rows."""
+        return self._increased_vote_tree.total
+
+    def find_row_by_increased_vote(self, cum_vote):
+        """Roulette wheel lookup over increased deletion votes per unit avg
+        fitness of all experienced rows."""
+        return self._increased_vote_tree.find(cum_vote)
+
     def add_new(self, clfr, op):
+        row = len(self._clfrs)
+        self._ensure_capacity(num_rows=(row + 1), clfr=clfr)
         self._clfrs.append(clfr)
+        self._add_to_phenotype_index(clfr.action, clfr.condition, clfr)
+        slot = self._issue_slot(row)
+        if self._match_index is not None:
+            self._match_index.add(slot, clfr.condition)
+        self._write_row(row, clfr)
+        self._arrs["slots"][row] = slot
+        self._fitness_tree.update(row, clfr.fitness)
+        self._deletion_vote_tree.update(row, clfr.deletion_vote)
+        self._increased_vote_tree.update(row, self._calc_increased_vote(clfr))
+        clfr.attach(self, row, slot)
+        self._version += 1
         self._num_micros += clfr.numerosity
         assert op in ("covering", "insertion")
         self._ops_history[op] += clfr.numerosity
 
     def alter_numerosity(self, clfr, delta, op):
+        assert clfr.owner is self
         clfr.numerosity += delta
         self._num_micros += delta
         assert op in ("absorption", "deletion", "ga_subsumption",
@@ -41,12 +159,515 @@ class Population:
         self._ops_history[op] += abs(delta)
 
     def remove(self, clfr, op=None):
-        self._clfrs.remove(clfr)
+        row = self._find_row(clfr)
+        member = self._clfrs[row]
+        del self._phenotype_index[(member.action, member.condition)]
+        self._free_slots.append(member.slot)
+        self._slot_rows[member.slot] = -1
+        if self._match_index is not None:
+            self._match_index.remove(member.slot)
+        member.detach()
+
+        # fill the gap with the last row
+        last_row = len(self._clfrs) - 1
+        if row != last_row:
+            moved = self._clfrs[last_row]
+            self._clfrs[row] = moved
+            for arr in self._arrs.values():
+                arr[row] = arr[last_row]
+            self._fitness_tree.update(row, self._fitness_tree[last_row])
+            self._deletion_vote_tree.update(row,
+                                            self._deletion_vote_tree[last_row])
+            self._increased_vote_tree.update(
+                row, self._increased_vote_tree[last_row])
+            self._slot_rows[moved.slot] = row
+            moved.attach(self, row, moved.slot)
+        self._clfrs.pop()
+        self._fitness_tree.update(last_row, 0.0)
+        self._deletion_vote_tree.update(last_row, 0.0)
+        self._increased_vote_tree.update(last_row, 0.0)
+        self._version += 1
+
         self._num_micros -= clfr.numerosity
         if op is not None:
             assert op == "deletion"
             self._ops_history[op] += clfr.numerosity
 
+    def _find_row(self, clfr):
+        if clfr.owner is self:
+            return clfr.row
+        else:
+            # clfr is not a member itself (e.g. a copy), so find the member
+            # equal to it (same semantics as list.remove)
+            member = self.find_duplicate(clfr)
+            if member is None:
+                raise ValueError("clfr not in population")
+            return member.row
+
+    def _issue_slot(self, row):
+        if len(self._free_slots) > 0:
+            slot = self._free_slots.pop()
+        else:
+            slot = self._num_slots_issued
+            self._num_slots_issued += 1
+        self._slot_rows[slot] = row
+        return slot
+
+    def slot_rows(self, slots):
+        """Position map: returns current rows of member(s) in given
+        slot(s)."""
+        return self._slot_rows[slots]
+
+    def find_duplicate(self, clfr):
+        """Returns the macroclassifier with the same action and condition
+        (phenotype) as clfr, or None if there is no such macroclassifier."""
+        return self._phenotype_index.get((clfr.action, clfr.condition))
+
+    def _add_to_phenotype_index(self, action, condition, clfr):
+        key = (action, condition)
+        assert key not in self._phenotype_index
+        self._phenotype_index[key] = clfr
+
+    def find_rows(self, clfr_set):
+        """Returns rows of clfrs in clfr_set, or None if any of them are no
+        longer members (e.g. deleted since clfr_set was formed)."""
+        rows = []
+        for clfr in clfr_set:
+            if clfr.owner is not self:
+                return None
+            rows.append(clfr.row)
+        return np.asarray(rows, dtype=np.int64)
+
+    def weight_vec_view(self, row):
+        return self._arrs["weight_vecs"][row]
+
+    def cov_mat_view(self, row):
+        return self._arrs["cov_mats"][row]
+
+    def weight_vec_views(self, num_rows):
+        """Stacked weight vecs of first num_rows rows, iterating over which
+        gives the same views as weight_vec_view() for each row."""
+        return self._arrs["weight_vecs"][:num_rows]
+
+    def cov_mat_views(self, num_rows):
+        return self._arrs["cov_mats"][:num_rows]
+
+    def on_condition_change(self, clfr, old_condition):
+        """Called by member clfrs when their condition is replaced."""
+        del self._phenotype_index[(clfr.action, old_condition)]
+        self._add_to_phenotype_index(clfr.action, clfr.condition, clfr)
+        self._write_condition_row(clfr.row, clfr.condition)
+        if self._match_index is not None:
+            self._match_index.remove(clfr.slot)
+            self._match_index.add(clfr.slot, clfr.condition)
+        self._version += 1
+
+    def on_action_change(self, clfr, old_action):
+        """Called by member clfrs when their action is set."""
+        del self._phenotype_index[(old_action, clfr.condition)]
+        self._add_to_phenotype_index(clfr.action, clfr.condition, clfr)
+        self._arrs["action_idxs"][clfr.row] = \
+            self._action_idx_map[clfr.action]
+
+    def on_param_change(self, clfr, name, val):
+        """Called by member clfrs when one of their scalar params is set."""
+        row = clfr.row
+        self._arrs[name][row] = val
+        if name == "fitness":
+            self._fitness_tree.update(row, val)
+        elif name in ("action_set_size", "numerosity"):
+            self._deletion_vote_tree.update(row, clfr.deletion_vote)
+        if name in _INCREASED_VOTE_PARAM_NAMES:
+            self._increased_vote_tree.update(row,
+                                             self._calc_increased_vote(clfr))
+
+    def _calc_increased_vote(self, clfr):
+        # zero fitness clfrs get none: their increase (avg fitness / 0 times
+        # base vote) is unbounded, and deletion never gives them one
+        if clfr.deletion_has_sufficient_exp and clfr.fitness > 0:
+            return clfr.deletion_vote / clfr.numerosity_scaled_fitness
+        else:
+            return 0.0
+
+    def read_params(self, rows, names):
+        """Returns copies of values of named scalar params in given rows."""
+        return tuple(self._arrs[name][rows] for name in names)
+
+    def read_all_params(self, names):
+        """Returns read-only views of values of named scalar params in all
+        rows."""
+        num_rows = len(self._clfrs)
+        return tuple(self._arrs[name][:num_rows] for name in names)
+
+    def read_all_row_arrs(self, names):
+        """Returns copies of named row arrays (e.g. "lower_bounds",
+        "weight_vecs", "action_idxs" or any scalar param) over all rows."""
+        num_rows = len(self._clfrs)
+        return tuple(self._arrs[name][:num_rows].copy() for name in names)
+
+    def read_row_arrs(self, rows, names):
+        """Returns copies of named row arrays (e.g. "weight_vecs",
+        "cov_mats") in given rows."""
+        return tuple(self._arrs[name][rows] for name in names)
+
+    def write_row_arrs(self, rows, **arrs):
+        """Writes values of named non-param row arrays ("weight_vecs",
+        "cov_mats") to given rows. Member clfrs' weight vecs and cov mats are
+        views onto these, so see the new values without further updates."""
+        for (name, vals) in arrs.items():
+            assert name in ("weight_vecs", "cov_mats")
+            self._arrs[name][rows] = vals
+
+    def read_condition_bounds(self, rows):
+        """Returns copies of (lower bounds, upper bounds) of conditions in
+        given rows, each of shape (len(rows), num_dims)."""
+        return (self._arrs["lower_bounds"][rows],
+                self._arrs["upper_bounds"][rows])
+
+    def write_params(self, rows, **params):
+        """Writes values of named scalar params to given rows. Only updates
+        the row arrays: it is up to the caller to update the clfrs in those
+        rows to match."""
+        for (name, vals) in params.items():
+            assert name in _PARAM_DTYPES
+            self._arrs[name][rows] = vals
+        if "fitness" in params:
+            self._fitness_tree.update_many(rows, self._arrs["fitness"][rows])
+        if "action_set_size" in params or "numerosity" in params:
+            self._deletion_vote_tree.update_many(
+                rows, self._calc_deletion_votes(rows))
+        if any(name in _INCREASED_VOTE_PARAM_NAMES for name in params):
+            self._increased_vote_tree.update_many(
+                rows, self._calc_increased_votes(rows))
+
+    def _calc_deletion_votes(self, rows):
+        # same calc as ClassifierBase._calc_deletion_vote()
+        return (self._arrs["action_set_size"][rows] *
+                self._arrs["numerosity"][rows])
+
+    def _calc_increased_votes(self, rows):
+        # same calc as _calc_increased_vote()
+        rows = np.asarray(rows)
+        increased_votes = np.zeros(len(rows))
+        has_increase = ((self._arrs["experience"][rows] > self._theta_del) &
+                        (self._arrs["fitness"][rows] > 0))
+        rows = rows[has_increase]
+        numerosities = self._arrs["numerosity"][rows]
+        increased_votes[has_increase] = (
+            self._calc_deletion_votes(rows) /
+            (self._arrs["fitness"][rows] / numerosities))
+        return increased_votes
+
+    def gen_match_set(self, obs):
+        num_rows = len(self._clfrs)
+        if num_rows == 0:
+            return []
+        obs = np.asarray(obs, dtype=np.float64)
+        if self._match_index is not None:
+            return self._gen_match_set_indexed(obs)
+        in_bounds = ((self._arrs["lower_bounds"][:num_rows] <= obs) &
+                     (self._arrs["upper_bounds"][:num_rows] >= obs))
+        does_match = np.all(in_bounds, axis=1)
+        clfrs = self._clfrs
+        return [clfrs[row] for row in np.flatnonzero(does_match).tolist()]
+
+    def _gen_match_set_indexed(self, obs):
+        # rows sorted so match set is in same order as with a full scan
+        rows = np.sort(self._slot_rows[self._match_index.query(obs)])
+        if not self._match_index.is_exact:
+            in_bounds = ((self._arrs["lower_bounds"][rows] <= obs) &
+                         (self._arrs["upper_bounds"][rows] >= obs))
+            rows = rows[np.all(in_bounds, axis=1)]
+        clfrs = self._clfrs
+        return [clfrs[row] for row in rows.tolist()]
+
+    def gen_match_sets(self, obs_arr):
+        """Vectorised gen_match_set() for each row of (K x n) obs_arr: all K
+        match sets from one broadcast comparison against the condition
+        bounds."""
+        num_rows = len(self._clfrs)
+        if num_rows == 0:
+            return [[] for _ in range(len(obs_arr))]
+        if self._match_index is not None:
+            return [self.gen_match_set(obs) for obs in obs_arr]
+        obs_arr = np.asarray(obs_arr, dtype=np.float64)
+        lower_bounds = self._arrs["lower_bounds"][:num_rows]
+        upper_bounds = self._arrs["upper_bounds"][:num_rows]
+        in_bounds = ((lower_bounds <= obs_arr[:, np.newaxis, :]) &
+                     (upper_bounds >= obs_arr[:, np.newaxis, :]))
+        does_match = np.all(in_bounds, axis=2)
+        clfrs = self._clfrs
+        return [[clfrs[row] for row in np.flatnonzero(row_mask).tolist()]
+                for row_mask in does_match]
+
+    def calc_predictions(self, rows, aug_obs):
+        return self._arrs["weight_vecs"][rows] @ aug_obs
+
+    def calc_action_prediction_sums(self, clfr_set, aug_obs):
+        """Computes, for each action in action space (in order), the sum of
+        fitness-weighted predictions, the sum of fitnesses, and the number of
+        clfrs advocating that action in clfr_set. Predictions of all members
+        of clfr_set are done as one matrix-vector product over their stacked
+        weight vecs, and the per-action sums as grouped reductions over their
+        dense action indices.
+
+        Members of clfr_set may have been removed from the population since
+        clfr_set was formed (e.g. deleted during covering), so those are
+        handled individually."""
+        num_actions = len(self._action_space)
+        if len(clfr_set) == 0:
+            return (np.zeros(num_actions), np.zeros(num_actions),
+                    np.zeros(num_actions, dtype=np.int64))
+
+        all_fitnesses = self._arrs["fitness"]
+        all_action_idxs = self._arrs["action_idxs"]
+        rows = [clfr.row if clfr.owner is self else -1 for clfr in clfr_set]
+        rows = np.asarray(rows, dtype=np.int64)
+        is_member = (rows >= 0)
+        if np.all(is_member):
+            predictions = self.calc_predictions(rows, aug_obs)
+            fitnesses = all_fitnesses[rows]
+            action_idxs = all_action_idxs[rows]
+        else:
+            predictions = np.empty(len(clfr_set))
+            fitnesses = np.empty(len(clfr_set))
+            action_idxs = np.empty(len(clfr_set), dtype=np.int64)
+            member_rows = rows[is_member]
+            predictions[is_member] = self.calc_predictions(
+                member_rows, aug_obs)
+            fitnesses[is_member] = all_fitnesses[member_rows]
+            action_idxs[is_member] = all_action_idxs[member_rows]
+            for idx in np.flatnonzero(~is_member):
+                clfr = clfr_set[idx]
+                predictions[idx] = clfr.prediction(aug_obs)
+                fitnesses[idx] = clfr.fitness
+                action_idxs[idx] = self._action_idx_map[clfr.action]
+
+        prediction_sums = np.bincount(action_idxs,
+                                      weights=(predictions * fitnesses),
+                                      minlength=num_actions)
+        fitness_sums = np.bincount(action_idxs,
+                                   weights=fitnesses,
+                                   minlength=num_actions)
+        counts = np.bincount(action_idxs, minlength=num_actions)
+        return (prediction_sums, fitness_sums, counts)
+
+    def calc_action_prediction_sums_many(self, clfr_sets, aug_obs_arr):
+        """Batched calc_action_prediction_sums() for K clfr sets, each with
+        its own aug obs (row of aug_obs_arr). Returns (K x |A|) arrays. All
+        sets are concatenated so predictions are one row-wise dot product and
+        the per-(set, action) sums one grouped reduction each."""
+        num_actions = len(self._action_space)
+        num_sets = len(clfr_sets)
+        if sum(len(clfr_set) for clfr_set in clfr_sets) == 0:
+            shape = (num_sets, num_actions)
+            return (np.zeros(shape), np.zeros(shape),
+                    np.zeros(shape, dtype=np.int64))
+        rows_per_set = [self.find_rows(clfr_set) for clfr_set in clfr_sets]
+        if any(rows is None for rows in rows_per_set):
+            # orphans present: fall back to handling each set separately
+            sums_per_set = [
+                self.calc_action_prediction_sums(clfr_set, aug_obs)
+                for (clfr_set, aug_obs) in zip(clfr_sets, aug_obs_arr)
+            ]
+            return tuple(np.stack(sums) for sums in zip(*sums_per_set))
+
+        set_idxs = np.repeat(np.arange(num_sets),
+                             [len(rows) for rows in rows_per_set])
+        rows = np.concatenate(rows_per_set)
+        predictions = np.einsum("ij,ij->i", self._arrs["weight_vecs"][rows],
+                                aug_obs_arr[set_idxs])
+        fitnesses = self._arrs["fitness"][rows]
+        group_idxs = (set_idxs * num_actions + self._arrs["action_idxs"][rows])
+        num_groups = num_sets * num_actions
+        prediction_sums = np.bincount(group_idxs,
+                                      weights=(predictions * fitnesses),
+                                      minlength=num_groups)
+        fitness_sums = np.bincount(group_idxs,
+                                   weights=fitnesses,
+                                   minlength=num_groups)
+        counts = np.bincount(group_idxs, minlength=num_groups)
+        shape = (num_sets, num_actions)
+        return (prediction_sums.reshape(shape), fitness_sums.reshape(shape),
+                counts.reshape(shape))
+
+    def calc_prediction_arrs(self,
+                             obs_arr,
+                             aug_obs_arr,
+                             max_block_bytes=DEFAULT_MAX_BLOCK_BYTES):
+        """Blocked prediction arrays for each row of obs_arr over all
+        members, see inference.calc_prediction_arrs()."""
+        num_rows = len(self._clfrs)
+        if num_rows == 0:
+            return np.full((len(obs_arr), len(self._action_space)), np.nan)
+        return calc_prediction_arrs(
+            obs_arr,
+            aug_obs_arr,
+            lower_bounds=self._arrs["lower_bounds"][:num_rows],
+            upper_bounds=self._arrs["upper_bounds"][:num_rows],
+            weight_vecs_T=self._arrs["weight_vecs"][:num_rows].T.astype(
+                np.float64),
+            fitnesses=self._arrs["fitness"][:num_rows],
+            action_one_hots=calc_action_one_hots(
+                self._arrs["action_idxs"][:num_rows],
+                len(self._action_space)),
+            max_block_bytes=max_block_bytes)
+
+    def _ensure_capacity(self, num_rows, clfr):
+        if self._arrs is None:
+            capacity = max(_INIT_CAPACITY, num_rows)
+            self._arrs = self._alloc_row_arrs(
+                capacity=capacity,
+                num_dims=len(clfr.condition),
+                weight_vec_len=len(clfr.weight_vec),
+                has_cov_mats=isinstance(clfr, RLSClassifier))
+            # num slots in use never exceeds num rows, so slot ids never
+            # exceed capacity
+            self._slot_rows = np.full(capacity, -1, dtype=np.int64)
+        else:
+            capacity = len(self._arrs["lower_bounds"])
+            if num_rows > capacity:
+                new_capacity = max(capacity * _CAPACITY_GROWTH_FACTOR,
+                                   num_rows)
+                self._arrs = {
+                    name: self._grow(arr, new_capacity)
+                    for (name, arr) in self._arrs.items()
+                }
+                self._slot_rows = np.concatenate(
+                    (self._slot_rows,
+                     np.full((new_capacity - capacity), -1, dtype=np.int64)))
+                self._fitness_tree.grow(new_capacity)
+                self._deletion_vote_tree.grow(new_capacity)
+                self._increased_vote_tree.grow(new_capacity)
+                # weight vec/cov mat views of members refer to old arrays
+                for (row, member) in enumerate(self._clfrs):
+                    member.attach(self, row, member.slot)
+
+    def get_checkpoint_state(self):
+        """Returns (arrs, meta) of everything about pop besides the member
+        clfr objects themselves: copies of all row arrays (incl. slots) over
+        all rows plus the free slot list, and a dict of scalar state. See
+        from_checkpoint_state() and checkpoint module."""
+        num_rows = len(self._clfrs)
+        if self._arrs is not None:
+            arrs = {
+                name: arr[:num_rows].copy()
+                for (name, arr) in self._arrs.items()
+            }
+            capacity = len(self._arrs["lower_bounds"])
+        else:
+            arrs = {}
+            capacity = None
+        arrs["free_slots"] = np.asarray(self._free_slots, dtype=np.int64)
+        meta = {
+            "capacity": capacity,
+            "tree_capacity": self._fitness_tree.capacity,
+            "num_micros": self._num_micros,
+            "ops_history": dict(self._ops_history),
+            "version": self._version,
+            "num_slots_issued": self._num_slots_issued
+        }
+        return (arrs, meta)
+
+    @classmethod
+    def from_checkpoint_state(cls,
+                              action_space,
+                              theta_del,
+                              clfrs,
+                              arrs,
+                              meta,
+                              match_index=None):
+        """Inverse of get_checkpoint_state(): builds pop with (detached)
+        clfrs as its members in row order, in one go rather than via
+        add_new(). Row arrays, slots and sum trees are restored exactly as
+        they were (sum trees at their old capacity, so roulette wheel
+        lookups see the same node sums), and the phenotype and match indices
+        are rebuilt."""
+        pop = cls(action_space, theta_del, match_index)
+        pop._num_micros = meta["num_micros"]
+        pop._ops_history = dict(meta["ops_history"])
+        pop._version = meta["version"]
+        pop._num_slots_issued = meta["num_slots_issued"]
+        pop._free_slots = arrs["free_slots"].tolist()
+        if meta["capacity"] is None:
+            assert len(clfrs) == 0
+            return pop
+
+        capacity = meta["capacity"]
+        num_rows = len(clfrs)
+        pop._arrs = pop._alloc_row_arrs(
+            capacity=capacity,
+            num_dims=arrs["lower_bounds"].shape[1],
+            weight_vec_len=arrs["weight_vecs"].shape[1],
+            has_cov_mats=("cov_mats" in arrs))
+        for (name, arr) in pop._arrs.items():
+            assert len(arrs[name]) == num_rows
+            arr[:num_rows] = arrs[name]
+        pop._slot_rows = np.full(capacity, -1, dtype=np.int64)
+        pop._slot_rows[arrs["slots"]] = np.arange(num_rows)
+        rows = np.arange(num_rows)
+        pop._fitness_tree = SumTree(meta["tree_capacity"])
+        pop._fitness_tree.rebuild(pop._arrs["fitness"][rows])
+        pop._deletion_vote_tree = SumTree(meta["tree_capacity"])
+        pop._deletion_vote_tree.rebuild(pop._calc_deletion_votes(rows))
+        pop._increased_vote_tree = SumTree(meta["tree_capacity"])
+        pop._increased_vote_tree.rebuild(pop._calc_increased_votes(rows))
+
+        pop._clfrs = list(clfrs)
+        pop._phenotype_index = {(clfr.action, clfr.condition): clfr
+                                for clfr in pop._clfrs}
+        # (action, condition) pair is unique for all macroclassifiers
+        assert len(pop._phenotype_index) == num_rows
+        slots = arrs["slots"].tolist()
+        if match_index is not None:
+            for (clfr, slot) in zip(pop._clfrs, slots):
+                match_index.add(slot, clfr.condition)
+        if num_rows > 0:
+            type(pop._clfrs[0]).attach_many(pop._clfrs, pop, slots)
+        return pop
+
+    def _alloc_row_arrs(self, capacity, num_dims, weight_vec_len,
+                        has_cov_mats):
+        arrs = {
+            "lower_bounds": np.empty((capacity, num_dims), dtype=np.float64),
+            "upper_bounds": np.empty((capacity, num_dims), dtype=np.float64),
+            "weight_vecs": np.empty((capacity, weight_vec_len),
+                                    dtype=np.float32),
+            "action_idxs": np.empty(capacity, dtype=np.int64),
+            "slots": np.empty(capacity, dtype=np.int64)
+        }
+        if has_cov_mats:
+            # RLS updates promote cov mats to float64, so store them as such
+            arrs["cov_mats"] = np.empty(
+                (capacity, weight_vec_len, weight_vec_len), dtype=np.float64)
+        for (name, dtype) in _PARAM_DTYPES.items():
+            arrs[name] = np.empty(capacity, dtype=dtype)
+        return arrs
+
+    def _grow(self, arr, new_capacity):
+        new_arr = np.empty((new_capacity, ) + arr.shape[1:], dtype=arr.dtype)
+        new_arr[:len(arr)] = arr
+        return new_arr
+
+    def _write_row(self, row, clfr):
+        self._write_condition_row(row, clfr.condition)
+        self._arrs["weight_vecs"][row] = clfr.weight_vec
+        if "cov_mats" in self._arrs:
+            self._arrs["cov_mats"][row] = clfr.cov_mat
+        self._arrs["action_idxs"][row] = self._action_idx_map[clfr.action]
+        for name in _PARAM_DTYPES:
+            self._arrs[name][row] = getattr(clfr, name)
+
+    def _write_condition_row(self, row, condition):
+        self._arrs["lower_bounds"][row] = condition.lower_bounds
+        self._arrs["upper_bounds"][row] = condition.upper_bounds
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # members were copied/unpickled detached, so re-attach them
+        for (row, clfr) in enumerate(self._clfrs):
+            clfr.attach(self, row, self._arrs["slots"][row].item())
+
     def __iter__(self):
         return iter(self._clfrs)
 
@@ -4,7 +4,6 @@ import numpy as np
 
 from .augmentation import make_aug_strat
 from .classifier import NLMSClassifier, RLSClassifier
-from .hyperparams import get_hyperparam as get_hp
 
 np.seterr(divide="raise", over="raise", invalid="raise")
 
@@ -16,18 +15,47 @@ class PredictionStrategyABC(metaclass=abc.ABCMeta):
         self._poly_order = poly_order
         self._aug_strat = make_aug_strat(self._poly_order)
 
-    def make_classifier(self, condition, action, time_step):
-        return self._CLFR_CLS(condition, action, time_step, self._poly_order)
+    @property
+    def poly_order(self):
+        return self._poly_order
 
-    def aug_obs(self, obs, x_nought):
-        return self._aug_strat(obs, x_nought)
+    def make_classifier(self, condition, action, time_step, hyperparams,
+                        rng):
+        return self._CLFR_CLS(condition, action, time_step, self._poly_order,
+                              hyperparams, rng)
+
+    def restore_classifiers(self, conditions, actions, hyperparams,
+                            col_arrs):
+        """See ClassifierBase.restore_many()."""
+        return self._CLFR_CLS.restore_many(conditions, actions,
+                                           self._poly_order, hyperparams,
+                                           col_arrs)
+
+    def calc_aug_len(self, num_features):
+        return self._aug_strat.calc_aug_len(num_features)
+
+    def aug_obs(self, obs, x_nought, out=None):
+        return self._aug_strat(obs, x_nought, out)
+
+    def aug_obs_many(self, obs_arr, x_nought, out=None):
+        """(M x d) aug obs for each row of (M x n) obs_arr."""
+        return self._aug_strat.aug_many(obs_arr, x_nought, out)
 
     @abc.abstractmethod
     def process_aug_obs(self, aug_obs):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def update_prediction(self, clfr, payoff, aug_obs, proc_obs):
+    def update_prediction(self, clfr, payoff, aug_obs, proc_obs, hyperparams):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def update_predictions(self, pop, rows, payoff, aug_obs, proc_obs,
+                           hyperparams):
+        """Batched equivalent of update_prediction() for the member clfrs of
+        pop in given rows, which all see the same payoff and obs. Their
+        weight vecs (and cov mats) are gathered from and scattered back to
+        pop's row arrays directly."""
         raise NotImplementedError
 
 
@@ -37,7 +65,7 @@ class RecursiveLeastSquaresPrediction(PredictionStrategyABC):
     def process_aug_obs(self, aug_obs):
         return np.reshape(aug_obs, (1, len(aug_obs)))  # row vector
 
-    def update_prediction(self, clfr, payoff, aug_obs, proc_obs):
+    def update_prediction(self, clfr, payoff, aug_obs, proc_obs, hyperparams):
         # optimal matrix parenthesisations pre-calced via DP
         # lambda_rls inclusion as per Butz et al. '08 Function approximation
         # with XCS: Hyperellipsoidal Conditions, Recursive Least Squares and
@@ -45,7 +73,7 @@ class RecursiveLeastSquaresPrediction(PredictionStrategyABC):
         x = proc_obs
         x_T = x.T
         cov_mat = clfr.cov_mat
-        lambda_rls = get_hp("lambda_rls")
+        lambda_rls = hyperparams.lambda_rls
 
         # update cov mat of classifier
         beta_rls = lambda_rls + (x @ (cov_mat @ x_T))
@@ -61,9 +89,35 @@ class RecursiveLeastSquaresPrediction(PredictionStrategyABC):
         error = payoff - clfr.prediction(aug_obs)
         clfr.weight_vec += (gain_vec * error)
 
-    def _try_reset_cov_mat(clfr):
+    def update_predictions(self, pop, rows, payoff, aug_obs, proc_obs,
+                           hyperparams):
+        # same calcs as update_prediction(), but over stacked cov mats and
+        # weight vecs of all clfrs at once: x_T is shared, so matrix-vector
+        # products become batched (k x d x d) @ d products, k = len(rows)
+        x = proc_obs[0]
+        (weight_vecs, cov_mats) = pop.read_row_arrs(rows,
+                                                    ("weight_vecs",
+                                                     "cov_mats"))
+        lambda_rls = hyperparams.lambda_rls
+
+        # update cov mats
+        cov_mat_x_T = (cov_mats @ x)
+        x_cov_mat = (x @ cov_mats)
+        beta_rls = lambda_rls + (cov_mat_x_T @ x)
+        outer_prods = (cov_mat_x_T[:, :, np.newaxis] *
+                       x_cov_mat[:, np.newaxis, :])
+        cov_mats = (1 / lambda_rls) * (
+            cov_mats - (1 / beta_rls)[:, np.newaxis, np.newaxis] * outer_prods)
+
+        # calc gain vecs given updated cov mats, use to adjust weight vecs
+        gain_vecs = (cov_mats @ x)
+        errors = payoff - (weight_vecs @ aug_obs)
+        weight_vecs += (gain_vecs * errors[:, np.newaxis])
+        pop.write_row_arrs(rows, weight_vecs=weight_vecs, cov_mats=cov_mats)
+
+    def _try_reset_cov_mat(clfr, hyperparams):
         """tau_rls reset strategy for clfr cov mats, currently not in use."""
-        tau_rls = get_hp("tau_rls")
+        tau_rls = hyperparams.tau_rls
         cov_mat_resets_allowed = (tau_rls > 0)
         if cov_mat_resets_allowed:
             should_reset_cov_mat = (clfr.experience % tau_rls == 0)
@@ -77,11 +131,20 @@ class NormalisedLeastMeanSquaresPrediction(PredictionStrategyABC):
     def process_aug_obs(self, aug_obs):
         return np.sum(np.square(aug_obs))
 
-    def update_prediction(self, clfr, payoff, aug_obs, proc_obs):
+    def update_prediction(self, clfr, payoff, aug_obs, proc_obs, hyperparams):
         """See Lanzi et al. '06 Generalistaion in the XCSF Classifier System:
         Analysis, Improvement, and Extension (ECJ) - Algorithm 2 for best
         description."""
         norm = proc_obs
         error = payoff - clfr.prediction(aug_obs)
-        correction = (get_hp("eta") / norm) * error
+        correction = (hyperparams.eta / norm) * error
         clfr.weight_vec += (aug_obs * correction)
+
+    def update_predictions(self, pop, rows, payoff, aug_obs, proc_obs,
+                           hyperparams):
+        norm = proc_obs
+        (weight_vecs, ) = pop.read_row_arrs(rows, ("weight_vecs", ))
+        errors = payoff - (weight_vecs @ aug_obs)
+        corrections = (hyperparams.eta / norm) * errors
+        weight_vecs += (aug_obs * corrections[:, np.newaxis])
+        pop.write_row_arrs(rows, weight_vecs=weight_vecs)
@@ -0,0 +1,404 @@
+"""Baseline implementations of the learning routines that have optimised
+(vectorised/indexed) counterparts elsewhere: the population itself
+(ListPopulation), matching, prediction arrays, action set param and
+prediction updates, action set subsumption and deletion. They are the
+straightforward code these routines started out as, changed only to take
+hyperparams and RNG streams explicitly and to read and write clfrs through
+their public attrs, and serve as the oracle against which the optimised
+versions are checked, and timed (see benchmarks/equivalence.py).
+
+The optimised routines deliberately differ from these in the ways listed in
+SEMANTIC_CHANGES, chiefly in how deletion draws from the RNG, so a
+ReferenceXCSF and an XCSF given the same seed soon follow different
+trajectories and can only be compared statistically. The deterministic
+routines (matching, prediction arrays, updates, which clfrs action set
+subsumption subsumes) are unchanged in semantics, so can be checked
+exactly, up to float rounding, by running them on the same input."""
+from collections import OrderedDict
+
+from .stats import NULL_STATS
+from .subsumption import could_subsume
+from .util import calc_num_micros
+from .xcsf import XCSF
+
+_MIN_NUM_MACROS = 1
+_MAX_ACC = 1.0
+
+# deliberate differences in semantics between the optimised routines and
+# the baseline ones here, by routine
+SEMANTIC_CHANGES = {
+    "deletion":
+    ("baseline selects by stochastic acceptance (uniformly drawn candidate "
+     "macroclassifier, accepted with prob. vote / max vote); optimised spins "
+     "a sum tree roulette wheel over base votes plus bounds on vote "
+     "increases, accepting spins on a bound by rejection. Both select in "
+     "proportion to the same votes, but make different RNG draws"),
+    "removal_order":
+    ("baseline removes a clfr from a list, keeping the rest in order; "
+     "Population swaps its last member into the gap. Pops have the same "
+     "members in different orders, so order dependent selections (deletion, "
+     "GA tournaments over [A]) come out differently for the same draws"),
+    "as_subsumption":
+    ("baseline let the most general clfr in [A] subsume itself (condition "
+     "subsumption is reflexive), removing it from pop while still counting "
+     "its micros, and failed on [A] members already removed from pop. "
+     "Optimised excludes both from subsumers and subsumees, and so does the "
+     "reference, as baseline's behaviour breaks pop invariants"),
+    "zero_fitness_vote":
+    ("baseline increased the deletion vote of an experienced clfr with zero "
+     "fitness by avg fitness / 0, failing with a division by zero whenever "
+     "avg fitness was non-zero. Optimised gives such clfrs no increase, and "
+     "so does the reference"),
+    "cov_mat_dtype":
+    ("Population stores RLS cov mats as float64; baseline clfrs (and "
+     "ListPopulation) keep their own float32 ones")
+}
+
+
+class ListPopulation:
+    """Population as a plain list of macroclassifiers with tracking of the
+    number of microclassifiers, as it was before it gained row arrays: every
+    lookup is a scan of the list, and removal keeps the rest of the list in
+    order. Members are attached to it (so clfr.owner works as with
+    Population), but keep their own weight vecs and cov mats, with their row
+    being their position in the list."""
+    def __init__(self, action_space, theta_del, match_index=None):
+        assert match_index is None
+        self._clfrs = []
+        self._num_micros = 0
+        self._ops_history = {
+            "covering": 0,
+            "absorption": 0,
+            "insertion": 0,
+            "deletion": 0,
+            "ga_subsumption": 0,
+            "as_subsumption": 0
+        }
+        self._action_space = tuple(action_space)
+
+    @property
+    def num_macros(self):
+        return len(self._clfrs)
+
+    @property
+    def num_micros(self):
+        return self._num_micros
+
+    @property
+    def ops_history(self):
+        return self._ops_history
+
+    @property
+    def action_space(self):
+        return self._action_space
+
+    def add_new(self, clfr, op):
+        self._clfrs.append(clfr)
+        clfr.attach(self, (len(self._clfrs) - 1), None)
+        self._num_micros += clfr.numerosity
+        assert op in ("covering", "insertion")
+        self._ops_history[op] += clfr.numerosity
+
+    def alter_numerosity(self, clfr, delta, op):
+        assert clfr.owner is self
+        clfr.numerosity += delta
+        self._num_micros += delta
+        assert op in ("absorption", "deletion", "ga_subsumption",
+                      "as_subsumption")
+        # delta can be neg. (obviously), but op. counts are pos.
+        self._ops_history[op] += abs(delta)
+
+    def remove(self, clfr, op=None):
+        # same semantics as list.remove
+        row = self._clfrs.index(clfr)
+        self._clfrs.pop(row).detach()
+        # members after removed one move up a row
+        for (row, member) in enumerate(self._clfrs[row:], start=row):
+            member.attach(self, row, None)
+        self._num_micros -= clfr.numerosity
+        if op is not None:
+            assert op == "deletion"
+            self._ops_history[op] += clfr.numerosity
+
+    def find_duplicate(self, clfr):
+        for member in self._clfrs:
+            if member == clfr:
+                return member
+        return None
+
+    def weight_vec_view(self, row):
+        return self._clfrs[row].weight_vec
+
+    def cov_mat_view(self, row):
+        return self._clfrs[row].cov_mat
+
+    def on_condition_change(self, clfr, old_condition):
+        pass
+
+    def on_action_change(self, clfr, old_action):
+        pass
+
+    def on_param_change(self, clfr, name, val):
+        pass
+
+    def __iter__(self):
+        return iter(self._clfrs)
+
+    def __getitem__(self, idx):
+        return self._clfrs[idx]
+
+
+def gen_match_set(pop, obs):
+    return [clfr for clfr in pop if clfr.does_match(obs)]
+
+
+def gen_prediction_arr(match_set, aug_obs, action_space):
+    prediction_arr = OrderedDict({action: None for action in action_space})
+    actions_reprd_in_m = set([clfr.action for clfr in match_set])
+    for a in actions_reprd_in_m:
+        # to bootstap sum below
+        prediction_arr[a] = 0
+
+    fitness_sum_arr = OrderedDict({action: 0 for action in action_space})
+
+    for clfr in match_set:
+        a = clfr.action
+        prediction_arr[a] += clfr.prediction(aug_obs) * clfr.fitness
+        fitness_sum_arr[a] += clfr.fitness
+
+    for a in action_space:
+        if fitness_sum_arr[a] != 0:
+            prediction_arr[a] /= fitness_sum_arr[a]
+    return prediction_arr
+
+
+def update_action_set(action_set,
+                      payoff,
+                      obs,
+                      pop,
+                      pred_strat,
+                      hyperparams,
+                      stats=NULL_STATS,
+                      aug_obs_cache=None):
+    # aug obs are computed directly, as they were before aug obs cache
+    aug_obs = pred_strat.aug_obs(obs, hyperparams.x_nought)
+    proc_obs = pred_strat.process_aug_obs(aug_obs)
+    update_action_set_params(action_set, payoff, aug_obs, proc_obs,
+                             pred_strat, hyperparams)
+
+    if hyperparams.do_as_subsumption:
+        start_time = stats.start()
+        action_set_subsumption(action_set, pop, hyperparams)
+        stats.stop("subsumption", start_time)
+
+
+def update_action_set_params(action_set, payoff, aug_obs, proc_obs,
+                             pred_strat, hyperparams):
+    """Param and prediction updates of [A], one clfr at a time."""
+    use_niche_min_error = (hyperparams.beta_epsilon != 0)
+    if use_niche_min_error:
+        min_error_as = min([clfr.error for clfr in action_set])
+    else:
+        min_error_as = None
+
+    as_num_micros = calc_num_micros(action_set)
+
+    for clfr in action_set:
+        _update_experience(clfr)
+        if use_niche_min_error:
+            _update_niche_min_error(clfr, min_error_as, hyperparams)
+            _update_error_with_mu(clfr, payoff, aug_obs, hyperparams)
+        else:
+            _update_error(clfr, payoff, aug_obs, hyperparams)
+        pred_strat.update_prediction(clfr, payoff, aug_obs, proc_obs,
+                                     hyperparams)
+        _update_action_set_size(clfr, as_num_micros, hyperparams)
+    _update_fitness(action_set, hyperparams)
+
+
+def _update_experience(clfr):
+    clfr.experience += 1
+
+
+def _update_niche_min_error(clfr, min_error_as, hyperparams):
+    beta_epsilon = hyperparams.beta_epsilon
+    min_error_diff = (min_error_as - clfr.niche_min_error)
+    if clfr.experience < (1 / beta_epsilon):
+        clfr.niche_min_error += (min_error_diff / clfr.experience)
+    else:
+        clfr.niche_min_error += (beta_epsilon * min_error_diff)
+
+
+def _update_error_with_mu(clfr, payoff, aug_obs, hyperparams):
+    beta = hyperparams.beta
+    payoff_diff = abs(payoff - clfr.prediction(aug_obs))
+    # use scheme described in Lanzi '99 An Extension to XCS for Stochastic
+    # Environments
+    if (payoff_diff - clfr.niche_min_error) >= 0:
+        error_target = (payoff_diff - clfr.niche_min_error - clfr.error)
+    else:
+        error_target = (hyperparams.epsilon_nought - clfr.error)
+
+    if clfr.experience < (1 / beta):
+        clfr.error += (error_target / clfr.experience)
+    else:
+        clfr.error += (beta * error_target)
+
+
+def _update_error(clfr, payoff, aug_obs, hyperparams):
+    beta = hyperparams.beta
+    payoff_diff = abs(payoff - clfr.prediction(aug_obs))
+    error_target = (payoff_diff - clfr.error)
+    if clfr.experience < (1 / beta):
+        clfr.error += (error_target / clfr.experience)
+    else:
+        clfr.error += (beta * error_target)
+
+
+def _update_action_set_size(clfr, as_num_micros, hyperparams):
+    beta = hyperparams.beta
+    as_size_diff = (as_num_micros - clfr.action_set_size)
+    if clfr.experience < (1 / beta):
+        clfr.action_set_size += (as_size_diff / clfr.experience)
+    else:
+        clfr.action_set_size += (beta * as_size_diff)
+
+
+def _update_fitness(action_set, hyperparams):
+    acc_sum = 0
+    acc_vec = []
+    e_nought = hyperparams.epsilon_nought
+    for clfr in action_set:
+        if clfr.error < e_nought:
+            acc = _MAX_ACC
+        else:
+            acc = (hyperparams.alpha *
+                   (clfr.error / e_nought)**(-1 * hyperparams.nu))
+        acc_vec.append(acc)
+        acc_sum += (acc * clfr.numerosity)
+
+    for (clfr, acc) in zip(action_set, acc_vec):
+        relative_acc = (acc * clfr.numerosity / acc_sum)
+        clfr.fitness += (hyperparams.beta * (relative_acc - clfr.fitness))
+
+
+def action_set_subsumption(action_set, pop, hyperparams):
+    (most_general_clfr, subsumees) = find_as_subsumees(action_set, pop,
+                                                       hyperparams)
+    for clfr in subsumees:
+        num_micros_subsumed = clfr.numerosity
+        pop.alter_numerosity(most_general_clfr,
+                             delta=num_micros_subsumed,
+                             op="as_subsumption")
+        action_set.remove(clfr)
+        pop.remove(clfr)
+
+
+def find_as_subsumees(action_set, pop, hyperparams):
+    """Returns (most general clfr in [A], list of clfrs in [A] it subsumes),
+    the former being None (and the latter empty) if no clfr could subsume.
+    Only members of pop take part (see SEMANTIC_CHANGES)."""
+    members = [clfr for clfr in action_set if clfr.owner is pop]
+
+    # find most general clfr in [A]
+    most_general_clfr = None
+    for clfr in members:
+        if could_subsume(clfr, hyperparams):
+            if (most_general_clfr is None
+                    or clfr.is_more_general(most_general_clfr)):
+                most_general_clfr = clfr
+
+    if most_general_clfr is None:
+        return (None, [])
+    subsumees = [
+        clfr for clfr in members if clfr is not most_general_clfr
+        and most_general_clfr.does_subsume(clfr)
+    ]
+    return (most_general_clfr, subsumees)
+
+
+def deletion(pop, hyperparams, rng, stats=NULL_STATS):
+    start_time = stats.start()
+    max_pop_size = hyperparams.N
+    pop_size = pop.num_micros
+    num_to_delete = max(0, (pop_size - max_pop_size))
+    if num_to_delete > 0:
+        for _ in range(num_to_delete):
+            _delete_single_microclfr(pop, hyperparams, rng)
+        assert pop.num_macros >= _MIN_NUM_MACROS
+        assert pop.num_micros <= max_pop_size
+    stats.count("deleted_micros", num_to_delete)
+    stats.stop("deletion", start_time)
+
+
+def _delete_single_microclfr(pop, hyperparams, rng):
+    votes = calc_deletion_votes(pop, hyperparams)
+    max_vote = max(votes)
+
+    # roulette wheel selection via stochastic acceptance
+    clfr_to_remove = None
+    accepted = False
+    while not accepted:
+        idx = rng.integers(0, pop.num_macros)
+        (clfr, vote) = (pop[idx], votes[idx])  # since pop ordered this is ok
+        p_accept = (vote / max_vote)
+        if rng.random() < p_accept:
+            accepted = True
+            if clfr.numerosity > 1:
+                pop.alter_numerosity(clfr, delta=-1, op="deletion")
+            elif clfr.numerosity == 1:
+                clfr_to_remove = clfr
+            else:
+                # not possible
+                assert False
+
+    if clfr_to_remove is not None:
+        pop.remove(clfr_to_remove, op="deletion")
+
+
+def calc_deletion_votes(pop, hyperparams):
+    """Deletion votes of all clfrs in pop, in pop order."""
+    avg_fitness_in_pop = sum([clfr.fitness for clfr in pop]) / pop.num_micros
+    vote_increase_threshold = (hyperparams.delta * avg_fitness_in_pop)
+    return [
+        _deletion_vote(clfr, avg_fitness_in_pop, vote_increase_threshold)
+        for clfr in pop
+    ]
+
+
+def _deletion_vote(clfr, avg_fitness_in_pop, vote_increase_threshold):
+    vote = clfr.deletion_vote
+    has_sufficient_exp = clfr.deletion_has_sufficient_exp
+    scaled_fitness = clfr.numerosity_scaled_fitness
+    should_increase_vote = has_sufficient_exp and (0 < scaled_fitness <
+                                                   vote_increase_threshold)
+    if should_increase_vote:
+        vote *= (avg_fitness_in_pop / scaled_fitness)
+    return vote
+
+
+class ReferenceXCSF(XCSF):
+    """XCSF that trains using the baseline implementations above (on a
+    ListPopulation) in place of the optimised ones, but is otherwise
+    identical (same init args, RNG streams, GA, covering, etc.). Match
+    index and match set cache are not supported, nor is anything that needs
+    Population's row arrays (checkpoints, frozen policies, batch
+    inference)."""
+    _pop_cls = ListPopulation
+    _update_action_set_func = staticmethod(update_action_set)
+    _deletion_func = staticmethod(deletion)
+
+    def _gen_match_set(self, obs):
+        return gen_match_set(self._pop, obs)
+
+    def _gen_match_sets(self, obs_arr):
+        return [gen_match_set(self._pop, obs) for obs in obs_arr]
+
+    def _gen_prediction_arr(self, match_set, aug_obs):
+        return gen_prediction_arr(match_set, aug_obs, self._pop.action_space)
+
+    def _gen_prediction_arrs(self, match_sets, aug_obs_arr):
+        return [
+            self._gen_prediction_arr(match_set, aug_obs)
+            for (match_set, aug_obs) in zip(match_sets, aug_obs_arr)
+        ]
@@ -1,16 +1,109 @@
 import numpy as np
 
-_rng = np.random.RandomState()
-_has_been_seeded = False
+_BLOCK_SIZE = 1024
+# one independent stream per subsystem, in fixed order so streams are
+# reproducible from seed
+_SUBSYSTEMS = ("action_selection", "covering", "ga", "deletion")
 
 
-def seed_rng(seed):
-    seed = int(seed)
-    _rng.seed(seed)
-    global _has_been_seeded
-    _has_been_seeded = True
+class BufferedRNG:
+    """Wraps a numpy Generator, pre-generating blocks of uniforms so that the
+    scalar draws made in hot loops (one per allele, micro, etc.) don't each
+    pay numpy's per-call overhead. Scalar ints/choices/signs are derived from
+    the same buffered uniforms; bulk draws go straight to the Generator."""
+    def __init__(self, generator, block_size=_BLOCK_SIZE):
+        self._generator = generator
+        self._block_size = block_size
+        self._buf = []
+        self._pos = 0
 
+    @property
+    def generator(self):
+        return self._generator
 
-def get_rng():
-    assert _has_been_seeded
-    return _rng
+    def get_state(self):
+        """State of underlying bit generator plus the unused part of the
+        buffer, so draws can be resumed exactly."""
+        return {
+            "bit_generator": self._generator.bit_generator.state,
+            "buf": self._buf[self._pos:]
+        }
+
+    def set_state(self, state):
+        self._generator.bit_generator.state = state["bit_generator"]
+        self._buf = list(state["buf"])
+        self._pos = 0
+
+    def _refill(self):
+        self._buf = self._generator.random(self._block_size).tolist()
+        self._pos = 0
+
+    def random(self):
+        """Uniform float ~ [0, 1)."""
+        if self._pos == len(self._buf):
+            self._refill()
+        val = self._buf[self._pos]
+        self._pos += 1
+        return val
+
+    def integers(self, low, high):
+        """Uniform int ~ [low, high)."""
+        assert high > low
+        return low + int(self.random() * (high - low))
+
+    def uniform(self, low, high, size=None):
+        if size is None:
+            return low + (high - low) * self.random()
+        else:
+            return self._generator.uniform(low, high, size=size)
+
+    def choice(self, seq):
+        return seq[self.integers(0, len(seq))]
+
+    def sign(self):
+        return 1 if self.random() < 0.5 else -1
+
+    def shuffle(self, seq):
+        """In place Fisher-Yates shuffle."""
+        for i in range(len(seq) - 1, 0, -1):
+            j = self.integers(0, i + 1)
+            seq[i], seq[j] = seq[j], seq[i]
+
+
+class RNGStreams:
+    """Independent BufferedRNG streams for each subsystem of a single XCSF
+    instance, spawned from one seed so that the whole instance is
+    reproducible from it."""
+    def __init__(self, seed):
+        seed_seqs = np.random.SeedSequence(int(seed)).spawn(len(_SUBSYSTEMS))
+        self._streams = {
+            name: BufferedRNG(np.random.Generator(np.random.PCG64(seed_seq)))
+            for (name, seed_seq) in zip(_SUBSYSTEMS, seed_seqs)
+        }
+
+    def get_state(self):
+        return {
+            name: stream.get_state()
+            for (name, stream) in self._streams.items()
+        }
+
+    def set_state(self, state):
+        assert set(state) == set(self._streams)
+        for (name, stream_state) in state.items():
+            self._streams[name].set_state(stream_state)
+
+    @property
+    def action_selection(self):
+        return self._streams["action_selection"]
+
+    @property
+    def covering(self):
+        return self._streams["covering"]
+
+    @property
+    def ga(self):
+        return self._streams["ga"]
+
+    @property
+    def deletion(self):
+        return self._streams["deletion"]
@@ -0,0 +1,92 @@
+import time
+
+# timed phases of a training step. Times are inclusive, i.e. "covering" and
+# "ga" include the "deletion" they trigger, "update" and "ga" include
+# "subsumption"
+PHASES = ("matching", "covering", "prediction", "action_selection",
+          "env_step", "update", "ga", "deletion", "subsumption")
+# counters, each observed some number of times with some val
+COUNTERS = ("match_set_size", "action_set_size", "covering_iters",
+            "deleted_micros", "tournament_rounds")
+_NS_PER_S = 1e9
+
+
+class Stats:
+    """Per-phase instrumentation of training: for each phase, total time
+    spent in it (monotonic clock) and num calls, and for each counter, total
+    of and num observations of its vals (so e.g. mean match set size is
+    total / num).
+
+    Instrumented code brackets each phase as:
+        start_time = stats.start()
+        ...
+        stats.stop(phase, start_time)
+    and is given NULL_STATS instead when stats are not being collected, for
+    which these are no-ops."""
+    def __init__(self):
+        self.reset()
+
+    @property
+    def enabled(self):
+        return True
+
+    def reset(self):
+        self._phase_times_ns = dict.fromkeys(PHASES, 0)
+        self._phase_calls = dict.fromkeys(PHASES, 0)
+        self._counter_totals = dict.fromkeys(COUNTERS, 0)
+        self._counter_nums = dict.fromkeys(COUNTERS, 0)
+
+    def start(self):
+        return time.perf_counter_ns()
+
+    def stop(self, phase, start_time):
+        self._phase_times_ns[phase] += (time.perf_counter_ns() - start_time)
+        self._phase_calls[phase] += 1
+
+    def count(self, counter, val=1):
+        self._counter_totals[counter] += val
+        self._counter_nums[counter] += 1
+
+    def snapshot(self):
+        """Returns current stats as a (JSON serialisable) dict of plain
+        values, unaffected by later collection:
+            {"phases": {phase: {"time": secs, "calls": num}},
+             "counters": {counter: {"total": total, "num": num,
+                                    "mean": mean or None}}}"""
+        phases = {
+            phase: {
+                "time": (self._phase_times_ns[phase] / _NS_PER_S),
+                "calls": self._phase_calls[phase]
+            }
+            for phase in PHASES
+        }
+        counters = {}
+        for counter in COUNTERS:
+            total = self._counter_totals[counter]
+            num = self._counter_nums[counter]
+            counters[counter] = {
+                "total": total,
+                "num": num,
+                "mean": (total / num if num > 0 else None)
+            }
+        return {"phases": phases, "counters": counters}
+
+
+class _NullStats:
+    """Stand-in for Stats when not collecting, so instrumented code needs no
+    checks of its own."""
+    @property
+    def enabled(self):
+        return False
+
+    def start(self):
+        return 0
+
+    def stop(self, phase, start_time):
+        pass
+
+    def count(self, counter, val=1):
+        pass
+
+
+NULL_STATS = _NullStats()
@@ -1,37 +1,63 @@
-import copy
+import numpy as np
 
-from .hyperparams import get_hyperparam as get_hp
 
+def action_set_subsumption(action_set, pop, hyperparams):
+    # clfrs in [A] that have since been removed from pop can neither subsume
+    # nor be subsumed
+    members = [clfr for clfr in action_set if clfr.owner is pop]
+    if len(members) == 0:
+        return
+    rows = pop.find_rows(members)
 
-def action_set_subsumption(action_set, pop):
     # find most general clfr in [A]
-    most_general_clfr = None
-    for clfr in action_set:
-        if could_subsume(clfr):
-            if (most_general_clfr is None
-                    or clfr.is_more_general(most_general_clfr)):
-                most_general_clfr = clfr
-
-    # do the subsumptions if possible
-    if most_general_clfr is not None:
-        # iter over copy of [A] so can remove subsumees from actual [A] within
-        # loop
-        for clfr in copy.deepcopy(action_set):
-            if most_general_clfr.does_subsume(clfr):
-                num_micros_subsumed = clfr.numerosity
-                pop.alter_numerosity(most_general_clfr,
-                                     delta=num_micros_subsumed,
-                                     op="as_subsumption")
-                action_set.remove(clfr)
-                pop.remove(clfr)
-
-
-def does_subsume(subsumer, subsumee):
+    (experiences, errors) = pop.read_params(rows, ("experience", "error"))
+    candidate_idxs = np.flatnonzero(
+        _could_subsume_mask(experiences, errors, hyperparams))
+    if len(candidate_idxs) == 0:
+        return
+    most_general_idx = candidate_idxs[0]
+    for idx in candidate_idxs[1:]:
+        if members[idx].is_more_general(members[most_general_idx]):
+            most_general_idx = idx
+    most_general_clfr = members[most_general_idx]
+
+    # find all other clfrs in [A] it subsumes in one go by comparing its
+    # bounds with those of whole [A]
+    (lower_bounds, upper_bounds) = pop.read_condition_bounds(rows)
+    is_subsumed = (
+        np.all(lower_bounds[most_general_idx] <= lower_bounds, axis=1)
+        & np.all(upper_bounds[most_general_idx] >= upper_bounds, axis=1))
+    is_subsumed[most_general_idx] = False
+    subsumee_idxs = np.flatnonzero(is_subsumed)
+
+    # do the subsumptions
+    if len(subsumee_idxs) > 0:
+        subsumees = [members[idx] for idx in subsumee_idxs]
+        num_micros_subsumed = sum([clfr.numerosity for clfr in subsumees])
+        pop.alter_numerosity(most_general_clfr,
+                             delta=num_micros_subsumed,
+                             op="as_subsumption")
+        for clfr in subsumees:
+            pop.remove(clfr)
+        subsumee_ids = set([id(clfr) for clfr in subsumees])
+        action_set[:] = [
+            clfr for clfr in action_set if id(clfr) not in subsumee_ids
+        ]
+
+
+def does_subsume(subsumer, subsumee, hyperparams):
     """Determines if subsumer clfr really does subsume subsumee clfr."""
-    return (could_subsume(subsumer) and subsumer.action == subsumee.action
+    return (could_subsume(subsumer, hyperparams)
+            and subsumer.action == subsumee.action
             and subsumer.does_subsume(subsumee))
 
 
-def could_subsume(clfr):
-    return (clfr.experience > get_hp("theta_sub")
-            and clfr.error < get_hp("epsilon_nought"))
+def could_subsume(clfr, hyperparams):
+    return (clfr.experience > hyperparams.theta_sub
+            and clfr.error < hyperparams.epsilon_nought)
+
+
+def _could_subsume_mask(experiences, errors, hyperparams):
+    """Vectorised could_subsume()."""
+    return ((experiences > hyperparams.theta_sub)
+            & (errors < hyperparams.epsilon_nought))
@@ -0,0 +1,95 @@
+import numpy as np
+
+_MIN_CAPACITY = 1
+_ROOT = 1
+
+
+class SumTree:
+    """Binary sum tree over non-negative leaf values, stored heap-style in a
+    flat array: node i has children 2i and 2i+1, root is node 1 and leaf idx
+    lives at node (capacity + idx).
+
+    Gives O(log n) single leaf updates and O(log n) sampling of a leaf with
+    probability proportional to its value, while always having the total of
+    all leaves on hand. Node sums are recomputed from their children on every
+    update rather than adjusted by deltas, so they do not drift."""
+    def __init__(self, capacity):
+        self._capacity = self._calc_pow2_capacity(capacity)
+        self._nodes = np.zeros(2 * self._capacity, dtype=np.float64)
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def total(self):
+        return self._nodes[_ROOT]
+
+    def _calc_pow2_capacity(self, capacity):
+        capacity = max(int(capacity), _MIN_CAPACITY)
+        return 1 << (capacity - 1).bit_length()
+
+    def __getitem__(self, idx):
+        return self._nodes[self._capacity + idx]
+
+    def update(self, idx, val):
+        nodes = self._nodes
+        node = self._capacity + idx
+        nodes[node] = val
+        node >>= 1
+        while node >= _ROOT:
+            nodes[node] = nodes[2 * node] + nodes[2 * node + 1]
+            node >>= 1
+
+    def update_many(self, idxs, vals):
+        """Vectorised update() for many leaves: one array op per tree
+        level."""
+        nodes = self._nodes
+        nodes_ = self._capacity + np.asarray(idxs, dtype=np.int64)
+        nodes[nodes_] = vals
+        parents = np.unique(nodes_ >> 1)
+        while len(parents) > 0:
+            nodes[parents] = nodes[2 * parents] + nodes[2 * parents + 1]
+            parents = np.unique(parents[parents > _ROOT] >> 1)
+
+    def rebuild(self, leaf_vals):
+        """Sets leaves [0, len(leaf_vals)) to given vals (all other leaves to
+        zero) and recomputes all internal nodes, one array op per level."""
+        num_leaves = len(leaf_vals)
+        assert num_leaves <= self._capacity
+        nodes = self._nodes
+        cap = self._capacity
+        nodes[cap:(cap + num_leaves)] = leaf_vals
+        nodes[(cap + num_leaves):] = 0.0
+        level_start = cap // 2
+        while level_start >= _ROOT:
+            level_end = 2 * level_start
+            nodes[level_start:level_end] = \
+                (nodes[level_end:(2 * level_end):2] +
+                 nodes[(level_end + 1):(2 * level_end):2])
+            level_start //= 2
+
+    def grow(self, new_capacity):
+        leaf_vals = self._nodes[self._capacity:].copy()
+        self._capacity = self._calc_pow2_capacity(new_capacity)
+        self._nodes = np.zeros(2 * self._capacity, dtype=np.float64)
+        self.rebuild(leaf_vals)
+
+    def find(self, cum_val):
+        """Returns idx of leaf in which cum_val falls when leaves are laid end
+        to end, i.e. idx s.t. sum(leaves[:idx]) <= cum_val <
+        sum(leaves[:idx+1]). Never returns a zero-valued leaf, so rounding in
+        cum_val/node sums can't select an empty leaf."""
+        assert cum_val >= 0
+        nodes = self._nodes
+        cap = self._capacity
+        node = _ROOT
+        while node < cap:
+            left = 2 * node
+            left_sum = nodes[left]
+            if cum_val >= left_sum and nodes[left + 1] > 0:
+                cum_val -= left_sum
+                node = left + 1
+            else:
+                node = left
+        return node - cap
@@ -0,0 +1,181 @@
+import json
+from collections import namedtuple
+
+import numpy as np
+
+_FORMAT_VERSION = 1
+_META_NAME = "meta"
+_ARR_NAMES = ("reset_obs", "reset_step_idxs", "action_idxs", "next_obs",
+              "rewards", "is_terminals")
+
+# env transitions of a stretch of training, as arrays:
+#   - reset_obs (E x n): obs returned by each env.reset(), made before
+#     reset_step_idxs (E, ) steps of the trace.
+#   - action_idxs (T, ): idxs in action_space of actions taken at each of
+#     the T steps, next_obs (T x n), rewards (T, ) and is_terminals (T, ):
+#     what env.step() returned for them.
+#   - start_is_terminal: whether env was terminal when recording started.
+Trace = namedtuple("Trace", [
+    "action_space", "start_is_terminal", "reset_obs", "reset_step_idxs",
+    "action_idxs", "next_obs", "rewards", "is_terminals"
+])
+
+
+class TraceRecorder:
+    """Env wrapper that passes everything through to env, recording resets
+    and steps for a Trace."""
+    def __init__(self, env):
+        self._env = env
+        self._action_space = tuple(env.action_space)
+        self._start_is_terminal = env.is_terminal()
+        self._reset_obs = []
+        self._reset_step_idxs = []
+        self._action_idxs = []
+        self._next_obs = []
+        self._rewards = []
+        self._is_terminals = []
+
+    @property
+    def obs_space(self):
+        return self._env.obs_space
+
+    @property
+    def action_space(self):
+        return self._env.action_space
+
+    @property
+    def num_steps(self):
+        return len(self._action_idxs)
+
+    def reset(self):
+        obs = self._env.reset()
+        self._reset_obs.append(np.array(obs))
+        self._reset_step_idxs.append(self.num_steps)
+        return obs
+
+    def step(self, action):
+        (next_obs, reward, is_terminal, info) = self._env.step(action)
+        self._action_idxs.append(self._action_space.index(action))
+        self._next_obs.append(np.array(next_obs))
+        self._rewards.append(reward)
+        self._is_terminals.append(is_terminal)
+        return (next_obs, reward, is_terminal, info)
+
+    def is_terminal(self):
+        return self._env.is_terminal()
+
+    def get_trace(self):
+        return Trace(action_space=self._action_space,
+                     start_is_terminal=self._start_is_terminal,
+                     reset_obs=_stack_obs(self._reset_obs),
+                     reset_step_idxs=np.array(self._reset_step_idxs,
+                                              dtype=np.int64),
+                     action_idxs=np.array(self._action_idxs,
+                                          dtype=np.int64),
+                     next_obs=_stack_obs(self._next_obs),
+                     rewards=np.array(self._rewards, dtype=np.float64),
+                     is_terminals=np.array(self._is_terminals, dtype=bool))
+
+
+class TraceReplayEnv:
+    """Stand-in env that plays back a Trace: reset() and step() return
+    exactly what the recorded env did, in order, whatever actions are taken.
+    A learner in the same state as when the trace was recorded (e.g. loaded
+    from a checkpoint saved at the start of recording) then repeats the
+    same learning work without the cost of the real env.
+
+    Actions differing from the recorded ones mean the learner has diverged
+    from the recording run; these are counted rather than raised, so
+    replay still runs to completion (on the recorded obs) when e.g.
+    comparing learner implementations."""
+    def __init__(self, trace, obs_space=None):
+        """obs_space is that of the recorded env, needed if the learner's
+        encoding is to be built from the replay env."""
+        self._trace = trace
+        self._obs_space = obs_space
+        self._action_space = tuple(trace.action_space)
+        self._step_idx = 0
+        self._reset_idx = 0
+        self._is_terminal = trace.start_is_terminal
+        self._num_action_mismatches = 0
+        self._first_action_mismatch_step_idx = None
+
+    @property
+    def obs_space(self):
+        return self._obs_space
+
+    @property
+    def action_space(self):
+        return self._action_space
+
+    @property
+    def num_steps(self):
+        return len(self._trace.action_idxs)
+
+    @property
+    def num_steps_remaining(self):
+        return (self.num_steps - self._step_idx)
+
+    @property
+    def num_action_mismatches(self):
+        return self._num_action_mismatches
+
+    @property
+    def first_action_mismatch_step_idx(self):
+        return self._first_action_mismatch_step_idx
+
+    def reset(self):
+        trace = self._trace
+        assert self._is_terminal
+        assert self._reset_idx < len(trace.reset_step_idxs)
+        assert trace.reset_step_idxs[self._reset_idx] == self._step_idx
+        obs = trace.reset_obs[self._reset_idx].copy()
+        self._reset_idx += 1
+        self._is_terminal = False
+        return obs
+
+    def step(self, action):
+        trace = self._trace
+        assert not self._is_terminal
+        assert self._step_idx < self.num_steps
+        idx = self._step_idx
+        if self._action_space.index(action) != trace.action_idxs[idx]:
+            self._num_action_mismatches += 1
+            if self._first_action_mismatch_step_idx is None:
+                self._first_action_mismatch_step_idx = idx
+        self._is_terminal = bool(trace.is_terminals[idx])
+        self._step_idx += 1
+        return (trace.next_obs[idx].copy(), trace.rewards[idx].item(),
+                self._is_terminal, {})
+
+    def is_terminal(self):
+        return self._is_terminal
+
+
+def save_trace(path, trace):
+    """Saves trace to path as a single uncompressed .npz."""
+    meta = {
+        "format_version": _FORMAT_VERSION,
+        "action_space": list(trace.action_space),
+        "start_is_terminal": trace.start_is_terminal
+    }
+    meta_bytes = json.dumps(meta).encode("utf-8")
+    arrs = {name: getattr(trace, name) for name in _ARR_NAMES}
+    arrs[_META_NAME] = np.frombuffer(meta_bytes, dtype=np.uint8)
+    np.savez(path, **arrs)
+
+
+def load_trace(path):
+    with np.load(path) as npz:
+        arrs = {name: npz[name] for name in npz.files}
+    meta = json.loads(arrs.pop(_META_NAME).tobytes().decode("utf-8"))
+    assert meta["format_version"] == _FORMAT_VERSION
+    return Trace(action_space=tuple(meta["action_space"]),
+                 start_is_terminal=meta["start_is_terminal"],
+                 **arrs)
+
+
+def _stack_obs(obs_list):
+    if len(obs_list) == 0:
+        return np.empty((0, 0))
+    return np.stack(obs_list)
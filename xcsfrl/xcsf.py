@@ -1,40 +1,100 @@
 import logging
 from collections import OrderedDict
 
+import numpy as np
+
 from .action_selection import (NULL_ACTION, ActionSelectionModes,
                                choose_action_selection_mode,
                                filter_null_prediction_arr_entries,
                                greedy_action_selection)
+from .aug_obs_cache import AugObsCache
+from .checkpoint import load_checkpoint, save_checkpoint
 from .covering import calc_num_unique_actions, gen_covering_classifier
 from .deletion import deletion
+from .frozen_policy import freeze_policy, save_policy
 from .ga import run_ga
-from .hyperparams import get_hyperparam as get_hp
-from .hyperparams import register_hyperparams
+from .hyperparams import Hyperparams
+from .inference import greedy_actions
+from .match_set_cache import MatchSetCache
 from .param_update import update_action_set
 from .population import Population
-from .rng import seed_rng
+from .rng import RNGStreams
+from .stats import NULL_STATS, Stats
+from .trace import TraceRecorder
 from .util import calc_num_micros
 
+# obs live per env during training: current obs and previous obs (for
+# delayed [A] updates)
+_NUM_LIVE_OBS_PER_ENV = 2
+
+
+class _EnvState:
+    """Learner state tied to a single env: the obs to act on next, the
+    previous step's [A], reward and obs (for delayed action set updates), and
+    the action selection mode of the current episode."""
+    __slots__ = ("env", "curr_obs", "prev_action_set", "prev_reward",
+                 "prev_obs", "action_selection_mode")
+
+    def __init__(self, env):
+        self.env = env
+        self.curr_obs = None
+        self.prev_action_set = None
+        self.prev_reward = None
+        self.prev_obs = None
+        self.action_selection_mode = None
+
+    @classmethod
+    def restore(cls, env, attrs):
+        """attrs is a dict of all attrs besides env, as loaded from a
+        checkpoint."""
+        env_state = cls(env)
+        for (name, val) in attrs.items():
+            setattr(env_state, name, val)
+        return env_state
+
 
 class XCSF:
-    def __init__(self, env, encoding, action_selection_strat, pred_strat,
-                 hyperparams_dict):
+    # pop class and learning routines called by training, as class attrs so
+    # that subclasses can swap in other implementations (see reference
+    # module)
+    _pop_cls = Population
+    _update_action_set_func = staticmethod(update_action_set)
+    _deletion_func = staticmethod(deletion)
+
+    def __init__(self,
+                 env,
+                 encoding,
+                 action_selection_strat,
+                 pred_strat,
+                 hyperparams_dict,
+                 match_index=None,
+                 match_set_cache_size=None,
+                 collect_stats=False):
+        """match_index is an optional MatchIndexABC instance (for the env's
+        obs space) for pop to use in matching, see match_index module.
+        match_set_cache_size, if given, enables a MatchSetCache of that size,
+        worthwhile for discrete obs spaces. If collect_stats, per-phase
+        timings and counters of training are collected in self.stats, see
+        stats module."""
         self._env = env
         self._encoding = encoding
         self._action_selection_strat = action_selection_strat
         self._pred_strat = pred_strat
-        self._hyperparams_dict = hyperparams_dict
-        register_hyperparams(self._hyperparams_dict)
-        seed_rng(get_hp("seed"))
-        # cache x_nought so can use it after pickling to do predictions without
-        # re-registering hyperparams
-        self._x_nought = get_hp("x_nought")
-
-        self._pop = Population()
-        self._prev_action_set = None
-        self._prev_reward = None
-        self._prev_obs = None
-        self._curr_obs = None
+        # owned by this instance (rather than registered globally) so
+        # multiple instances can coexist in one process, and it is pickled
+        # along with the rest of the instance
+        self._hyperparams = Hyperparams(hyperparams_dict)
+        self._rng_streams = RNGStreams(self._hyperparams.seed)
+
+        self._pop = self._pop_cls(self._env.action_space,
+                                  self._hyperparams.theta_del, match_index)
+        self._match_set_cache = (MatchSetCache(match_set_cache_size)
+                                 if match_set_cache_size is not None else None)
+        self._stats = (Stats() if collect_stats else NULL_STATS)
+        self._env_state = _EnvState(self._env)
+        # states of env copies used for lock-step training
+        self._lockstep_env_states = None
+        self._aug_obs_cache = self._make_aug_obs_cache()
         self._time_step = 0
         self._episodes_trained = 0
         self._num_ga_calls = 0
@@ -43,131 +103,311 @@ class XCSF:
     def pop(self):
         return self._pop
 
+    @property
+    def hyperparams(self):
+        return self._hyperparams
+
+    @property
+    def match_set_cache(self):
+        return self._match_set_cache
+
+    @property
+    def stats(self):
+        """Stats being collected, or None if not collecting."""
+        return (self._stats if self._stats.enabled else None)
+
     def train_for_time_steps(self, num_steps):
         # restart episode or resume where left off
-        # prime the current obs
-        if self._curr_obs is None:
-            assert self._env.is_terminal()
-            self._curr_obs = self._env.reset()
-            self._action_selection_mode = choose_action_selection_mode()
+        self._prime_env_state(self._env_state)
 
         steps_done = 0
         while steps_done < num_steps:
-            self._run_step()
-            if self._env.is_terminal():
-                assert self._curr_obs is None
-                self._curr_obs = self._env.reset()
-                self._action_selection_mode = choose_action_selection_mode()
+            self._run_step(self._env_state)
+            self._try_restart_episode(self._env_state)
             steps_done += 1
 
+    def record_trace(self, num_steps, checkpoint_path):
+        """Saves a checkpoint to checkpoint_path, then trains as
+        train_for_time_steps(num_steps) while recording the env's
+        transitions, which are returned as a Trace (see trace module).
+
+        Loading the checkpoint with a TraceReplayEnv of the trace as env and
+        training it for the same num steps repeats exactly the learning work
+        done here (matching, covering, prediction, updates, GA, deletion)
+        with no env cost, e.g. to time or profile the learner in isolation,
+        or to compare pops across learner implementations."""
+        self.save_checkpoint(checkpoint_path)
+        recorder = TraceRecorder(self._env_state.env)
+        self._env_state.env = recorder
+        try:
+            self.train_for_time_steps(num_steps)
+        finally:
+            self._env_state.env = self._env
+        return recorder.get_trace()
+
     def train_for_episodes(self, num_episodes):
         # should always be in terminal state when starting this func
-        assert self._curr_obs is None
+        assert self._env_state.curr_obs is None
         assert self._env.is_terminal()
 
         for _ in range(num_episodes):
-            self._curr_obs = self._env.reset()
-            self._action_selection_mode = choose_action_selection_mode()
+            self._start_episode(self._env_state)
             while not self._env.is_terminal():
-                self._run_step()
+                self._run_step(self._env_state)
             self._episodes_trained += 1
 
     def train_for_ga_calls(self, num_ga_calls):
         # restart episode or resume where left off
-        # prime the current obs
-        if self._curr_obs is None:
-            assert self._env.is_terminal()
-            self._curr_obs = self._env.reset()
-            self._action_selection_mode = choose_action_selection_mode()
+        self._prime_env_state(self._env_state)
+
+        curr_num_ga_calls = self._num_ga_calls
+        target_num_ga_calls = (curr_num_ga_calls + num_ga_calls)
+        while (self._num_ga_calls < target_num_ga_calls):
+            self._run_step(self._env_state)
+            self._try_restart_episode(self._env_state)
+
+    def train_lockstep_for_ga_calls(self, envs, num_ga_calls):
+        """Trains on K = len(envs) env copies in lock-step until (at least)
+        num_ga_calls more GA calls have been made. Envs must have the same
+        obs/action spaces as the env given on init.
+
+        On each lock-step the match sets and prediction arrays for all K
+        current obs are computed in one batched pass over the pop arrays.
+        Each env then in turn selects its action, steps, and has its action
+        set updates and GA checks applied, exactly as in single env training.
+        Each of the K transitions counts as one time step. Per env episode
+        state is kept between calls as long as the same envs are given, so
+        training resumes where it left off."""
+        env_states = self._get_lockstep_env_states(envs)
+        for env_state in env_states:
+            self._prime_env_state(env_state)
 
         curr_num_ga_calls = self._num_ga_calls
         target_num_ga_calls = (curr_num_ga_calls + num_ga_calls)
         while (self._num_ga_calls < target_num_ga_calls):
-            self._run_step()
-            if self._env.is_terminal():
-                assert self._curr_obs is None
-                self._curr_obs = self._env.reset()
-                self._action_selection_mode = choose_action_selection_mode()
-
-    def _run_step(self):
-        obs = self._curr_obs
-        match_set = self._gen_match_set_and_cover(obs)
-        prediction_arr = self._gen_prediction_arr(match_set, obs)
-        action = self._select_action(prediction_arr)
+            self._run_lockstep_step(env_states)
+            for env_state in env_states:
+                self._try_restart_episode(env_state)
+
+    def _get_lockstep_env_states(self, envs):
+        envs = list(envs)
+        assert len(envs) >= 1
+        curr_envs = ([env_state.env
+                      for env_state in self._lockstep_env_states]
+                     if self._lockstep_env_states is not None else None)
+        if curr_envs is None or len(curr_envs) != len(envs) or \
+                any(a is not b for (a, b) in zip(curr_envs, envs)):
+            self._lockstep_env_states = [_EnvState(env) for env in envs]
+            self._aug_obs_cache = self._make_aug_obs_cache()
+        return self._lockstep_env_states
+
+    def _make_aug_obs_cache(self):
+        num_envs = 1 + (len(self._lockstep_env_states)
+                        if self._lockstep_env_states is not None else 0)
+        return AugObsCache(self._pred_strat, self._hyperparams.x_nought,
+                           _NUM_LIVE_OBS_PER_ENV * num_envs)
+
+    def _prime_env_state(self, env_state):
+        # prime the current obs
+        if env_state.curr_obs is None:
+            assert env_state.env.is_terminal()
+            self._start_episode(env_state)
+
+    def _try_restart_episode(self, env_state):
+        if env_state.env.is_terminal():
+            assert env_state.curr_obs is None
+            self._start_episode(env_state)
+
+    def _start_episode(self, env_state):
+        env_state.curr_obs = env_state.env.reset()
+        env_state.action_selection_mode = choose_action_selection_mode(
+            self._rng_streams.action_selection)
+
+    def _run_step(self, env_state):
+        stats = self._stats
+        obs = env_state.curr_obs
+        start_time = stats.start()
+        match_set = self._gen_match_set(obs)
+        stats.stop("matching", start_time)
+        stats.count("match_set_size", len(match_set))
+        self._cover(obs, match_set)
+        start_time = stats.start()
+        (aug_obs, _) = self._aug_obs_cache.get(obs)
+        prediction_arr = self._gen_prediction_arr(match_set, aug_obs)
+        stats.stop("prediction", start_time)
+        self._act_and_update(env_state, obs, match_set, prediction_arr)
+
+    def _run_lockstep_step(self, env_states):
+        stats = self._stats
+        obs_arr = [env_state.curr_obs for env_state in env_states]
+        start_time = stats.start()
+        match_sets = self._gen_match_sets(obs_arr)
+        stats.stop("matching", start_time)
+        for match_set in match_sets:
+            stats.count("match_set_size", len(match_set))
+        covering_clfrs = []
+        for (obs, match_set) in zip(obs_arr, match_sets):
+            # clfrs covered for earlier envs on this lock-step weren't in pop
+            # when match sets were generated
+            match_set.extend([
+                clfr for clfr in covering_clfrs
+                if clfr.owner is self._pop and clfr.does_match(obs)
+            ])
+            covering_clfrs.extend(self._cover(obs, match_set))
+        start_time = stats.start()
+        aug_obs_arr = self._aug_obs_cache.get_many(obs_arr)
+        prediction_arrs = self._gen_prediction_arrs(match_sets, aug_obs_arr)
+        stats.stop("prediction", start_time)
+        for (env_state, obs, match_set,
+             prediction_arr) in zip(env_states, obs_arr, match_sets,
+                                    prediction_arrs):
+            self._act_and_update(env_state, obs, match_set, prediction_arr)
+
+    def _act_and_update(self, env_state, obs, match_set, prediction_arr):
+        stats = self._stats
+        mode = env_state.action_selection_mode
+        start_time = stats.start()
+        action = self._select_action(prediction_arr, mode)
+        stats.stop("action_selection", start_time)
         action_set = self._gen_action_set(match_set, action)
-        (next_obs, reward, is_terminal, _) = self._env.step(action)
-        if self._prev_action_set is not None:
-            assert self._prev_reward is not None
-            assert self._prev_obs is not None
+        stats.count("action_set_size", len(action_set))
+        start_time = stats.start()
+        (next_obs, reward, is_terminal, _) = env_state.env.step(action)
+        stats.stop("env_step", start_time)
+        if env_state.prev_action_set is not None:
+            assert env_state.prev_reward is not None
+            assert env_state.prev_obs is not None
             prediction_arr = filter_null_prediction_arr_entries(prediction_arr)
-            payoff = self._prev_reward + get_hp("gamma") * \
+            payoff = env_state.prev_reward + self._hyperparams.gamma * \
                 max(prediction_arr.values())
-            update_action_set(self._prev_action_set, payoff, self._prev_obs,
-                              self._pop, self._pred_strat, self._x_nought)
-            self._try_run_ga(self._prev_action_set, self._pop, self._time_step,
-                             self._encoding, self._env.action_space)
+            start_time = stats.start()
+            self._update_action_set_func(env_state.prev_action_set,
+                                         payoff,
+                                         env_state.prev_obs,
+                                         self._pop,
+                                         self._pred_strat,
+                                         self._hyperparams,
+                                         stats,
+                                         aug_obs_cache=self._aug_obs_cache)
+            stats.stop("update", start_time)
+            self._try_run_ga(env_state.prev_action_set, self._pop,
+                             self._time_step, self._encoding,
+                             self._env.action_space, mode)
         if is_terminal:
             payoff = reward
-            update_action_set(action_set, payoff, obs, self._pop,
-                              self._pred_strat, self._x_nought)
+            start_time = stats.start()
+            self._update_action_set_func(action_set,
+                                         payoff,
+                                         obs,
+                                         self._pop,
+                                         self._pred_strat,
+                                         self._hyperparams,
+                                         stats,
+                                         aug_obs_cache=self._aug_obs_cache)
+            stats.stop("update", start_time)
             self._try_run_ga(action_set, self._pop, self._time_step,
-                             self._encoding, self._env.action_space)
-            self._prev_action_set = None
-            self._prev_reward = None
-            self._prev_obs = None
-            self._curr_obs = None
+                             self._encoding, self._env.action_space, mode)
+            env_state.prev_action_set = None
+            env_state.prev_reward = None
+            env_state.prev_obs = None
+            env_state.curr_obs = None
         else:
-            self._prev_action_set = action_set
-            self._prev_reward = reward
-            self._prev_obs = obs
-            self._curr_obs = next_obs
+            env_state.prev_action_set = action_set
+            env_state.prev_reward = reward
+            env_state.prev_obs = obs
+            env_state.curr_obs = next_obs
         self._time_step += 1
 
-    def _gen_match_set_and_cover(self, obs):
-        match_set = self._gen_match_set(obs)
+    def _cover(self, obs, match_set):
+        """Covers all actions missing from match_set (in place), returning
+        the new covering clfrs."""
+        start_time = self._stats.start()
+        covering_clfrs = []
         theta_mna = len(self._env.action_space)  # always cover all actions
         while (calc_num_unique_actions(match_set) < theta_mna):
             clfr = gen_covering_classifier(obs, self._encoding, match_set,
                                            self._env.action_space,
-                                           self._time_step, self._pred_strat)
+                                           self._time_step, self._pred_strat,
+                                           self._hyperparams,
+                                           self._rng_streams.covering)
             self._pop.add_new(clfr, op="covering")
-            deletion(self._pop)
+            self._deletion_func(self._pop, self._hyperparams,
+                                self._rng_streams.deletion, self._stats)
             match_set.append(clfr)
-        return match_set
+            covering_clfrs.append(clfr)
+        self._stats.count("covering_iters", len(covering_clfrs))
+        self._stats.stop("covering", start_time)
+        return covering_clfrs
 
     def _gen_match_set(self, obs):
-        return [clfr for clfr in self._pop if clfr.does_match(obs)]
-
-    def _gen_prediction_arr(self, match_set, obs):
-        aug_obs = self._pred_strat.aug_obs(obs, self._x_nought)
-
-        prediction_arr = OrderedDict(
-            {action: None
-             for action in self._env.action_space})
-        actions_reprd_in_m = set([clfr.action for clfr in match_set])
-        for a in actions_reprd_in_m:
-            # to bootstap sum below
-            prediction_arr[a] = 0
-
-        fitness_sum_arr = OrderedDict(
-            {action: 0
-             for action in self._env.action_space})
-
-        for clfr in match_set:
-            a = clfr.action
-            prediction_arr[a] += clfr.prediction(aug_obs) * clfr.fitness
-            fitness_sum_arr[a] += clfr.fitness
-
-        for a in self._env.action_space:
-            if fitness_sum_arr[a] != 0:
-                prediction_arr[a] /= fitness_sum_arr[a]
+        if self._match_set_cache is None:
+            return self._pop.gen_match_set(obs)
+        obs_key = tuple(np.asarray(obs).tolist())
+        match_set = self._match_set_cache.get(obs_key, self._pop.version)
+        if match_set is None:
+            match_set = self._pop.gen_match_set(obs)
+            self._match_set_cache.put(obs_key, self._pop.version, match_set)
+        return match_set
+
+    def _gen_match_sets(self, obs_arr):
+        if self._match_set_cache is None:
+            return self._pop.gen_match_sets(np.stack(obs_arr))
+        obs_keys = [tuple(np.asarray(obs).tolist()) for obs in obs_arr]
+        match_sets = [
+            self._match_set_cache.get(obs_key, self._pop.version)
+            for obs_key in obs_keys
+        ]
+        miss_idxs = [
+            idx for (idx, match_set) in enumerate(match_sets)
+            if match_set is None
+        ]
+        if len(miss_idxs) > 0:
+            miss_match_sets = self._pop.gen_match_sets(
+                np.stack([obs_arr[idx] for idx in miss_idxs]))
+            for (idx, match_set) in zip(miss_idxs, miss_match_sets):
+                self._match_set_cache.put(obs_keys[idx], self._pop.version,
+                                          match_set)
+                match_sets[idx] = match_set
+        return match_sets
+
+    def _gen_prediction_arr(self, match_set, aug_obs):
+        (prediction_sums, fitness_sums, counts) = \
+            self._pop.calc_action_prediction_sums(match_set, aug_obs)
+        return self._make_prediction_arr(prediction_sums, fitness_sums,
+                                         counts)
+
+    def _gen_prediction_arrs(self, match_sets, aug_obs_arr):
+        (prediction_sums, fitness_sums, counts) = \
+            self._pop.calc_action_prediction_sums_many(match_sets,
+                                                       aug_obs_arr)
+        return [
+            self._make_prediction_arr(*sums)
+            for sums in zip(prediction_sums, fitness_sums, counts)
+        ]
+
+    def _make_prediction_arr(self, prediction_sums, fitness_sums, counts):
+        prediction_sums = prediction_sums.tolist()
+        fitness_sums = fitness_sums.tolist()
+
+        prediction_arr = OrderedDict()
+        for (idx, a) in enumerate(self._pop.action_space):
+            if counts[idx] == 0:
+                # action not represented in match set
+                prediction_arr[a] = None
+            elif fitness_sums[idx] != 0:
+                prediction_arr[a] = prediction_sums[idx] / fitness_sums[idx]
+            else:
+                prediction_arr[a] = prediction_sums[idx]
         return prediction_arr
 
-    def _select_action(self, prediction_arr):
-        if self._action_selection_mode == ActionSelectionModes.explore:
+    def _select_action(self, prediction_arr, action_selection_mode):
+        if action_selection_mode == ActionSelectionModes.explore:
             return self._action_selection_strat(
-                prediction_arr, num_ga_calls=self._num_ga_calls)
-        elif self._action_selection_mode == ActionSelectionModes.exploit:
+                prediction_arr,
+                self._hyperparams,
+                self._rng_streams.action_selection,
+                num_ga_calls=self._num_ga_calls)
+        elif action_selection_mode == ActionSelectionModes.exploit:
             return greedy_action_selection(prediction_arr)
         else:
             assert False
@@ -175,23 +415,99 @@ class XCSF:
     def _gen_action_set(self, match_set, action):
         return [clfr for clfr in match_set if clfr.action == action]
 
-    def _try_run_ga(self, action_set, pop, time_step, encoding, action_space):
+    def _try_run_ga(self, action_set, pop, time_step, encoding, action_space,
+                    action_selection_mode):
         # GA can only be active on exploration episodes/"problems"
-        if self._action_selection_mode == ActionSelectionModes.explore:
+        if action_selection_mode == ActionSelectionModes.explore:
             avg_time_stamp_in_as = sum(
                 [clfr.time_stamp * clfr.numerosity
                  for clfr in action_set]) / calc_num_micros(action_set)
             should_apply_ga = ((time_step - avg_time_stamp_in_as) >
-                               get_hp("theta_ga"))
+                               self._hyperparams.theta_ga)
             if should_apply_ga:
-                run_ga(action_set, pop, time_step, encoding, action_space)
+                start_time = self._stats.start()
+                run_ga(action_set,
+                       pop,
+                       time_step,
+                       encoding,
+                       action_space,
+                       self._hyperparams,
+                       self._rng_streams,
+                       self._stats,
+                       deletion_func=self._deletion_func)
+                self._stats.stop("ga", start_time)
                 self._num_ga_calls += 1
 
+    def save_checkpoint(self, path):
+        """Saves full training state (i.e. everything but the env(s) and the
+        components given on init) to path as columnar arrays, see checkpoint
+        module. Much faster to save and load than pickling the instance,
+        which pickles every clfr, condition and interval one by one."""
+        save_checkpoint(path,
+                        self._pop,
+                        self._hyperparams,
+                        self._rng_streams.get_state(),
+                        counters={
+                            "time_step": self._time_step,
+                            "episodes_trained": self._episodes_trained,
+                            "num_ga_calls": self._num_ga_calls
+                        },
+                        env_state=self._env_state,
+                        lockstep_env_states=self._lockstep_env_states)
+
+    @classmethod
+    def load_checkpoint(cls,
+                        path,
+                        env,
+                        encoding,
+                        action_selection_strat,
+                        pred_strat,
+                        match_index=None,
+                        match_set_cache_size=None,
+                        lockstep_envs=None,
+                        collect_stats=False):
+        """Resumes training state saved by save_checkpoint(), with components
+        given as on init. Resumed training is identical to uninterrupted
+        training as long as env (and lockstep_envs, for a checkpoint saved
+        after lock-step training) are in the same state as when the
+        checkpoint was saved, e.g. restored along with it or saved between
+        episodes. If lockstep_envs is not given, any pending lock-step env
+        states in the checkpoint are dropped."""
+        checkpoint = load_checkpoint(path, env.action_space, encoding,
+                                     pred_strat, match_index)
+        xcsf = cls(env,
+                   encoding,
+                   action_selection_strat,
+                   pred_strat,
+                   checkpoint.hyperparams.as_dict(),
+                   match_set_cache_size=match_set_cache_size,
+                   collect_stats=collect_stats)
+        # restored clfrs share the checkpoint's hyperparams
+        xcsf._hyperparams = checkpoint.hyperparams
+        xcsf._rng_streams.set_state(checkpoint.rng_state)
+        xcsf._pop = checkpoint.pop
+        xcsf._env_state = _EnvState.restore(env, checkpoint.env_state)
+        if lockstep_envs is not None and \
+                checkpoint.lockstep_env_states is not None:
+            lockstep_envs = list(lockstep_envs)
+            assert len(lockstep_envs) == len(checkpoint.lockstep_env_states)
+            xcsf._lockstep_env_states = [
+                _EnvState.restore(lockstep_env, attrs)
+                for (lockstep_env, attrs) in zip(
+                    lockstep_envs, checkpoint.lockstep_env_states)
+            ]
+        xcsf._aug_obs_cache = xcsf._make_aug_obs_cache()
+        xcsf._time_step = checkpoint.counters["time_step"]
+        xcsf._episodes_trained = checkpoint.counters["episodes_trained"]
+        xcsf._num_ga_calls = checkpoint.counters["num_ga_calls"]
+        return xcsf
+
     def select_action(self, obs):
         """Action selection for outside testing - always exploit"""
         match_set = self._gen_match_set(obs)
         if len(match_set) > 0:
-            prediction_arr = self._gen_prediction_arr(match_set, obs)
+            prediction_arr = self._gen_prediction_arr(match_set,
+                                                      self._aug_obs(obs))
             return greedy_action_selection(prediction_arr)
         else:
             return NULL_ACTION
@@ -199,4 +515,39 @@ class XCSF:
     def gen_prediction_arr(self, obs):
         """Q-value calculation for outside probing."""
         match_set = self._gen_match_set(obs)
-        return self._gen_prediction_arr(match_set, obs)
+        return self._gen_prediction_arr(match_set, self._aug_obs(obs))
+
+    def _aug_obs(self, obs):
+        # obs given from outside training may be modified in place between
+        # calls, so bypass aug obs cache
+        return self._pred_strat.aug_obs(obs, self._hyperparams.x_nought)
+
+    def freeze_policy(self):
+        """Compiles pop into a FrozenPolicy for fast inference, see
+        frozen_policy module."""
+        return freeze_policy(self._pop, self._hyperparams.x_nought,
+                             self._pred_strat.poly_order)
+
+    def export_policy(self, path):
+        """Saves frozen policy of pop to path (.npz), to be loaded with
+        frozen_policy.load_policy()."""
+        save_policy(self.freeze_policy(), path)
+
+    def select_actions(self, obs_arr, **kwargs):
+        """Batch select_action() for each row of (M x n) obs_arr, returning
+        an (M, ) array of actions (NULL_ACTION for obs with empty match
+        sets). kwargs are passed to Population.calc_prediction_arrs()."""
+        prediction_arrs = self.gen_prediction_arrs(obs_arr, **kwargs)
+        return greedy_actions(prediction_arrs, self._pop.action_space)
+
+    def gen_prediction_arrs(self, obs_arr, **kwargs):
+        """Batch gen_prediction_arr() for each row of (M x n) obs_arr,
+        returning an (M x |A|) array of Q-values (columns in action space
+        order) that is NaN for actions not covered in an obs' match set.
+        kwargs are passed to Population.calc_prediction_arrs()."""
+        obs_arr = np.asarray(obs_arr)
+        if len(obs_arr) == 0:
+            return np.empty((0, len(self._pop.action_space)))
+        aug_obs_arr = self._pred_strat.aug_obs_many(
+            obs_arr, self._hyperparams.x_nought)
+        return self._pop.calc_prediction_arrs(obs_arr, aug_obs_arr, **kwargs)